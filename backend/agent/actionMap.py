@@ -8,9 +8,7 @@ actionMap = {
     "handle_greeting":"Done",
     
     "reset_previous_plans":"Cleaning Up",
-    "rephrase_query_for_planning_schedule":"Rephrasing Query",
-    "get_courses_for_building_schedule":"Searching the Database",
-    "filter_courses_1":"Filtering the Courses",
+    "generate_plan_candidate":"Generating Plan Candidates",
     "get_unique_plans":"Checking For Duplicate Courses",
     "filter_courses_2":"Filtering the Courses",
     "planning_agent":"Building up the plan",
@@ -1,11 +1,12 @@
 from langgraph.graph import StateGraph,START,END
 from dotenv import load_dotenv
-from langgraph.checkpoint.memory import MemorySaver
+from .checkpointer import BoundedMemorySaver, SqliteCheckpointSaver
+from .config import (CHECKPOINT_MAX_THREADS, CHECKPOINT_MAX_MB, CHECKPOINT_TTL_SECONDS, CHECKPOINT_KEEP_HISTORY,
+                     CHECKPOINT_BACKEND, CHECKPOINT_SQLITE_PATH, STATE_SCHEMA)
 from .routers import check_intent,intent_based_router
 from .planning import ( reset_previous_plans,
-                      rephrase_query_for_planning_schedule,
-                      get_courses_for_building_schedule,
-                      check_total_number_of_plans,filter_courses_1,
+                      assign_plan_strategies,
+                      generate_plan_candidate,
                       filter_courses_2,
                       get_unique_plans,
                       planning_agent,
@@ -27,15 +28,20 @@ from .shortTermPlanning import (get_attributes_for_short_plan,
 
 from .greeting import handle_greeting
 
-from .pydanticModels import AgentState
+from .pydanticModels import AgentState, LightweightAgentState
 
 import json
 
 load_dotenv()
 
-memory = MemorySaver()
+memory = BoundedMemorySaver(
+    max_threads=CHECKPOINT_MAX_THREADS,
+    max_bytes=int(CHECKPOINT_MAX_MB * 1024 * 1024),
+    ttl_seconds=CHECKPOINT_TTL_SECONDS,
+    keep_history=CHECKPOINT_KEEP_HISTORY,
+)
 
-workflow = StateGraph(AgentState)
+workflow = StateGraph(AgentState if STATE_SCHEMA == "pydantic" else LightweightAgentState)
 
 workflow.add_node("check_intent",check_intent)
 
@@ -46,9 +52,7 @@ workflow.add_node("summarize_course_extraction_for_user",summarize_course_extrac
 workflow.add_node("handle_greeting",handle_greeting)
 
 workflow.add_node("reset_previous_plans",reset_previous_plans)
-workflow.add_node("rephrase_query_for_planning_schedule",rephrase_query_for_planning_schedule)
-workflow.add_node("get_courses_for_building_schedule",get_courses_for_building_schedule)
-workflow.add_node("filter_courses_1",filter_courses_1)
+workflow.add_node("generate_plan_candidate",generate_plan_candidate)
 workflow.add_node("get_unique_plans",get_unique_plans)
 workflow.add_node("filter_courses_2",filter_courses_2)
 workflow.add_node("planning_agent", planning_agent)
@@ -78,13 +82,8 @@ workflow.add_edge("extract_course_attributes_from_query","get_course_details")
 workflow.add_edge("get_course_details","summarize_course_extraction_for_user")
 workflow.add_edge("summarize_course_extraction_for_user",END)
 
-workflow.add_edge("reset_previous_plans","rephrase_query_for_planning_schedule")
-workflow.add_edge("rephrase_query_for_planning_schedule","get_courses_for_building_schedule")
-workflow.add_edge("get_courses_for_building_schedule","filter_courses_1")
-workflow.add_conditional_edges("filter_courses_1",check_total_number_of_plans,{
-    "finished":"get_unique_plans",
-    "generate_more_plans":"rephrase_query_for_planning_schedule"
-})
+workflow.add_conditional_edges("reset_previous_plans",assign_plan_strategies,["generate_plan_candidate"])
+workflow.add_edge("generate_plan_candidate","get_unique_plans")
 workflow.add_edge("get_unique_plans","filter_courses_2")
 workflow.add_edge("filter_courses_2", "planning_agent")
 workflow.add_edge("planning_agent", "final_duplicate_check")
@@ -104,6 +103,15 @@ workflow.add_edge("build_short_term_plan",END)
 workflow.add_edge("handle_greeting",END)
 
 
-def get_agent():
-    agent = workflow.compile(checkpointer=memory)
+async def create_checkpointer():
+    """
+    Checkpointer selected by `CHECKPOINT_BACKEND`: the shared SQLite file for
+    "sqlite", otherwise the process-local bounded `memory`.
+    """
+    if CHECKPOINT_BACKEND == "sqlite":
+        return await SqliteCheckpointSaver.open(CHECKPOINT_SQLITE_PATH)
+    return memory
+
+def get_agent(checkpointer=None):
+    agent = workflow.compile(checkpointer=checkpointer or memory)
     return agent
\ No newline at end of file
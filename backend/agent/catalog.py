@@ -0,0 +1,515 @@
+from collections.abc import Mapping
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+from pydantic_core import core_schema
+from .courseSummaries import attach_summaries, load_sidecar, summarize_description
+import re
+import threading
+import weakref
+
+Credits = Union[int, float]
+
+# Fields added to every course record at load time; prompts leave them out.
+TYPED_FIELDS = ("credits_min", "credits_max", "prerequisite_expr")
+
+PREREQUISITE_TOKEN = re.compile(r"(\(|\)|\bAnd\b|\bOr\b)")
+PREREQUISITE_COURSE = re.compile(r"^(?P<subject>.+?)\s+(?P<number>\d{4}[A-Z]?)\b\s*(?P<level>.*?)\s*(?P<grade>\b[A-F][+-]?|\bS|\bP)?$")
+
+def _number(text: str) -> Credits:
+    value = float(text)
+    return int(value) if value.is_integer() else value
+
+def parse_credit_range(credit_str: Any) -> Tuple[Credits, Credits]:
+    """
+    Parse a catalog credit string into `(credits_min, credits_max)`.
+
+    Handles single values ("4", "0.5"), ranges ("1 TO 4") and alternatives
+    ("3 OR 4"); anything unparseable is `(0, 0)`.
+    """
+    values = []
+    for part in re.split(r"\s+(?:TO|OR)\s+", str(credit_str).strip(), flags=re.IGNORECASE):
+        try:
+            values.append(_number(part))
+        except ValueError:
+            return 0, 0
+    return (min(values), max(values)) if values else (0, 0)
+
+def parse_prerequisites(text: Optional[str], subject_codes: Dict[str, str]) -> Optional[Dict[str, Any]]:
+    """
+    Parse a catalog prerequisite string into a JSON-friendly expression tree.
+
+    "( Computer Science 5004 Graduate B- Or Computer Science 5010 Graduate C- )
+    And Computer Science 5500 Graduate C-" becomes
+
+        {"all": [{"any": [<CS5004>, <CS5010>]}, <CS5500>]}
+
+    where each course leaf is `{"course_number", "subject", "number", "level",
+    "grade"}`; `course_number` is resolved through `subject_codes` (subject name
+    in lower case -> dept_code) and is None for subjects outside the catalog.
+    Other requirements ("Graduate Admission REQ") become `{"requirement": text}`.
+    `And` binds tighter than `Or`. "None" and empty strings give None.
+    """
+    if not text or text.strip().lower() == "none":
+        return None
+    tokens = [token.strip() for token in PREREQUISITE_TOKEN.split(text) if token.strip()]
+    position = 0
+
+    def leaf(raw: str) -> Dict[str, Any]:
+        match = PREREQUISITE_COURSE.match(raw)
+        if not match:
+            return {"requirement": raw}
+        code = subject_codes.get(match["subject"].lower())
+        return {
+            "course_number": f"{code}{match['number']}" if code else None,
+            "subject": match["subject"],
+            "number": match["number"],
+            "level": match["level"],
+            "grade": match["grade"] or "",
+        }
+
+    def combine(operator: str, parts: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        parts = [part for part in parts if part is not None]
+        if len(parts) <= 1:
+            return parts[0] if parts else None
+        return {operator: parts}
+
+    def parse_or():
+        nonlocal position
+        parts = [parse_and()]
+        while position < len(tokens) and tokens[position] == "Or":
+            position += 1
+            parts.append(parse_and())
+        return combine("any", parts)
+
+    def parse_and():
+        nonlocal position
+        parts = [parse_atom()]
+        while position < len(tokens) and tokens[position] == "And":
+            position += 1
+            parts.append(parse_atom())
+        return combine("all", parts)
+
+    def parse_atom():
+        nonlocal position
+        if position >= len(tokens):
+            return None
+        token = tokens[position]
+        position += 1
+        if token == "(":
+            node = parse_or()
+            if position < len(tokens) and tokens[position] == ")":
+                position += 1
+            return node
+        if token in (")", "And", "Or"):
+            return None
+        return leaf(token)
+
+    return parse_or()
+
+def prerequisite_course_numbers(expression: Optional[Dict[str, Any]]) -> List[str]:
+    """Every resolved course number mentioned in a prerequisite expression, in order."""
+    if not expression:
+        return []
+    if "course_number" in expression:
+        return [expression["course_number"]] if expression["course_number"] else []
+    found = []
+    for part in expression.get("all", expression.get("any", [])):
+        found.extend(number for number in prerequisite_course_numbers(part) if number not in found)
+    return found
+
+def subject_name(department: str, dept_code: str) -> str:
+    """Catalog departments end with their code ("Computer Science CS"); prerequisites use the bare name."""
+    department = (department or "").strip()
+    if dept_code and department.endswith(" " + dept_code):
+        department = department[: -len(dept_code) - 1]
+    return department.strip()
+
+# Words too common in department names to identify one.
+GENERIC_SUBJECT_WORDS = {"and", "the", "science", "sciences", "engineering", "engineer", "engineerng", "systems", "studies", "program", "general", "graduate", "cps"}
+
+def _words(text: str) -> set:
+    return {word for word in re.findall(r"[a-z]+", text.lower()) if len(word) > 2 and word not in GENERIC_SUBJECT_WORDS}
+
+def resolve_subject_codes(courses: List[Dict[str, Any]]) -> Dict[str, str]:
+    """
+    Map prerequisite subject names (lower case) to catalog dept_codes.
+
+    Subjects spelled like a department ("Computer Science" for "Computer
+    Science CS") map directly. Abbreviated ones ("Physical Therapy" for "Phys
+    Therapy/Movemnt/Rehab Sci PT") map to the department that shares a
+    distinctive word with the subject and owns most (at least half) of the
+    referenced course numbers; other subjects stay unresolved.
+    """
+    codes: Dict[str, str] = {}
+    department_words: Dict[str, set] = {}
+    numbers = set()
+    for course in courses:
+        code = course.get("dept_code")
+        if not code:
+            continue
+        name = subject_name(course.get("department", ""), code)
+        codes.setdefault(name.lower(), code)
+        department_words.setdefault(code, set()).update(_words(name))
+        numbers.add(course["course_number"])
+
+    references: Dict[str, List[str]] = {}
+    for course in courses:
+        for token in PREREQUISITE_TOKEN.split(course.get("prerequisites") or ""):
+            match = PREREQUISITE_COURSE.match(token.strip())
+            if match and match["subject"].lower() not in codes:
+                references.setdefault(match["subject"], []).append(match["number"])
+
+    for subject, referenced in references.items():
+        words = _words(subject)
+        votes = {
+            code: sum(f"{code}{number}" in numbers for number in referenced)
+            for code, dept_words in department_words.items() if words & dept_words
+        }
+        ranked = sorted(votes.items(), key=lambda item: -item[1])
+        if ranked and 2 * ranked[0][1] >= len(referenced) and (len(ranked) == 1 or ranked[0][1] > ranked[1][1]):
+            codes[subject.lower()] = ranked[0][0]
+    return codes
+
+def normalize_course(course: Dict[str, Any], subject_codes: Dict[str, str]) -> Dict[str, Any]:
+    """Add the typed `credits_min`, `credits_max` and `prerequisite_expr` fields to a course."""
+    credits_min, credits_max = parse_credit_range(course.get("credit_hours", ""))
+    return {
+        **course,
+        "credits_min": credits_min,
+        "credits_max": credits_max,
+        "prerequisite_expr": parse_prerequisites(course.get("prerequisites"), subject_codes),
+    }
+
+def course_credits(course: Dict[str, Any]) -> Credits:
+    """
+    Credits a course counts for in plan totals (the upper bound of its range).
+
+    Reads the typed field; only courses that did not come from the catalog
+    (e.g. state saved before it was typed) fall back to parsing `credit_hours`.
+    """
+    credits = course.get("credits_max")
+    if credits is None:
+        return parse_credit_range(course.get("credit_hours", ""))[1]
+    return credits
+
+def prompt_fields(course: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    The course as the LLM prompts show it: catalog fields without the typed
+    ones, and the stored summary and keywords instead of the full description.
+    """
+    fields = {key: value for key, value in course.items() if key not in TYPED_FIELDS}
+    if fields.get("summary"):
+        fields.pop("description", None)
+    if "keywords" in fields:
+        fields["keywords"] = list(fields["keywords"])
+    return fields
+
+COURSE_FIELDS = (
+    "title", "description", "credit_hours", "course_number", "college", "department",
+    "dept_code", "prerequisites", "credits_min", "credits_max", "prerequisite_expr",
+    "summary", "keywords",
+)
+
+# course_number -> Course for every catalog record; filled by CourseCatalog.load.
+_catalog_courses: Dict[str, "Course"] = {}
+# Courses from outside the catalog (e.g. invented by an LLM), kept only while referenced.
+_other_courses: "weakref.WeakValueDictionary[str, Course]" = weakref.WeakValueDictionary()
+
+class Course(Mapping):
+    """
+    Immutable, slotted course record, interned by `course_number`.
+
+    There is one `Course` per catalog course for the whole process, so the
+    course lists in `AgentState` (`course_list`, `final_course_list`, every
+    plan in `filtered_course_list`, ...) hold references to shared records
+    instead of copies of the same description. It reads like the dict it
+    replaces (`course["title"]`, `course.get(...)`, `{**course}`); use
+    `to_dict()` for a mutable copy.
+
+    Checkpoints store catalog courses as their `course_number`
+    (`checkpointer.CourseRefSerializer`); JSON responses expand them with
+    `course_json`.
+    """
+
+    __slots__ = COURSE_FIELDS + ("__weakref__",)
+
+    def __init__(self, fields: Mapping):
+        for name in COURSE_FIELDS:
+            object.__setattr__(self, name, fields.get(name, "" if name not in TYPED_FIELDS else None))
+        if self.credits_max is None:
+            credits_min, credits_max = parse_credit_range(self.credit_hours)
+            object.__setattr__(self, "credits_min", credits_min)
+            object.__setattr__(self, "credits_max", credits_max)
+        # Catalog records carry their ingest-time summary; others get the extractive one.
+        object.__setattr__(self, "summary", self.summary or summarize_description(self.description or ""))
+        object.__setattr__(self, "keywords", tuple(fields.get("keywords") or ()))
+
+    @classmethod
+    def intern(cls, fields: Mapping) -> "Course":
+        """The shared record for `fields["course_number"]`, created (from `fields`) if none exists."""
+        if isinstance(fields, Course):
+            return fields
+        if isinstance(fields, PlannedCourse):
+            return fields.course
+        course_number = fields.get("course_number", "")
+        course = _catalog_courses.get(course_number) or _other_courses.get(course_number)
+        if course is None:
+            course = cls(fields)
+            _other_courses[course_number] = course
+        return course
+
+    @staticmethod
+    def lookup(course_number: str) -> Optional["Course"]:
+        """The catalog record for `course_number`, or None."""
+        return _catalog_courses.get(course_number)
+
+    @property
+    def in_catalog(self) -> bool:
+        return _catalog_courses.get(self.course_number) is self
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Course records are immutable; use to_dict() for a mutable copy")
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in COURSE_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(COURSE_FIELDS)
+
+    def __len__(self) -> int:
+        return len(COURSE_FIELDS)
+
+    def __eq__(self, other):
+        return other is self or Mapping.__eq__(self, other)
+
+    __hash__ = object.__hash__
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return Course.intern, (self.to_dict(),)
+
+    def __repr__(self):
+        return f"Course({self.course_number!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in COURSE_FIELDS}
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source, handler):
+        return core_schema.no_info_plain_validator_function(
+            cls.intern,
+            serialization=core_schema.plain_serializer_function_ser_schema(lambda course: course.to_dict()),
+        )
+
+class PlannedCourse(Mapping):
+    """
+    A course placed in a semester plan: the shared `Course` plus the plan's
+    own `reason` and `type`, exposing the keys the planning JSON has always had.
+    """
+
+    __slots__ = ("course", "reason", "type")
+    KEYS = ("course_number", "title", "description", "summary", "keywords", "reason", "credit_hours", "credits_min", "credits_max", "type")
+
+    def __init__(self, course: Course, reason: str, type: str):
+        object.__setattr__(self, "course", course)
+        object.__setattr__(self, "reason", reason)
+        object.__setattr__(self, "type", type)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("PlannedCourse is immutable")
+
+    def __getitem__(self, key: str) -> Any:
+        if key == "reason":
+            return self.reason
+        if key == "type":
+            return self.type
+        if key not in self.KEYS:
+            raise KeyError(key)
+        return getattr(self.course, key)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.KEYS)
+
+    def __len__(self) -> int:
+        return len(self.KEYS)
+
+    __hash__ = object.__hash__
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return PlannedCourse, (self.course, self.reason, self.type)
+
+    def __repr__(self):
+        return f"PlannedCourse({self.course.course_number!r}, type={self.type!r})"
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {key: self[key] for key in self.KEYS}
+
+def course_json(obj: Any) -> Any:
+    """`json.dumps(..., default=course_json)`: expand course records into plain dicts."""
+    if isinstance(obj, (Course, PlannedCourse)):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {obj.__class__.__name__} is not JSON serializable")
+
+def parse_course_document(document: str, metadata: Dict) -> Dict:
+    """
+    Turn a stored Chroma document and its metadata into a course dictionary.
+
+    The description is the second line of the stored document; internal 
+    metadata keys such as "data_id" are dropped.
+    """
+    lines = document.split("\n")
+    description = lines[1].strip() if len(lines) > 1 else ""
+    filtered_meta = {k: v for k, v in metadata.items() if k not in ['data_id']}
+    return {
+        **filtered_meta,
+        "description": description
+    }
+
+class CourseCatalog:
+    """
+    Immutable in-memory index of every course in the vector collections.
+
+    The full catalog (a few thousand courses) is read once, with descriptions 
+    already parsed, into a read-only mapping keyed by `course_number`. Exact 
+    lookups are then dictionary hits with no database round trip.
+
+    Each record is also normalized once here (`normalize_course`): credit 
+    strings become `credits_min`/`credits_max` and prerequisite strings a 
+    `prerequisite_expr` tree whose course references are resolved to catalog 
+    course numbers, so request-time code never re-parses those strings. 
+    Records are interned `Course` objects and lookups return the shared 
+    record itself rather than a copy.
+
+    Every record also carries the `summary` and `keywords` computed at ingest 
+    time (`courseSummaries`), read from the sidecar at `summaries_path`.
+    """
+
+    def __init__(self, databases, summaries_path: Optional[str] = None):
+        self._databases = databases
+        self._summaries_path = summaries_path
+        self._lock = threading.Lock()
+        self._courses = None
+        self.subject_codes: Dict[str, str] = {}
+        self.summary_stats: Dict[str, int] = {}
+        # dept_code -> college offering most of its courses, and every college name.
+        self.department_colleges: Dict[str, str] = {}
+        self.colleges: frozenset = frozenset()
+
+    @property
+    def loaded(self) -> bool:
+        return self._courses is not None
+
+    def load(self):
+        """Read both collections into the index (idempotent)."""
+        if self._courses is not None:
+            return self
+        with self._lock:
+            if self._courses is not None:
+                return self
+            self.load_courses(self.raw_courses(), load_sidecar(self._summaries_path))
+        return self
+
+    def raw_courses(self) -> List[Dict[str, Any]]:
+        """Every stored course as a parsed dict, first occurrence of a number only."""
+        raw = {}
+        for database in self._databases:
+            data = database.get(include=["documents", "metadatas"])
+            for document, metadata in zip(data["documents"], data["metadatas"]):
+                course = parse_course_document(document, metadata)
+                raw.setdefault(course["course_number"], course)
+        return list(raw.values())
+
+    def load_courses(self, raw_courses: List[Dict[str, Any]], sidecar: Optional[Dict[str, Any]] = None):
+        """
+        Index already-parsed course dicts (first occurrence of a number wins),
+        attach their summaries from `sidecar` (see `courseSummaries`) and
+        intern them.
+        """
+        raw = {}
+        for course in raw_courses:
+            raw.setdefault(course["course_number"], course)
+        subject_codes = resolve_subject_codes(list(raw.values()))
+        summarized, self.summary_stats = attach_summaries(list(raw.values()), sidecar)
+        courses = {
+            course["course_number"]: Course(normalize_course(course, subject_codes))
+            for course in summarized
+        }
+        self.subject_codes = subject_codes
+        offered: Dict[str, Dict[str, int]] = {}
+        for course in courses.values():
+            if course.get("dept_code") and course.get("college"):
+                counts = offered.setdefault(course["dept_code"], {})
+                counts[course["college"]] = counts.get(course["college"], 0) + 1
+        self.department_colleges = {code: max(counts, key=counts.get) for code, counts in offered.items()}
+        self.colleges = frozenset(course.get("college") for course in courses.values() if course.get("college"))
+        self._courses = MappingProxyType(courses)
+        _catalog_courses.update(courses)
+        return self
+
+    def __len__(self):
+        return len(self.load()._courses)
+
+    def __contains__(self, course_number: str) -> bool:
+        return course_number in self.load()._courses
+
+    def get(self, course_number: str) -> Optional[Course]:
+        """Return the course with this number, or None if it is not in the catalog."""
+        return self.load()._courses.get(course_number)
+
+    def get_many(self, course_numbers: List[str]) -> List[Course]:
+        """Return the known courses in request order, skipping unknown and repeated numbers."""
+        courses = self.load()._courses
+        found = []
+        seen = set()
+        for course_number in course_numbers:
+            if course_number in seen or course_number not in courses:
+                continue
+            seen.add(course_number)
+            found.append(courses[course_number])
+        return found
+
+    def search_scope(self, college: str, department: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        The catalog `dept_code` and `college` values a student's college and
+        department refer to, for metadata-filtered search.
+
+        `department` may be a catalog department ("Data Science DS"), a bare
+        dept_code ("DS") or a subject name ("Data Science"). Without a known
+        `college`, the department's own college is used. Values that match
+        nothing in the catalog come back as None.
+        """
+        self.load()
+        department = (department or "").strip()
+        code = department.split()[-1] if department else ""
+        dept_code = code if code in self.department_colleges else self.subject_codes.get(department.lower())
+        college = (college or "").strip()
+        if college not in self.colleges:
+            college = self.department_colleges.get(dept_code)
+        return dept_code, college
+
+    def record(self, course: Mapping) -> Course:
+        """
+        Catalog record for a course dict from elsewhere (a search hit or an LLM
+        answer), matched by `course_number`. Courses the catalog does not know
+        are normalized on the spot so they carry the same typed fields.
+        """
+        known = self.load()._courses.get(course.get("course_number"))
+        if known is not None:
+            return known
+        return Course.intern(normalize_course(course, self.subject_codes))
+
+    def records(self, courses: List[Mapping]) -> List[Course]:
+        return [self.record(course) for course in courses]
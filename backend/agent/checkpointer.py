@@ -0,0 +1,319 @@
+from collections import OrderedDict, defaultdict
+from typing import Any, Callable, Dict, Optional, Sequence, Tuple
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.serde.base import SerializerProtocol
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+from langgraph.types import Send
+from .catalog import Course, PlannedCourse
+import aiosqlite
+import copy
+import dataclasses
+import os
+import threading
+import time
+import zlib
+
+class BoundedMemorySaver(InMemorySaver):
+    """
+    In-process checkpointer with bounded memory.
+
+    Behaves like LangGraph's `InMemorySaver`, with four limits:
+        - only the latest checkpoint of each thread (and its blobs/writes) is
+          kept, unless `keep_history` is set;
+        - threads idle for longer than `ttl_seconds` are dropped;
+        - at most `max_threads` threads are kept, least recently used first out;
+        - serialized state is capped at `max_bytes`, again evicting the least
+          recently used threads (the thread being written is never evicted).
+
+    `gauges()` reports current usage and eviction counters. State is serialized
+    with `CourseRefSerializer` unless another `serde` is given.
+    """
+
+    def __init__(
+        self,
+        max_threads: int = 1000,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl_seconds: float = 6 * 60 * 60,
+        keep_history: bool = False,
+        clock: Callable[[], float] = time.monotonic,
+        serde: Optional[SerializerProtocol] = None,
+    ):
+        super().__init__(serde=serde or CourseRefSerializer())
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.keep_history = keep_history
+        self.clock = clock
+        self._lock = threading.RLock()
+        # thread_id -> serialized bytes, ordered from least to most recently used.
+        self._usage: "OrderedDict[str, int]" = OrderedDict()
+        self._last_seen: Dict[str, float] = {}
+        self._blob_keys: Dict[str, set] = defaultdict(set)
+        self._write_keys: Dict[str, set] = defaultdict(set)
+        self.total_bytes = 0
+        self.evicted_threads = 0
+        self.expired_threads = 0
+        self.pruned_checkpoints = 0
+
+    def _thread_bytes(self, thread_id: str) -> int:
+        size = 0
+        for checkpoints in self.storage.get(thread_id, {}).values():
+            for checkpoint, metadata, _ in checkpoints.values():
+                size += len(checkpoint[1]) + len(metadata[1])
+        for key in self._blob_keys.get(thread_id, ()):
+            blob = self.blobs.get(key)
+            if blob is not None:
+                size += len(blob[1])
+        for key in self._write_keys.get(thread_id, ()):
+            for _, _, value, _ in self.writes.get(key, {}).values():
+                size += len(value[1])
+        return size
+
+    def _touch(self, thread_id: str):
+        self._last_seen[thread_id] = self.clock()
+        self._usage.move_to_end(thread_id)
+
+    def _account(self, thread_id: str):
+        size = self._thread_bytes(thread_id)
+        self.total_bytes += size - self._usage.get(thread_id, 0)
+        self._usage[thread_id] = size
+        self._touch(thread_id)
+
+    def _drop(self, thread_id: str):
+        self.total_bytes -= self._usage.pop(thread_id, 0)
+        self._last_seen.pop(thread_id, None)
+        self.storage.pop(thread_id, None)
+        for key in self._blob_keys.pop(thread_id, ()):
+            self.blobs.pop(key, None)
+        for key in self._write_keys.pop(thread_id, ()):
+            self.writes.pop(key, None)
+
+    def _expire(self):
+        now = self.clock()
+        while self._usage:
+            thread_id = next(iter(self._usage))
+            if now - self._last_seen[thread_id] <= self.ttl_seconds:
+                break
+            self._drop(thread_id)
+            self.expired_threads += 1
+
+    def _evict(self):
+        self._expire()
+        while len(self._usage) > self.max_threads or (self.total_bytes > self.max_bytes and len(self._usage) > 1):
+            self._drop(next(iter(self._usage)))
+            self.evicted_threads += 1
+
+    def _prune(self, thread_id: str, checkpoint_ns: str, latest_id: str, channel_versions: ChannelVersions):
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        for checkpoint_id in [checkpoint_id for checkpoint_id in checkpoints if checkpoint_id != latest_id]:
+            del checkpoints[checkpoint_id]
+            outer_key = (thread_id, checkpoint_ns, checkpoint_id)
+            self.writes.pop(outer_key, None)
+            self._write_keys[thread_id].discard(outer_key)
+            self.pruned_checkpoints += 1
+        live = {(thread_id, checkpoint_ns, channel, version) for channel, version in channel_versions.items()}
+        stale = [key for key in self._blob_keys[thread_id] if key[1] == checkpoint_ns and key not in live]
+        for key in stale:
+            self.blobs.pop(key, None)
+            self._blob_keys[thread_id].discard(key)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            self._expire()
+            if thread_id not in self._usage:
+                return None
+            self._touch(thread_id)
+            return super().get_tuple(config)
+
+    def list(self, config: Optional[RunnableConfig], **kwargs):
+        if config and config["configurable"]["thread_id"] not in self.storage:
+            return iter(())
+        return super().list(config, **kwargs)
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+            self._blob_keys[thread_id].update((thread_id, checkpoint_ns, channel, version) for channel, version in new_versions.items())
+            if not self.keep_history:
+                self._prune(thread_id, checkpoint_ns, checkpoint["id"], checkpoint["channel_versions"])
+            self._account(thread_id)
+            self._evict()
+            return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        with self._lock:
+            super().put_writes(config, writes, task_id, task_path)
+            self._write_keys[thread_id].add((thread_id, checkpoint_ns, config["configurable"]["checkpoint_id"]))
+            self._account(thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._drop(thread_id)
+
+    def sweep(self):
+        """Drop idle threads now instead of waiting for the next write."""
+        with self._lock:
+            self._evict()
+
+    def gauges(self) -> dict:
+        """Current memory usage and eviction counters."""
+        with self._lock:
+            return {
+                "backend": "memory",
+                "threads": len(self._usage),
+                "checkpoints": sum(len(checkpoints) for thread in self.storage.values() for checkpoints in thread.values()),
+                "bytes": self.total_bytes,
+                "max_threads": self.max_threads,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "keep_history": self.keep_history,
+                "evicted_threads": self.evicted_threads,
+                "expired_threads": self.expired_threads,
+                "pruned_checkpoints": self.pruned_checkpoints,
+            }
+
+
+class CourseRefSerializer(SerializerProtocol):
+    """
+    Wraps a serializer (`JsonPlusSerializer` by default) so interned course records
+    are stored by reference: a catalog `Course` becomes `{"$course": course_number}`
+    and a `PlannedCourse` adds its reason and type. Loading resolves the numbers
+    back to the shared catalog records. Courses outside the catalog keep their
+    fields, so nothing is lost if the catalog changes between restarts.
+
+    Besides dicts, lists and tuples, the walk descends into dataclass state
+    objects and `Send` payloads, since pending fan-out writes carry a whole
+    copy of the state. (Pydantic states dump their courses as plain dicts.)
+    """
+
+    REF = "$course"
+
+    def __init__(self, inner: Optional[SerializerProtocol] = None):
+        self.inner = inner or JsonPlusSerializer()
+
+    def _to_refs(self, value: Any) -> Any:
+        if isinstance(value, Course):
+            return {self.REF: value.course_number} if value.in_catalog else {self.REF: value.course_number, "fields": value.to_dict()}
+        if isinstance(value, PlannedCourse):
+            return {**self._to_refs(value.course), "planned": [value.reason, value.type]}
+        if type(value) is dict:
+            return {key: self._to_refs(item) for key, item in value.items()}
+        if type(value) in (list, tuple):
+            return type(value)(self._to_refs(item) for item in value)
+        return self._map_fields(value, self._to_refs)
+
+    @staticmethod
+    def _map_fields(value: Any, convert: Callable[[Any], Any]) -> Any:
+        """Copy of a `Send` or dataclass with `convert` applied to its fields; other values as is."""
+        if isinstance(value, Send):
+            return Send(value.node, convert(value.arg), timeout=value.timeout)
+        if dataclasses.is_dataclass(value) and not isinstance(value, type):
+            clone = copy.copy(value)
+            for field in dataclasses.fields(value):
+                object.__setattr__(clone, field.name, convert(getattr(value, field.name)))
+            return clone
+        return value
+
+    def _course(self, ref: dict) -> Course:
+        course = Course.lookup(ref[self.REF])
+        if course is None and "fields" not in ref:
+            # Restoring before anything touched the catalog (e.g. a restart with the sqlite backend).
+            from .queryDB import course_catalog
+            course = course_catalog.load().get(ref[self.REF])
+        if course is None:
+            course = Course.intern(ref.get("fields") or {"course_number": ref[self.REF]})
+        return course
+
+    def _from_refs(self, value: Any) -> Any:
+        if type(value) is dict:
+            if self.REF in value:
+                course = self._course(value)
+                if "planned" in value:
+                    return PlannedCourse(course, *value["planned"])
+                return course
+            return {key: self._from_refs(item) for key, item in value.items()}
+        if type(value) in (list, tuple):
+            return type(value)(self._from_refs(item) for item in value)
+        return self._map_fields(value, self._from_refs)
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        return self.inner.dumps_typed(self._to_refs(obj))
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        return self._from_refs(self.inner.loads_typed(data))
+
+class CompressedSerializer(SerializerProtocol):
+    """
+    Wraps a serializer (`CourseRefSerializer` over msgpack by default) and zlib-compresses
+    payloads of at least `min_size` bytes, tagging their type with a `+zlib` suffix so
+    uncompressed rows written earlier still load.
+    """
+
+    SUFFIX = "+zlib"
+
+    def __init__(self, inner: Optional[SerializerProtocol] = None, level: int = 6, min_size: int = 512):
+        self.inner = inner or CourseRefSerializer()
+        self.level = level
+        self.min_size = min_size
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        type_, data = self.inner.dumps_typed(obj)
+        if len(data) < self.min_size:
+            return type_, data
+        return type_ + self.SUFFIX, zlib.compress(data, self.level)
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith(self.SUFFIX):
+            return self.inner.loads_typed((type_[:-len(self.SUFFIX)], zlib.decompress(payload)))
+        return self.inner.loads_typed((type_, payload))
+
+class SqliteCheckpointSaver(AsyncSqliteSaver):
+    """
+    `AsyncSqliteSaver` on a WAL-mode database file, so every uvicorn worker (and
+    every restart) sees the same threads. Open it with `await SqliteCheckpointSaver.open(path)`.
+    """
+
+    def __init__(self, conn: aiosqlite.Connection, path: str, serde: Optional[SerializerProtocol] = None):
+        super().__init__(conn, serde=serde)
+        self.path = path
+
+    @classmethod
+    async def open(cls, path: str, busy_timeout_ms: int = 5000, serde: Optional[SerializerProtocol] = None) -> "SqliteCheckpointSaver":
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = await aiosqlite.connect(path)
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute("PRAGMA synchronous=NORMAL")
+        # Other workers may hold the write lock for a moment; wait instead of failing.
+        await conn.execute(f"PRAGMA busy_timeout={int(busy_timeout_ms)}")
+        saver = cls(conn, path, serde=serde or CompressedSerializer())
+        await saver.setup()
+        return saver
+
+    async def aclose(self):
+        await self.conn.close()
+
+    def gauges(self) -> dict:
+        """On-disk size of the checkpoint database (main file plus WAL)."""
+        size = sum(os.path.getsize(file) for file in (self.path, self.path + "-wal") if os.path.exists(file))
+        return {"backend": "sqlite", "path": self.path, "bytes": size}
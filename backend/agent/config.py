@@ -0,0 +1,66 @@
+from dotenv import load_dotenv
+import os
+
+load_dotenv()
+
+# Upper bound on per-plan LLM calls issued at once by filter_courses_2 (CREDIT_BALANCER=llm only).
+MAX_CONCURRENT_PLAN_CALLS = int(os.getenv("MAX_CONCURRENT_PLAN_CALLS", "4"))
+
+# How filter_courses_2 brings each plan to the credit target: "knapsack" (exact, local) or "llm" (previous prompt).
+CREDIT_BALANCER = os.getenv("CREDIT_BALANCER", "knapsack").lower()
+
+EMBEDDING_MODEL = "text-embedding-3-large"
+
+# In-process LRU size of the shared embedding cache, and an optional SQLite file to persist it.
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "4096"))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")
+
+def _node_set(name: str, default: str) -> frozenset:
+    return frozenset(node.strip() for node in os.getenv(name, default).split(",") if node.strip())
+
+# Nodes whose ChatOpenAI client answers repeated prompts from the LLM response cache, plus its LRU/TTL bounds and optional SQLite file.
+LLM_CACHE_NODES = _node_set("LLM_CACHE_NODES", "check_intent,extract_course_attributes_from_query,rephrase_query_for_planning_schedule,get_attributes_for_short_plan")
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "1024"))
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "")
+
+# Nodes that may also reuse the response of a near-duplicate user query (temperature-0 calls only), and the cosine similarity that counts as one.
+LLM_SEMANTIC_CACHE_NODES = _node_set("LLM_SEMANTIC_CACHE_NODES", "check_intent")
+LLM_SEMANTIC_CACHE_THRESHOLD = float(os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", "0.95"))
+
+# Confidence the local intent classifier must reach before check_intent skips the LLM (above 1 disables it).
+LOCAL_INTENT_CONFIDENCE_THRESHOLD = float(os.getenv("LOCAL_INTENT_CONFIDENCE_THRESHOLD", "0.8"))
+
+# Checkpointer bounds: idle threads are dropped after the TTL, then least recently used ones past the thread/byte caps.
+CHECKPOINT_MAX_THREADS = int(os.getenv("CHECKPOINT_MAX_THREADS", "1000"))
+CHECKPOINT_MAX_MB = float(os.getenv("CHECKPOINT_MAX_MB", "256"))
+CHECKPOINT_TTL_SECONDS = float(os.getenv("CHECKPOINT_TTL_SECONDS", "21600"))
+CHECKPOINT_KEEP_HISTORY = os.getenv("CHECKPOINT_KEEP_HISTORY", "false").lower() in ("1", "true", "yes")
+
+# Where conversation state lives: "memory" (per process, bounded above) or "sqlite" (shared file, survives restarts).
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "memory").lower()
+CHECKPOINT_SQLITE_PATH = os.getenv("CHECKPOINT_SQLITE_PATH", os.path.join(os.getcwd(), "agent", "Checkpoints", "checkpoints.sqlite"))
+
+# Plans computed at once by POST /plans/batch and batch.py (caches are shared across items).
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
+
+# Let concurrent identical planning requests (same parameters, any thread) share one graph run.
+COALESCE_REQUESTS = os.getenv("COALESCE_REQUESTS", "true").lower() in ("1", "true", "yes")
+
+# Graph state class: "dataclass" (no per-node validation; input is validated once in app.get_state) or "pydantic" (validated on every transition).
+STATE_SCHEMA = os.getenv("STATE_SCHEMA", "dataclass").lower()
+
+# How course lists are shown in the planning prompts: "table" (short IDs, one-line summaries) or "json" (full records, as before).
+PROMPT_COURSE_FORMAT = os.getenv("PROMPT_COURSE_FORMAT", "table").lower()
+
+# Token budget for the candidate course list of each planning prompt; candidates are ranked by similarity to the rephrased goal and cut to fit.
+PROMPT_COURSE_TOKEN_BUDGET = int(os.getenv("PROMPT_COURSE_TOKEN_BUDGET", "2500"))
+
+# Nearest-neighbour search over the course collections: "chroma" (the collection's own index, the default), "exact" (in-memory NumPy) or "graph" (in-memory approximate).
+RETRIEVER_BACKEND = os.getenv("RETRIEVER_BACKEND", "chroma").lower()
+
+# Cosine similarity subtracted per search tier away from the student's department when title and course searches merge tiers.
+SEARCH_TIER_PENALTY = float(os.getenv("SEARCH_TIER_PENALTY", "0.05"))
+
+# Sidecar with the ingest-time course summaries and keywords (built by `python -m agent.courseSummaries`).
+COURSE_SUMMARIES_PATH = os.getenv("COURSE_SUMMARIES_PATH", os.path.join(os.getcwd(), "agent", "VectorDB", "course_summaries.json"))
@@ -1,11 +1,12 @@
-from .queryDB import query_database
+from .queryDB import aquery_database
 from .pydanticModels import CourseAttributes,AgentState
 from langchain_openai import ChatOpenAI
+from .llmCache import llm_cache_for, llm_cache_scope
 from langchain_core.messages import AIMessage
 import json
 import re
 
-llm = ChatOpenAI(model = "gpt-4.1-nano")
+llm = ChatOpenAI(model = "gpt-4.1-nano", cache = llm_cache_for("extract_course_attributes_from_query"))
 
 llm_for_course_attributes = llm.with_structured_output(CourseAttributes)
 
@@ -14,12 +15,13 @@ llm_with_json = ChatOpenAI(
     model_kwargs={"response_format": {"type": "json_object"}},
 )
 
-def extract_course_attributes_from_query(state: AgentState):
+async def extract_course_attributes_from_query(state: AgentState):
     """
     Extract course numbers and course titles from a user's query using an LLM parser.
 
     The function parses the user's query for explicit course numbers and general topics,
-    expanding vague topics into specific course titles and appending college and department information.
+    expanding vague topics into specific course titles. College and department are not added to
+    the titles; `get_course_details` applies them as metadata filters on the search instead.
 
     Parameters
     ----------
@@ -34,7 +36,8 @@ def extract_course_attributes_from_query(state: AgentState):
     dict
         Dictionary containing:
         - "course_numbers": List of extracted course numbers (e.g., ["DS5220"]).
-        - "course_titles": List of extracted or expanded course titles with college and department appended.
+        - "course_titles": List of extracted or expanded course titles.
+        - "search_department": Department code the student explicitly asked about, or "".
     """
 
     query = state.query
@@ -47,24 +50,23 @@ def extract_course_attributes_from_query(state: AgentState):
     You are an intelligent parser designed to extract course-related information from user input.
 
     OBJECTIVE:
-    Extract two things from the user's message:
+    Extract three things from the user's message:
     1. Course numbers — formatted as a department code followed by digits (e.g., "DS5220", "CS6220").
     2. Course titles — subject-based or descriptive names, even vague topics.
+    3. Department code — only if the user explicitly asks for courses of a department other than their own.
 
     ---
 
     INSTRUCTIONS:
 
-    - First, check if the user explicitly mentions a college or department in their query.
-    - If yes, use those values instead of the default ones.
-    - If not, default to:
-        - College = "{college}"
-        - Department Code = "{dept_code}"
+    - The student is in College = "{college}", Department Code = "{dept_code}"; searches prefer that department automatically.
+    - If the user explicitly names another department, return its code (e.g., "CS", "LAW") in "department_code", otherwise return "".
 
     - Your final output should be a valid JSON object in the exact format:
     {{
     "course_numbers": [list of strings],
-    "course_titles": [list of strings]
+    "course_titles": [list of strings],
+    "department_code": "string"
     }}
 
     ---
@@ -81,9 +83,7 @@ def extract_course_attributes_from_query(state: AgentState):
     - If a topic is vague (like "AI", "biology", "sports", "business", "law", "ML", "research"):
         - Expand it into exactly 3 specific course titles relevant to that topic.
         - If expansion is unclear, use: "Special Topics in {dept_code}"
-    - For each course title:
-        - Append the college and department code using commas in fromt of course tiltes like below:
-        "Course Title, College, Departemnt"
+    - Return plain course titles; do not append college or department names to them.
 
     3. Do not hallucinate course numbers or department codes.
     4. Return empty lists if nothing valid is found.
@@ -98,7 +98,8 @@ def extract_course_attributes_from_query(state: AgentState):
     Output:
     {{
     "course_numbers": ["DS5220"],
-    "course_titles": ["Gene Editing and Genomics ..."]
+    "course_titles": ["Gene Editing and Genomics"],
+    "department_code": ""
     }}
 
     Input:
@@ -107,10 +108,11 @@ def extract_course_attributes_from_query(state: AgentState):
     {{
     "course_numbers": ["CS5200"],
     "course_titles": [
-        "Computational Biology ...",
-        "Biomedical Data Analytics ...",
-        "Emerging Tech and Innovation ..."
-    ]
+        "Computational Biology",
+        "Biomedical Data Analytics",
+        "Emerging Tech and Innovation"
+    ],
+    "department_code": ""
     }}
 
     Input:
@@ -119,22 +121,24 @@ def extract_course_attributes_from_query(state: AgentState):
     {{
     "course_numbers": ["DS5220"],
     "course_titles": [
-        "Neural Networks and Deep Learning ...",
-        "Ethical AI Systems ...",
-        "AI for Decision Making ..."
-    ]
+        "Neural Networks and Deep Learning",
+        "Ethical AI Systems",
+        "AI for Decision Making"
+    ],
+    "department_code": ""
     }}
 
     Input:
-    "Tell me about courses on law or legal studies."
+    "Tell me about courses from the Law department on legal studies."
     Output:
     {{
     "course_numbers": [],
     "course_titles": [
-        "Constitutional Law and Policy ...",
-        "Criminal Justice Systems ...",
-        "Intellectual Property Law ..."
-    ]
+        "Constitutional Law and Policy",
+        "Criminal Justice Systems",
+        "Intellectual Property Law"
+    ],
+    "department_code": "LAW"
     }}
 
     ---
@@ -145,11 +149,12 @@ def extract_course_attributes_from_query(state: AgentState):
     """
 
 
-    response = llm_for_course_attributes.invoke(prompt)
+    with llm_cache_scope("extract_course_attributes_from_query", semantic_text=query):
+        response = await llm_for_course_attributes.ainvoke(prompt)
 
-    return {"course_numbers":response.course_numbers,"course_titles":response.course_titles}
+    return {"course_numbers":response.course_numbers,"course_titles":response.course_titles,"search_department":response.department_code.strip()}
 
-def get_course_details(state:AgentState):
+async def get_course_details(state:AgentState):
     """
     Query the course database for detailed course information based on course numbers or titles.
 
@@ -159,6 +164,10 @@ def get_course_details(state:AgentState):
         The current state containing:
         - course_numbers : List of course numbers extracted from user query.
         - course_titles : List of course titles extracted from user query.
+        - college, department : the student's college and department; title matches
+          come from that department first, then the college, then the rest of the catalog.
+        - search_department : a department code named in the query, searched first
+          (together with its own college) instead of the student's department.
 
     Returns
     -------
@@ -170,7 +179,12 @@ def get_course_details(state:AgentState):
     course_numbers = state.course_numbers
     course_titles = state.course_titles
     
-    response = query_database(course_numbers=course_numbers,course_titles=course_titles)
+    if state.search_department:
+        college, department = "", state.search_department
+    else:
+        college, department = state.college, state.department
+
+    response = await aquery_database(course_numbers=course_numbers,course_titles=course_titles,college=college,department=department)
 
     return {
         "courses_from_users_query": response,
@@ -0,0 +1,296 @@
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import heapq
+import threading
+import numpy as np
+
+# A search hit: the stored document text and its metadata, as Chroma returns them.
+Hit = Tuple[str, Dict[str, Any]]
+# A search hit with the cosine similarity of its row to the query.
+ScoredHit = Tuple[float, str, Dict[str, Any]]
+
+def where_mask(where: Optional[Dict[str, Any]], metadatas: Sequence[Dict[str, Any]]) -> np.ndarray:
+    """
+    Rows of `metadatas` matching a Chroma `where` filter.
+
+    Supports the subset of Chroma's filter language the search cascade uses:
+    `{"field": value}`, `{"field": {"$eq" | "$ne" | "$in" | "$nin": value}}`
+    and `$and` / `$or` over lists of filters. None matches every row.
+    """
+    if not where:
+        return np.ones(len(metadatas), dtype=bool)
+    mask = np.ones(len(metadatas), dtype=bool)
+    for key, condition in where.items():
+        if key in ("$and", "$or"):
+            parts = [where_mask(part, metadatas) for part in condition]
+            mask &= np.logical_and.reduce(parts) if key == "$and" else np.logical_or.reduce(parts)
+            continue
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        values = [meta.get(key) for meta in metadatas]
+        for operator, value in condition.items():
+            if operator == "$eq":
+                mask &= np.fromiter((item == value for item in values), dtype=bool, count=len(values))
+            elif operator == "$ne":
+                mask &= np.fromiter((item != value for item in values), dtype=bool, count=len(values))
+            elif operator == "$in":
+                mask &= np.fromiter((item in value for item in values), dtype=bool, count=len(values))
+            elif operator == "$nin":
+                mask &= np.fromiter((item not in value for item in values), dtype=bool, count=len(values))
+            else:
+                raise ValueError(f"Unsupported filter operator {operator!r}")
+    return mask
+
+class ChromaRetriever:
+    """Nearest-neighbour search in the Chroma collection itself (its on-disk HNSW index)."""
+
+    def __init__(self, database):
+        self.database = database
+
+    def load(self):
+        return self
+
+    def __len__(self):
+        return self.database._collection.count()
+
+    def query(self, vectors: List[List[float]], k: int, where: Optional[Dict[str, Any]] = None) -> List[List[Hit]]:
+        """Top `k` hits per query embedding among the rows matching `where`."""
+        return [[(document, meta) for _, document, meta in hits] for hits in self.query_scored(vectors, k, where)]
+
+    def query_scored(self, vectors: List[List[float]], k: int, where: Optional[Dict[str, Any]] = None) -> List[List[ScoredHit]]:
+        """
+        Like `query`, with each hit's cosine similarity. Chroma returns distances
+        in the collection's space; for the (unit-length) OpenAI embeddings a
+        squared L2 distance d is a similarity of 1 - d/2, a cosine or inner
+        product distance d one of 1 - d.
+        """
+        if not vectors:
+            return []
+        results = self.database._collection.query(query_embeddings=vectors, n_results=k, where=where, include=["documents", "metadatas", "distances"])
+        scale = 0.5 if self._space() == "l2" else 1.0
+        return [
+            [(1.0 - scale * distance, document, meta) for document, meta, distance in zip(documents, metadatas, distances)]
+            for documents, metadatas, distances in zip(results["documents"], results["metadatas"], results["distances"])
+        ]
+
+    def _space(self) -> str:
+        collection = self.database._collection
+        space = (collection.metadata or {}).get("hnsw:space")
+        if space is None:
+            space = ((getattr(collection, "configuration", None) or {}).get("hnsw") or {}).get("space")
+        return space or "l2"
+
+class ExactRetriever:
+    """
+    Exact cosine search over an in-memory copy of a Chroma collection.
+
+    Embeddings, documents and metadata are read from the collection once (at
+    startup or on first use); the rows are L2-normalised, so a batch of
+    queries is one matrix product. Metadata filters become boolean row masks,
+    cached per filter, since the cascade repeats the same few filters.
+
+    With an `index` (`embeddingIndex.CourseEmbeddingIndex`) that covers the
+    collection, the rows are a view of its matrix rather than a second copy.
+    """
+
+    def __init__(self, database, index=None):
+        self.database = database
+        self.index = index
+        self._lock = threading.Lock()
+        self._matrix = None
+        self._hits: List[Hit] = []
+        self._masks: Dict[str, np.ndarray] = {}
+
+    @property
+    def loaded(self) -> bool:
+        return self._matrix is not None
+
+    def load(self):
+        """Read the collection into memory (idempotent)."""
+        if self._matrix is not None:
+            return self
+        with self._lock:
+            if self._matrix is not None:
+                return self
+            if self.index is not None:
+                matrix, self._hits = self.index.collection(self.database)
+            else:
+                data = self.database.get(include=["embeddings", "documents", "metadatas"])
+                matrix = np.asarray(data["embeddings"], dtype=np.float32).reshape(len(data["metadatas"]), -1) if data["metadatas"] else np.zeros((0, 0), dtype=np.float32)
+                self._hits = list(zip(data["documents"], data["metadatas"]))
+                matrix = matrix / np.maximum(np.linalg.norm(matrix, axis=1, keepdims=True), 1e-10)
+            self._build(matrix)
+            self._matrix = matrix
+        return self
+
+    def _build(self, matrix: np.ndarray):
+        """Hook for subclasses that index the normalised rows."""
+
+    def __len__(self):
+        return len(self.load()._hits)
+
+    def mask(self, where: Optional[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Row mask of a filter, or None for no filter."""
+        if not where:
+            return None
+        key = repr(sorted(where.items()))
+        if key not in self._masks:
+            self._masks[key] = where_mask(where, [meta for _, meta in self._hits])
+        return self._masks[key]
+
+    @staticmethod
+    def _normalise(vectors) -> np.ndarray:
+        queries = np.asarray(vectors, dtype=np.float32)
+        return queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-10)
+
+    def query(self, vectors: List[List[float]], k: int, where: Optional[Dict[str, Any]] = None) -> List[List[Hit]]:
+        """Top `k` hits per query embedding among the rows matching `where`."""
+        return [[(document, meta) for _, document, meta in hits] for hits in self.query_scored(vectors, k, where)]
+
+    def query_scored(self, vectors: List[List[float]], k: int, where: Optional[Dict[str, Any]] = None) -> List[List[ScoredHit]]:
+        """Like `query`, with each hit's cosine similarity."""
+        self.load()
+        if not len(vectors):
+            return []
+        if not self._hits:
+            return [[] for _ in vectors]
+        return self._scored_hits(self._top_k(self._normalise(vectors), self.mask(where), k))
+
+    def _scored_hits(self, ranked: List[Tuple[np.ndarray, np.ndarray]]) -> List[List[ScoredHit]]:
+        return [[(score, *self._hits[row]) for row, score in zip(rows.tolist(), scores.tolist())] for rows, scores in ranked]
+
+    def _top_k(self, queries: np.ndarray, allowed: Optional[np.ndarray], k: int) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Best `k` allowed rows for each query and their similarities, most
+        similar first. Narrow masks score only their rows; wide ones score
+        every row and drop the rest, which avoids copying most of the matrix.
+        """
+        if allowed is None or allowed.sum() > len(allowed) // 2:
+            rows = np.arange(len(self._hits))
+            scores = queries @ self._matrix.T
+            if allowed is not None:
+                rows = rows[allowed]
+                scores = scores[:, allowed]
+        else:
+            rows = np.flatnonzero(allowed)
+            scores = queries @ self._matrix[rows].T
+        if not len(rows):
+            return [(rows, rows.astype(np.float32)) for _ in queries]
+        k = min(k, len(rows))
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(scores, top, axis=1).argsort(axis=1)[:, ::-1]
+        top = np.take_along_axis(top, order, axis=1)
+        return list(zip(rows[top], np.take_along_axis(scores, top, axis=1)))
+
+class GraphRetriever(ExactRetriever):
+    """
+    Approximate search on a navigable neighbour graph built in memory.
+
+    Each row is linked to its `neighbors` most similar rows (computed exactly
+    at load time in blocks of `BUILD_BLOCK` rows) and to the rows that link
+    to it, capped at twice `neighbors` edges per node. A query scores a
+    routing sample of about sqrt(n) rows, starts from the best few, and runs a
+    best-first beam search with `ef` candidates, scoring only the unvisited
+    neighbours of each expanded node.
+
+    Filters that keep at most `exact_fraction` of the rows (the department
+    tier) are searched exactly over those rows, which is cheaper than
+    walking a graph where most nodes are filtered out. Wider filters walk
+    the whole graph and keep only matching rows as results.
+    """
+
+    BUILD_BLOCK = 1024
+
+    def __init__(self, database, index=None, neighbors: int = 32, ef: int = 64, exact_fraction: float = 0.2, seed: int = 0):
+        super().__init__(database, index)
+        self.neighbors = neighbors
+        self.ef = ef
+        self.exact_fraction = exact_fraction
+        self.seed = seed
+        self._graph: List[np.ndarray] = []
+        self._routing = np.empty(0, dtype=np.int64)
+
+    def _build(self, matrix: np.ndarray):
+        count = len(matrix)
+        neighbors = min(self.neighbors, max(count - 1, 0))
+        if not neighbors:
+            self._graph = [np.empty(0, dtype=np.int64) for _ in range(count)]
+            self._routing = np.arange(count)
+            return
+        nearest = np.empty((count, neighbors), dtype=np.int64)
+        for start in range(0, count, self.BUILD_BLOCK):
+            scores = matrix[start:start + self.BUILD_BLOCK] @ matrix.T
+            scores[np.arange(len(scores)), np.arange(start, start + len(scores))] = -np.inf
+            nearest[start:start + len(scores)] = np.argpartition(-scores, neighbors - 1, axis=1)[:, :neighbors]
+
+        linked = [set(row) for row in nearest.tolist()]
+        for node, row in enumerate(nearest.tolist()):
+            for other in row:
+                linked[other].add(node)
+        graph = []
+        for node, edges in enumerate(linked):
+            edges = np.fromiter(edges, dtype=np.int64, count=len(edges))
+            if len(edges) > 2 * neighbors:
+                edges = edges[np.argsort(-(matrix[edges] @ matrix[node]))[:2 * neighbors]]
+            graph.append(edges)
+        self._graph = graph
+        rng = np.random.default_rng(self.seed)
+        self._routing = np.sort(rng.choice(count, size=max(1, int(np.sqrt(count))), replace=False))
+
+    def query_scored(self, vectors: List[List[float]], k: int, where: Optional[Dict[str, Any]] = None) -> List[List[ScoredHit]]:
+        """Approximate top `k` hits per query embedding among the rows matching `where`, with their similarities."""
+        self.load()
+        if not len(vectors):
+            return []
+        if not self._hits:
+            return [[] for _ in vectors]
+        queries = self._normalise(vectors)
+        allowed = self.mask(where)
+        if allowed is not None and allowed.sum() <= self.exact_fraction * len(allowed):
+            return self._scored_hits(self._top_k(queries, allowed, k))
+        return self._scored_hits([self._search(query, k, allowed) for query in queries])
+
+    def _search(self, query: np.ndarray, k: int, allowed: Optional[np.ndarray]) -> Tuple[np.ndarray, np.ndarray]:
+        if not len(self._graph):
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        ef = max(self.ef, k)
+        visited = np.zeros(len(self._graph), dtype=bool)
+        # Max-heap of nodes to expand and min-heap of the best `ef` allowed nodes found so far.
+        candidates: List[Tuple[float, int]] = []
+        found: List[Tuple[float, int]] = []
+
+        def visit(nodes: np.ndarray):
+            visited[nodes] = True
+            for score, node in zip((self._matrix[nodes] @ query).tolist(), nodes.tolist()):
+                if len(found) < ef or score > found[0][0]:
+                    heapq.heappush(candidates, (-score, node))
+                    if allowed is None or allowed[node]:
+                        heapq.heappush(found, (score, node))
+                        if len(found) > ef:
+                            heapq.heappop(found)
+
+        routing_scores = self._matrix[self._routing] @ query
+        visit(self._routing[np.argsort(-routing_scores)[:4]])
+        while candidates:
+            negative_score, node = heapq.heappop(candidates)
+            if len(found) >= ef and -negative_score < found[0][0]:
+                break
+            edges = self._graph[node]
+            edges = edges[~visited[edges]]
+            if len(edges):
+                visit(edges)
+        best = sorted(found, reverse=True)[:k]
+        return np.array([node for _, node in best], dtype=np.int64), np.array([score for score, _ in best], dtype=np.float32)
+
+# Retriever classes selectable with RETRIEVER_BACKEND.
+RETRIEVER_BACKENDS = {"chroma": ChromaRetriever, "exact": ExactRetriever, "graph": GraphRetriever}
+
+def make_retriever(database, backend: str, index=None):
+    """
+    Retriever of the named backend over a Chroma collection. The in-memory
+    backends search the collection's rows of `index` when one is given.
+    """
+    if backend not in RETRIEVER_BACKENDS:
+        raise ValueError(f"Unknown retriever backend {backend!r}; expected one of {sorted(RETRIEVER_BACKENDS)}")
+    if backend == "chroma":
+        return ChromaRetriever(database)
+    return RETRIEVER_BACKENDS[backend](database, index=index)
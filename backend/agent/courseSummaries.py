@@ -0,0 +1,236 @@
+"""
+Ingest-time course summaries and keywords.
+
+Every course gets a one-line `summary` and a short `keywords` list, computed
+once when the catalog is ingested and stored in a JSON sidecar next to the
+Chroma collections (`COURSE_SUMMARIES_PATH`):
+
+    {
+      "version": 1,                    # SUMMARY_VERSION of the format
+      "catalog_version": "3f2a...",    # hash of every course's title + description
+      "summarizer": "extractive",      # or "llm:gpt-4.1-nano"
+      "courses": {"DS5220": {"source": "<title+description hash>",
+                             "summary": "...", "keywords": ["...", ...]}}
+    }
+
+`CourseCatalog.load` attaches the entries whose `source` hash still matches
+the course; courses the sidecar does not cover (or covers for an older
+description) get an extractive summary and keywords at load time instead,
+so request-time code never summarizes.
+
+Build or refresh the sidecar from the `backend` directory:
+
+    python -m agent.courseSummaries                  # extractive, no API calls
+    python -m agent.courseSummaries --llm            # gpt-4.1-nano summaries
+    python -m agent.courseSummaries --from-json ../testing/database.json
+"""
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import re
+
+# Bump when the summary or keyword format changes; sidecars of another version are ignored.
+SUMMARY_VERSION = 1
+
+# Longest extractive summary, and keywords kept per course.
+SUMMARY_CHARS = 140
+KEYWORD_COUNT = 6
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+(?=[A-Z])")
+WORD = re.compile(r"[a-z][a-z\-]+")
+STOPWORDS = frozenset("""
+    a about across after all also an and any are as at be been both but by can course courses covers
+    credit credits do does each either etc for from has have how in include includes including into is
+    it its may more most new not of offers on one or other over per requires same several should
+    students student study such than that the their them then these they this those through to topics
+    two use used uses using various via what when which while who will with within
+""".split())
+
+def description_hash(course: Dict[str, Any]) -> str:
+    """Hash of the text a course's summary is derived from (title and description)."""
+    text = f"{course.get('title', '')}\0{course.get('description', '')}"
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+def catalog_version(courses: Iterable[Dict[str, Any]]) -> str:
+    """Hash identifying the summarized text of a whole catalog."""
+    digest = hashlib.sha256()
+    for course_number, source in sorted((course["course_number"], description_hash(course)) for course in courses):
+        digest.update(f"{course_number}:{source}\n".encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+@lru_cache(maxsize=8192)
+def summarize_description(description: str, max_chars: int = SUMMARY_CHARS) -> str:
+    """
+    Extractive summary: the first sentence of a description on one line, cut
+    at a word boundary to at most `max_chars`.
+    """
+    text = " ".join(description.split())
+    summary = SENTENCE_END.split(text, maxsplit=1)[0]
+    if len(summary) > max_chars:
+        summary = summary[:max_chars].rsplit(" ", 1)[0].rstrip(",;:") + "..."
+    return summary
+
+def _terms(text: str) -> List[str]:
+    words = [word.strip("-") for word in WORD.findall(text.lower())]
+    words = [word if word not in STOPWORDS and len(word) > 2 else None for word in words]
+    bigrams = [f"{first} {second}" for first, second in zip(words, words[1:]) if first and second]
+    return [word for word in words if word] + bigrams
+
+def extract_keywords(courses: List[Dict[str, Any]], count: int = KEYWORD_COUNT) -> Dict[str, Tuple[str, ...]]:
+    """
+    TF-IDF keywords (words and two-word phrases) of every course's title and
+    description, with the IDF taken over `courses`. Title terms count double;
+    a single word is dropped once a chosen phrase contains it.
+    """
+    documents = {
+        course["course_number"]: Counter(_terms(course.get("title", "")) * 2 + _terms(course.get("description", "")))
+        for course in courses
+    }
+    frequency = Counter(term for terms in documents.values() for term in terms)
+    keywords = {}
+    for course_number, terms in documents.items():
+        ranked = sorted(terms, key=lambda term: (-terms[term] * math.log(len(documents) / frequency[term]), term))
+        chosen: List[str] = []
+        for term in ranked:
+            if len(chosen) == count:
+                break
+            if any(term in phrase.split() for phrase in chosen if " " in phrase):
+                continue
+            if " " in term:
+                chosen = [word for word in chosen if word not in term.split()]
+            chosen.append(term)
+        keywords[course_number] = tuple(chosen)
+    return keywords
+
+def build_sidecar(courses: List[Dict[str, Any]], summaries: Optional[Dict[str, Dict[str, Any]]] = None,
+                  summarizer: str = "extractive") -> Dict[str, Any]:
+    """
+    Sidecar document for `courses`. `summaries` (course_number -> summary and
+    keywords, e.g. from `llm_summaries`) take precedence; everything else is
+    extractive.
+    """
+    summaries = summaries or {}
+    keywords = extract_keywords(courses)
+    entries = {}
+    for course in courses:
+        course_number = course["course_number"]
+        given = summaries.get(course_number, {})
+        entries[course_number] = {
+            "source": description_hash(course),
+            "summary": given.get("summary") or summarize_description(course.get("description") or ""),
+            "keywords": list(given.get("keywords") or keywords[course_number]),
+        }
+    return {
+        "version": SUMMARY_VERSION,
+        "catalog_version": catalog_version(courses),
+        "summarizer": summarizer,
+        "courses": entries,
+    }
+
+def load_sidecar(path: Optional[str]) -> Optional[Dict[str, Any]]:
+    """The sidecar at `path`, or None when it is missing, unreadable or of another SUMMARY_VERSION."""
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        with open(path) as f:
+            sidecar = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return sidecar if sidecar.get("version") == SUMMARY_VERSION else None
+
+def attach_summaries(courses: List[Dict[str, Any]], sidecar: Optional[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+    """
+    Copies of `courses` with `summary` and `keywords` set: from the sidecar
+    where its entry matches the course's current text, otherwise computed
+    extractively here.
+
+    Returns:
+        tuple: (courses, {"stored": n, "computed": m}).
+    """
+    entries = (sidecar or {}).get("courses", {})
+    fresh = {
+        course["course_number"] for course in courses
+        if entries.get(course["course_number"], {}).get("source") == description_hash(course)
+    }
+    computed = extract_keywords(courses) if len(fresh) < len(courses) else {}
+    attached = []
+    for course in courses:
+        course_number = course["course_number"]
+        if course_number in fresh:
+            entry = entries[course_number]
+            summary, keywords = entry["summary"], tuple(entry["keywords"])
+        else:
+            summary, keywords = summarize_description(course.get("description") or ""), computed[course_number]
+        attached.append({**course, "summary": summary, "keywords": keywords})
+    return attached, {"stored": len(fresh), "computed": len(courses) - len(fresh)}
+
+async def llm_summaries(courses: List[Dict[str, Any]], concurrency: int = 8) -> Dict[str, Dict[str, Any]]:
+    """One gpt-4.1-nano call per course for an abstractive summary and keywords; failed calls are left out."""
+    from langchain_openai import ChatOpenAI
+    from .utils import gather_with_concurrency
+
+    llm = ChatOpenAI(model="gpt-4.1-nano", model_kwargs={"response_format": {"type": "json_object"}}, temperature=0)
+
+    async def summarize(course):
+        prompt = f"""Summarize this graduate course for a course-planning assistant.
+
+        Return JSON only: {{"summary": "<one sentence, at most 25 words>", "keywords": ["<3 to {KEYWORD_COUNT} topic keywords>"]}}
+
+        Course: {course['course_number']} - {course.get('title', '')}
+        Description: {course.get('description', '')}
+        """
+        try:
+            response = json.loads((await llm.ainvoke(prompt)).content)
+            return course["course_number"], {"summary": str(response["summary"]).strip(), "keywords": [str(k) for k in response["keywords"]][:KEYWORD_COUNT]}
+        except Exception:
+            return course["course_number"], None
+
+    results = await gather_with_concurrency(concurrency, [summarize(course) for course in courses])
+    return {course_number: entry for course_number, entry in results if entry}
+
+def main():
+    from .config import COURSE_SUMMARIES_PATH
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--out", default=COURSE_SUMMARIES_PATH, help="Sidecar file to write")
+    parser.add_argument("--from-json", help="Read courses from a JSON export instead of the Chroma collections")
+    parser.add_argument("--llm", action="store_true", help="Summarize with gpt-4.1-nano (needs OPENAI_API_KEY)")
+    parser.add_argument("--concurrency", type=int, default=8, help="LLM calls in flight with --llm")
+    args = parser.parse_args()
+
+    if args.from_json:
+        with open(args.from_json) as f:
+            unique = {}
+            for course in json.load(f):
+                unique.setdefault(course["course_number"], course)
+            courses = list(unique.values())
+    else:
+        from .queryDB import course_catalog
+        courses = course_catalog.raw_courses()
+
+    previous = load_sidecar(args.out)
+    summaries, summarizer = {}, "extractive"
+    if args.llm:
+        summarizer = "llm:gpt-4.1-nano"
+        # Only courses whose text changed since the previous LLM run are sent again.
+        reuse = (previous or {}).get("courses", {}) if (previous or {}).get("summarizer") == summarizer else {}
+        summaries = {
+            course["course_number"]: reuse[course["course_number"]] for course in courses
+            if reuse.get(course["course_number"], {}).get("source") == description_hash(course)
+        }
+        summaries.update(asyncio.run(llm_summaries([course for course in courses if course["course_number"] not in summaries], args.concurrency)))
+
+    sidecar = build_sidecar(courses, summaries, summarizer)
+    os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+    with open(args.out, "w") as f:
+        json.dump(sidecar, f, indent=1)
+    print(f"Wrote {len(sidecar['courses'])} course summaries ({summarizer}, catalog {sidecar['catalog_version']}) to {args.out}")
+
+if __name__ == "__main__":
+    main()
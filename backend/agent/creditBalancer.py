@@ -0,0 +1,84 @@
+import math
+from typing import Dict, List, Optional, Tuple
+from .catalog import course_credits
+
+def balance_plan_credits(
+    plan: List[dict],
+    candidates: List[dict],
+    relevance: Dict[str, float],
+    target_credits: int,
+) -> Optional[List[dict]]:
+    """
+    Exact-credit knapsack over a plan's electives and the candidate pool.
+
+    Picks the subset of `plan` + `candidates` whose credits sum to
+    `target_credits`, preferring, in this order:
+        1. keeping as many of the plan's current electives as possible, so a
+           REMOVE drops the fewest courses and an ADD keeps the whole plan;
+        2. the highest credit-weighted relevance, so the lowest-relevance
+           electives are dropped first and the most relevant candidates are added.
+
+    The table is indexed by whole credits, so plan electives with fractional or
+    zero credits (0.5, 4.5) are kept as they are and their credits are taken off
+    the target; such candidates are never added.
+
+    When no subset hits the target exactly, the smallest reachable total above
+    it is used (the old acceptance rule was core + electives >= max_credits),
+    and failing that the largest one below it.
+
+    Args:
+        plan (list): The plan's current electives.
+        candidates (list): Courses that may be added (not in the plan, not core).
+        relevance (dict): course_number -> similarity to the student's goal.
+        target_credits (int): Elective credits the plan should carry.
+
+    Returns:
+        list | None: Kept electives in their original order followed by the added
+        ones by relevance, or None when there is nothing to choose from.
+    """
+    def whole(credits) -> bool:
+        return credits > 0 and credits == int(credits)
+
+    fixed = {course["course_number"] for course in plan if not whole(course_credits(course))}
+    target_credits = math.ceil(target_credits - sum(course_credits(course) for course in plan if course["course_number"] in fixed))
+    items: List[Tuple[dict, int, bool]] = [
+        (course, int(course_credits(course)), True) for course in plan if course["course_number"] not in fixed
+    ]
+    seen = {course["course_number"] for course in plan}
+    for course in sorted(candidates, key=lambda course: -relevance.get(course["course_number"], 0.0)):
+        if course["course_number"] not in seen and whole(course_credits(course)):
+            seen.add(course["course_number"])
+            items.append((course, int(course_credits(course)), False))
+    if not items:
+        return None
+
+    capacity = max(target_credits, 0) + max(credits for _, credits, _ in items)
+    # best[c] = (kept plan courses, credit-weighted relevance) of the best subset totalling c credits.
+    best: List[Optional[Tuple[int, float]]] = [None] * (capacity + 1)
+    best[0] = (0, 0.0)
+    choice: List[List[bool]] = []
+    for course, credits, in_plan in items:
+        gain = (int(in_plan), credits * relevance.get(course["course_number"], 0.0))
+        taken = [False] * (capacity + 1)
+        for total in range(capacity, credits - 1, -1):
+            previous = best[total - credits]
+            if previous is None:
+                continue
+            value = (previous[0] + gain[0], previous[1] + gain[1])
+            if best[total] is None or value > best[total]:
+                best[total] = value
+                taken[total] = True
+        choice.append(taken)
+
+    # 0 (the empty subset) is reachable too, so a target of 0 or less keeps only the fixed electives.
+    reachable = [total for total in range(capacity + 1) if best[total] is not None]
+    above = [total for total in reachable if total >= target_credits]
+    total = min(above) if above else max(reachable)
+
+    picked = set()
+    for idx in range(len(items) - 1, -1, -1):
+        if choice[idx][total]:
+            picked.add(items[idx][0]["course_number"])
+            total -= items[idx][1]
+    kept = [course for course in plan if course["course_number"] in fixed or course["course_number"] in picked]
+    return kept + [course for course, _, in_plan in items if not in_plan and course["course_number"] in picked]
@@ -0,0 +1,141 @@
+from collections import OrderedDict
+from typing import List, Optional
+from langchain_core.embeddings import Embeddings
+from langchain_openai.embeddings import OpenAIEmbeddings
+from .config import EMBEDDING_MODEL, EMBEDDING_CACHE_SIZE, EMBEDDING_CACHE_PATH
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import numpy as np
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embedding provider with an in-process LRU and an optional on-disk store.
+
+    Entries are keyed by (model, sha256(text)). Lookups go LRU → disk → API; 
+    all misses of one call are embedded in a single batch and written back 
+    to both layers. Hit/miss counters are exposed through `stats()`.
+    """
+
+    def __init__(self, underlying: Embeddings, model: str, max_entries: int = 4096, store_path: Optional[str] = None):
+        self.underlying = underlying
+        self.model = model
+        self.max_entries = max_entries
+        self._lru = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._store = None
+        if store_path:
+            os.makedirs(os.path.dirname(os.path.abspath(store_path)), exist_ok=True)
+            self._store = sqlite3.connect(store_path, check_same_thread=False)
+            self._store.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, model TEXT, vector BLOB)")
+            self._store.commit()
+
+    def _key(self, text: str) -> str:
+        return hashlib.sha256(f"{self.model}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key: str, vector: List[float]):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def _lookup(self, keys: List[str]) -> List[Optional[List[float]]]:
+        vectors = [None] * len(keys)
+        on_disk = []
+        with self._lock:
+            for idx, key in enumerate(keys):
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    self.hits += 1
+                    vectors[idx] = vector
+                elif self._store is not None:
+                    on_disk.append(idx)
+            if on_disk:
+                wanted = list({keys[idx] for idx in on_disk})
+                placeholders = ",".join("?" * len(wanted))
+                rows = self._store.execute(f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", wanted).fetchall()
+                stored = {key: np.frombuffer(blob, dtype=np.float32).tolist() for key, blob in rows}
+                for idx in on_disk:
+                    vector = stored.get(keys[idx])
+                    if vector is not None:
+                        self.disk_hits += 1
+                        self._remember(keys[idx], vector)
+                        vectors[idx] = vector
+        return vectors
+
+    def _save(self, keys: List[str], vectors: List[List[float]]):
+        with self._lock:
+            self.misses += len(keys)
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector)
+            if self._store is not None:
+                self._store.executemany(
+                    "INSERT OR REPLACE INTO embeddings (key, model, vector) VALUES (?, ?, ?)",
+                    [(key, self.model, np.asarray(vector, dtype=np.float32).tobytes()) for key, vector in zip(keys, vectors)]
+                )
+                self._store.commit()
+
+    def _misses(self, texts: List[str], keys: List[str], vectors: List[Optional[List[float]]]):
+        missing = {}
+        for idx, vector in enumerate(vectors):
+            if vector is None:
+                missing.setdefault(keys[idx], texts[idx])
+        return list(missing.keys()), list(missing.values())
+
+    def _fill(self, keys: List[str], vectors: List[Optional[List[float]]], new_keys: List[str], new_vectors: List[List[float]]):
+        fresh = dict(zip(new_keys, new_vectors))
+        return [vector if vector is not None else fresh[key] for key, vector in zip(keys, vectors)]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        vectors = self._lookup(keys)
+        new_keys, new_texts = self._misses(texts, keys, vectors)
+        new_vectors = []
+        if new_texts:
+            new_vectors = self.underlying.embed_documents(new_texts)
+            self._save(new_keys, new_vectors)
+        return self._fill(keys, vectors, new_keys, new_vectors)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        vectors = await asyncio.to_thread(self._lookup, keys) if self._store is not None else self._lookup(keys)
+        new_keys, new_texts = self._misses(texts, keys, vectors)
+        new_vectors = []
+        if new_texts:
+            new_vectors = await self.underlying.aembed_documents(new_texts)
+            if self._store is not None:
+                await asyncio.to_thread(self._save, new_keys, new_vectors)
+            else:
+                self._save(new_keys, new_vectors)
+        return self._fill(keys, vectors, new_keys, new_vectors)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        return (await self.aembed_documents([text]))[0]
+
+    def stats(self) -> dict:
+        """Hit/miss counters and current LRU size."""
+        return {
+            "model": self.model,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "entries": len(self._lru),
+            "max_entries": self.max_entries,
+            "persistent": self._store is not None,
+        }
+
+embeddings = CachedEmbeddings(
+    OpenAIEmbeddings(model=EMBEDDING_MODEL),
+    model=EMBEDDING_MODEL,
+    max_entries=EMBEDDING_CACHE_SIZE,
+    store_path=EMBEDDING_CACHE_PATH or None,
+)
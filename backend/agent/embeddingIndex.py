@@ -0,0 +1,111 @@
+from typing import Any, Dict, List, Tuple
+import threading
+import numpy as np
+from .embeddingCache import embeddings
+
+def course_to_text(course: Dict) -> str:
+    """Text used to embed a course that is missing from the stored collections."""
+    return f"{course['course_number']} - {course['title']} - {course['description']}"
+
+class CourseEmbeddingIndex:
+    """
+    In-memory matrix of the course embeddings already stored in Chroma.
+
+    Rows are L2-normalised and keyed by `course_number`, so cosine similarity 
+    against any subset of courses is a single matrix-vector product. The 
+    matrix is read from the collections once (at startup or on first use); 
+    only query strings have to be embedded at request time.
+
+    Every row of every collection is kept, one collection after another, so
+    the in-memory retrievers (`courseRetriever`) search views of this matrix
+    (`collection`) instead of loading their own copy. Lookups by
+    `course_number` use its first row.
+    """
+
+    def __init__(self, databases):
+        self._databases = databases
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._spans: List[Tuple[int, int]] = []
+        self._hits: List[Tuple[str, Dict[str, Any]]] = []
+        self._matrix = None
+
+    @property
+    def loaded(self) -> bool:
+        return self._matrix is not None
+
+    def load(self):
+        """Read all stored embeddings from the collections into the matrix (idempotent)."""
+        if self._matrix is not None:
+            return self
+        with self._lock:
+            if self._matrix is not None:
+                return self
+            rows = {}
+            spans = []
+            hits = []
+            vectors = []
+            for database in self._databases:
+                data = database.get(include=["embeddings", "documents", "metadatas"])
+                start = len(vectors)
+                for vector, document, meta in zip(data["embeddings"], data["documents"], data["metadatas"]):
+                    rows.setdefault(meta["course_number"], len(vectors))
+                    hits.append((document, meta))
+                    vectors.append(vector)
+                spans.append((start, len(vectors)))
+            # No stored rows (empty collections): every course is embedded on demand in `similarities`.
+            matrix = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), -1) if vectors else np.zeros((0, 0), dtype=np.float32)
+            norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+            self._rows = rows
+            self._spans = spans
+            self._hits = hits
+            self._matrix = matrix / np.maximum(norms, 1e-10)
+        return self
+
+    def collection(self, database) -> Tuple[np.ndarray, List[Tuple[str, Dict[str, Any]]]]:
+        """The rows of one of the indexed collections: a view of the matrix and their (document, metadata)."""
+        self.load()
+        start, stop = self._spans[next(idx for idx, indexed in enumerate(self._databases) if indexed is database)]
+        return self._matrix[start:stop], self._hits[start:stop]
+
+    def __len__(self):
+        return len(self._rows)
+
+    def __contains__(self, course_number: str) -> bool:
+        self.load()
+        return course_number in self._rows
+
+    def vector(self, course_number: str):
+        """Return the normalised stored vector for a course, or None if it is not indexed."""
+        self.load()
+        row = self._rows.get(course_number)
+        return None if row is None else self._matrix[row]
+
+    async def similarities(self, query_vector, courses: List[Dict]) -> np.ndarray:
+        """
+        Cosine similarity between `query_vector` and each course in `courses`.
+
+        Indexed courses are scored with one matrix-vector product over their 
+        rows. Courses missing from the collections are embedded in a single 
+        batch as a fallback.
+
+        Returns:
+            np.ndarray: One score per course, aligned with `courses`.
+        """
+        self.load()
+        query = np.asarray(query_vector, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-10)
+
+        scores = np.empty(len(courses), dtype=np.float32)
+        positions = [idx for idx, course in enumerate(courses) if course["course_number"] in self._rows]
+        if positions:
+            rows = [self._rows[courses[idx]["course_number"]] for idx in positions]
+            scores[positions] = self._matrix[rows] @ query
+
+        missing = [idx for idx, course in enumerate(courses) if course["course_number"] not in self._rows]
+        if missing:
+            vectors = np.asarray(await embeddings.aembed_documents([course_to_text(courses[idx]) for idx in missing]), dtype=np.float32)
+            vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-10)
+            scores[missing] = vectors @ query
+
+        return scores
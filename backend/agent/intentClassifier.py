@@ -0,0 +1,134 @@
+from typing import List, NamedTuple, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+from .embeddingCache import embeddings
+from .config import LOCAL_INTENT_CONFIDENCE_THRESHOLD
+import asyncio
+import re
+import numpy as np
+
+# Labelled examples shown to the LLM in check_intent's prompt; also the centroids' training data.
+INTENT_EXAMPLES: List[Tuple[str, str]] = [
+    ("Hi, how are you?", "greeting"),
+    ("Hello there!", "greeting"),
+    ("Can you give me details about the Data Science and AI courses?", "course_details"),
+    ("I want to know about the DS2500 course.", "course_details"),
+    ("Can you build a schedule for me to become a lawyer?", "build_schedule"),
+    ("Help me create a study plan to become a certified dietician.", "build_schedule"),
+    ("I can't take this NLP course. Can you tell me some other courses?", "build_schedule"),
+    ("My college doesn't allow courses from CPS. Can you tell me what else I can take?", "build_schedule"),
+    ("I've done OOP, Data Structures, and DBMS. I want to get into Machine Learning. What should I take next?", "short_term_planning"),
+    ("I completed Deep Learning and NLP. I want to become an ML Engineer — suggest my next 5 courses.", "short_term_planning"),
+    ("Taken Stats, Python, and Intro to AI. What are some advanced courses I can do this fall to specialize in NLP?", "short_term_planning"),
+]
+
+GREETING_WORDS = {
+    "hi", "hello", "hey", "hiya", "howdy", "greetings", "yo", "sup", "good", "morning", "afternoon",
+    "evening", "there", "everyone", "all", "how", "are", "you", "doing", "whats", "what's", "up",
+    "thanks", "thank", "bot", "assistant",
+}
+COURSE_CODE = re.compile(r"\b[a-z]{2,4}\s?-?\d{4}\b", re.IGNORECASE)
+DETAIL_WORDS = re.compile(
+    r"\b(about|details?|describe|description|prerequisites?|prereqs?|credits?|info|information|explain|covers?|syllabus|what is)\b",
+    re.IGNORECASE,
+)
+PLANNING_WORDS = re.compile(
+    r"\b(schedule|plan|semester|next|completed|taken|done|finished|replace|instead|alternatives?|can't|cannot|become)\b",
+    re.IGNORECASE,
+)
+
+class IntentPrediction(NamedTuple):
+    intent: str
+    confidence: float
+    source: str
+
+class LocalIntentClassifier:
+    """
+    Cheap intent classifier consulted by `check_intent` before the LLM.
+
+    Two stages:
+        1. Keyword rules for unambiguous traffic: bare greetings, and questions
+           about a specific course code with no planning vocabulary.
+        2. Nearest centroid over embeddings of `INTENT_EXAMPLES`; the confidence is
+           the softmax of the cosine similarities at `temperature`.
+
+    `aclassify` returns a prediction only when its confidence reaches `threshold`,
+    and counts how much traffic was resolved locally versus deferred to the LLM.
+    """
+
+    def __init__(self, examples: List[Tuple[str, str]], embedding_model: Embeddings, threshold: float = 0.8, temperature: float = 0.05):
+        self.examples = examples
+        self.embedding_model = embedding_model
+        self.threshold = threshold
+        self.temperature = temperature
+        self.labels: List[str] = sorted({intent for _, intent in examples})
+        self._centroids: Optional[np.ndarray] = None
+        self._lock = asyncio.Lock()
+        self.resolved_by_rule = 0
+        self.resolved_by_centroid = 0
+        self.deferred = 0
+
+    @staticmethod
+    def match_rules(message: str) -> Optional[IntentPrediction]:
+        """Return a high-confidence prediction when a keyword rule fires, else None."""
+        words = re.findall(r"[a-z']+", message.lower())
+        if words and len(words) <= 8 and all(word in GREETING_WORDS for word in words):
+            return IntentPrediction("greeting", 0.99, "rule")
+        if COURSE_CODE.search(message) and DETAIL_WORDS.search(message) and not PLANNING_WORDS.search(message):
+            return IntentPrediction("course_details", 0.95, "rule")
+        return None
+
+    def _build_centroids(self, vectors: List[List[float]]) -> np.ndarray:
+        matrix = np.asarray(vectors, dtype=np.float32)
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True) + 1e-12
+        centroids = np.stack([
+            matrix[[idx for idx, (_, intent) in enumerate(self.examples) if intent == label]].mean(axis=0)
+            for label in self.labels
+        ])
+        return centroids / (np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-12)
+
+    async def _get_centroids(self) -> np.ndarray:
+        if self._centroids is None:
+            async with self._lock:
+                if self._centroids is None:
+                    vectors = await self.embedding_model.aembed_documents([text for text, _ in self.examples])
+                    self._centroids = self._build_centroids(vectors)
+        return self._centroids
+
+    async def apredict(self, message: str) -> IntentPrediction:
+        """Best local guess for `message`, whatever its confidence."""
+        prediction = self.match_rules(message)
+        if prediction is not None:
+            return prediction
+        centroids = await self._get_centroids()
+        query = np.asarray(await self.embedding_model.aembed_query(message), dtype=np.float32)
+        scores = centroids @ (query / (np.linalg.norm(query) + 1e-12))
+        weights = np.exp((scores - scores.max()) / self.temperature)
+        probabilities = weights / weights.sum()
+        best = int(np.argmax(probabilities))
+        return IntentPrediction(self.labels[best], float(probabilities[best]), "centroid")
+
+    async def aclassify(self, message: str) -> Optional[IntentPrediction]:
+        """Prediction for `message` if it clears the threshold, otherwise None (ask the LLM)."""
+        prediction = await self.apredict(message)
+        if prediction.confidence < self.threshold:
+            self.deferred += 1
+            return None
+        if prediction.source == "rule":
+            self.resolved_by_rule += 1
+        else:
+            self.resolved_by_centroid += 1
+        return prediction
+
+    def stats(self) -> dict:
+        """Share of check_intent traffic resolved locally."""
+        resolved = self.resolved_by_rule + self.resolved_by_centroid
+        total = resolved + self.deferred
+        return {
+            "resolved_by_rule": self.resolved_by_rule,
+            "resolved_by_centroid": self.resolved_by_centroid,
+            "deferred_to_llm": self.deferred,
+            "resolved_share": resolved / total if total else 0.0,
+            "threshold": self.threshold,
+        }
+
+intent_classifier = LocalIntentClassifier(INTENT_EXAMPLES, embeddings, threshold=LOCAL_INTENT_CONFIDENCE_THRESHOLD)
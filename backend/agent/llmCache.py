@@ -0,0 +1,327 @@
+from collections import OrderedDict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, NamedTuple, Optional
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.embeddings import Embeddings
+from langchain_core.load import dumps, loads
+from .embeddingCache import embeddings
+from .config import (
+    LLM_CACHE_NODES,
+    LLM_CACHE_SIZE,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_CACHE_PATH,
+    LLM_SEMANTIC_CACHE_NODES,
+    LLM_SEMANTIC_CACHE_THRESHOLD,
+)
+import ast
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+import numpy as np
+
+class _Scope(NamedTuple):
+    node: str
+    semantic_text: Optional[str]
+    namespace: str
+
+class _Entry:
+    __slots__ = ("generations", "created_at", "fingerprint", "semantic_text", "vector")
+
+    def __init__(self, generations, created_at, fingerprint=None, semantic_text=None):
+        self.generations = generations
+        self.created_at = created_at
+        self.fingerprint = fingerprint
+        self.semantic_text = semantic_text
+        self.vector = None
+
+_scope: ContextVar[Optional[_Scope]] = ContextVar("llm_cache_scope", default=None)
+
+def sampling_temperature(llm_string: str) -> Optional[float]:
+    """
+    Temperature of a cached call, read from LangChain's `llm_string`
+    ("<serialized client>---<call kwargs>"): the per-call value if one was
+    passed, else the client's. None when neither sets it (the API default).
+    """
+    serialized, _, params = llm_string.partition("---")
+    try:
+        temperature = dict(ast.literal_eval(params)).get("temperature")
+    except (ValueError, SyntaxError, TypeError):
+        temperature = None
+    if temperature is None:
+        try:
+            temperature = json.loads(serialized).get("kwargs", {}).get("temperature")
+        except (ValueError, AttributeError):
+            temperature = None
+    return None if temperature is None else float(temperature)
+
+@contextmanager
+def llm_cache_scope(node: str, semantic_text: Optional[str] = None, namespace: str = ""):
+    """
+    Describe the LLM call made inside the block to the response cache.
+
+    Args:
+        node (str): Graph node issuing the call; used for per-node stats and to
+            decide whether near-duplicate lookups are allowed.
+        semantic_text (str, optional): The user-supplied part of the prompt. When
+            the node is listed in `LLM_SEMANTIC_CACHE_NODES` and the call runs at
+            temperature 0, a cached response whose prompt differs only in this
+            text, by a near-duplicate, is reused.
+        namespace (str): Extra key component for calls that must not share
+            answers even with identical prompts (e.g. one slot per plan).
+    """
+    semantic = semantic_text if node in LLM_SEMANTIC_CACHE_NODES else None
+    token = _scope.set(_Scope(node, semantic, namespace))
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+class LLMResponseCache(BaseCache):
+    """
+    LangChain cache for chat model responses with LRU/TTL eviction, an optional
+    SQLite store and an optional near-duplicate lookup.
+
+    Entries are keyed by sha256(llm_string, namespace, prompt); `llm_string` carries
+    the model name, temperature and bound tools, so differently configured clients
+    never share answers. A near-duplicate lookup only considers entries whose
+    prompt is identical once the scope's `semantic_text` is removed, and reuses
+    the closest one when the cosine similarity of the two texts reaches `threshold`.
+    It is only used for temperature-0 calls: a sampled answer (rephrasings,
+    topic suggestions) belongs to its own prompt, so those calls are cached by
+    exact key only and another user's near-duplicate goal never reuses it.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 1024,
+        ttl_seconds: float = 86400,
+        store_path: Optional[str] = None,
+        semantic_embeddings: Optional[Embeddings] = None,
+        threshold: float = 0.95,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.semantic_embeddings = semantic_embeddings
+        self.threshold = threshold
+        self._lru: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.by_node: Dict[str, Dict[str, int]] = {}
+        self._store = None
+        if store_path:
+            os.makedirs(os.path.dirname(os.path.abspath(store_path)), exist_ok=True)
+            self._store = sqlite3.connect(store_path, check_same_thread=False)
+            self._store.execute(
+                "CREATE TABLE IF NOT EXISTS llm_responses "
+                "(key TEXT PRIMARY KEY, fingerprint TEXT, semantic_text TEXT, response TEXT, created_at REAL)"
+            )
+            self._store.commit()
+            self._warm()
+
+    def _warm(self):
+        rows = self._store.execute(
+            "SELECT key, fingerprint, semantic_text, response, created_at FROM llm_responses "
+            "WHERE created_at >= ? ORDER BY created_at DESC LIMIT ?",
+            (time.time() - self.ttl_seconds, self.max_entries),
+        ).fetchall()
+        for key, fingerprint, semantic_text, response, created_at in reversed(rows):
+            self._lru[key] = _Entry(self._decode(response), created_at, fingerprint, semantic_text)
+
+    @staticmethod
+    def _encode(generations: RETURN_VAL_TYPE) -> str:
+        return json.dumps([dumps(generation) for generation in generations])
+
+    @staticmethod
+    def _decode(response: str) -> RETURN_VAL_TYPE:
+        return [loads(item) for item in json.loads(response)]
+
+    @staticmethod
+    def _hash(*parts: str) -> str:
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def _keys(self, prompt: str, llm_string: str, scope: Optional[_Scope]):
+        namespace = scope.namespace if scope else ""
+        key = self._hash(llm_string, namespace, prompt)
+        fingerprint = None
+        if scope and scope.semantic_text and sampling_temperature(llm_string) == 0:
+            text = scope.semantic_text
+            for encoded in (text, json.dumps(text)[1:-1], json.dumps(text, ensure_ascii=False)[1:-1]):
+                if encoded and encoded in prompt:
+                    fingerprint = self._hash(llm_string, namespace, prompt.replace(encoded, ""))
+                    break
+        return key, fingerprint
+
+    def _fresh(self, entry: _Entry) -> bool:
+        return time.time() - entry.created_at <= self.ttl_seconds
+
+    def _count(self, scope: Optional[_Scope], outcome: str):
+        setattr(self, outcome, getattr(self, outcome) + 1)
+        counters = self.by_node.setdefault(scope.node if scope else "", {"hits": 0, "misses": 0})
+        counters["misses" if outcome == "misses" else "hits"] += 1
+
+    def _remember(self, key: str, entry: _Entry):
+        self._lru[key] = entry
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def _lookup_exact(self, key: str, scope: Optional[_Scope]) -> Optional[RETURN_VAL_TYPE]:
+        with self._lock:
+            entry = self._lru.get(key)
+            if entry is not None:
+                if self._fresh(entry):
+                    self._lru.move_to_end(key)
+                    self._count(scope, "hits")
+                    return entry.generations
+                del self._lru[key]
+                self.expired += 1
+            if self._store is None:
+                return None
+            row = self._store.execute(
+                "SELECT fingerprint, semantic_text, response, created_at FROM llm_responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            fingerprint, semantic_text, response, created_at = row
+            entry = _Entry(self._decode(response), created_at, fingerprint, semantic_text)
+            if not self._fresh(entry):
+                self._store.execute("DELETE FROM llm_responses WHERE key = ?", (key,))
+                self._store.commit()
+                self.expired += 1
+                return None
+            self._remember(key, entry)
+            self._count(scope, "disk_hits")
+            return entry.generations
+
+    def _candidates(self, fingerprint: Optional[str]) -> List[_Entry]:
+        if fingerprint is None or self.semantic_embeddings is None:
+            return []
+        with self._lock:
+            return [
+                entry for entry in self._lru.values()
+                if entry.fingerprint == fingerprint and entry.semantic_text and self._fresh(entry)
+            ]
+
+    def _closest(self, query_vector, candidates: List[_Entry], scope: _Scope) -> Optional[RETURN_VAL_TYPE]:
+        matrix = np.asarray([entry.vector for entry in candidates], dtype=np.float32)
+        query = np.asarray(query_vector, dtype=np.float32)
+        scores = matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query) + 1e-12)
+        best = int(np.argmax(scores))
+        if scores[best] < self.threshold:
+            return None
+        with self._lock:
+            self._count(scope, "semantic_hits")
+        return candidates[best].generations
+
+    def _pending(self, candidates: List[_Entry], scope: _Scope):
+        missing = [entry for entry in candidates if entry.vector is None]
+        return missing, [scope.semantic_text] + [entry.semantic_text for entry in missing]
+
+    def _miss(self, scope: Optional[_Scope]):
+        with self._lock:
+            self._count(scope, "misses")
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        scope = _scope.get()
+        key, fingerprint = self._keys(prompt, llm_string, scope)
+        cached = self._lookup_exact(key, scope)
+        if cached is not None:
+            return cached
+        candidates = self._candidates(fingerprint)
+        if candidates:
+            missing, texts = self._pending(candidates, scope)
+            vectors = self.semantic_embeddings.embed_documents(texts)
+            for entry, vector in zip(missing, vectors[1:]):
+                entry.vector = vector
+            cached = self._closest(vectors[0], candidates, scope)
+            if cached is not None:
+                return cached
+        self._miss(scope)
+        return None
+
+    async def alookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        scope = _scope.get()
+        key, fingerprint = self._keys(prompt, llm_string, scope)
+        if self._store is not None:
+            cached = await asyncio.to_thread(self._lookup_exact, key, scope)
+        else:
+            cached = self._lookup_exact(key, scope)
+        if cached is not None:
+            return cached
+        candidates = self._candidates(fingerprint)
+        if candidates:
+            missing, texts = self._pending(candidates, scope)
+            vectors = await self.semantic_embeddings.aembed_documents(texts)
+            for entry, vector in zip(missing, vectors[1:]):
+                entry.vector = vector
+            cached = self._closest(vectors[0], candidates, scope)
+            if cached is not None:
+                return cached
+        self._miss(scope)
+        return None
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        scope = _scope.get()
+        key, fingerprint = self._keys(prompt, llm_string, scope)
+        entry = _Entry(return_val, time.time(), fingerprint, scope.semantic_text if fingerprint else None)
+        with self._lock:
+            self._remember(key, entry)
+            if self._store is not None:
+                self._store.execute(
+                    "INSERT OR REPLACE INTO llm_responses (key, fingerprint, semantic_text, response, created_at) VALUES (?, ?, ?, ?, ?)",
+                    (key, entry.fingerprint, entry.semantic_text, self._encode(return_val), entry.created_at),
+                )
+                self._store.commit()
+
+    async def aupdate(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE) -> None:
+        if self._store is not None:
+            await asyncio.to_thread(self.update, prompt, llm_string, return_val)
+        else:
+            self.update(prompt, llm_string, return_val)
+
+    def clear(self, **kwargs) -> None:
+        with self._lock:
+            self._lru.clear()
+            if self._store is not None:
+                self._store.execute("DELETE FROM llm_responses")
+                self._store.commit()
+
+    def stats(self) -> dict:
+        """Hit/miss counters, overall and per node, and current LRU size."""
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "semantic_hits": self.semantic_hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "by_node": {node: dict(counters) for node, counters in self.by_node.items()},
+            "entries": len(self._lru),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "persistent": self._store is not None,
+        }
+
+llm_response_cache = LLMResponseCache(
+    max_entries=LLM_CACHE_SIZE,
+    ttl_seconds=LLM_CACHE_TTL_SECONDS,
+    store_path=LLM_CACHE_PATH or None,
+    semantic_embeddings=embeddings if LLM_SEMANTIC_CACHE_NODES else None,
+    threshold=LLM_SEMANTIC_CACHE_THRESHOLD,
+)
+
+def llm_cache_for(node: str):
+    """
+    Value for the `cache=` argument of the ChatOpenAI client used by `node`: the
+    shared response cache when the node is listed in `LLM_CACHE_NODES`, otherwise
+    False so the client never consults any cache.
+    """
+    return llm_response_cache if node in LLM_CACHE_NODES else False
@@ -1,33 +1,31 @@
 from dotenv import load_dotenv
 from langchain_core.prompts import ChatPromptTemplate
 from typing import List
-from langchain_core.documents import Document
-from .pydanticModels import AgentState, CourseAttributes 
+from .pydanticModels import AgentState, CourseAttributes, copy_state
 from langchain_openai import ChatOpenAI
-from langchain_community.vectorstores import Chroma
-from langchain_openai.embeddings import OpenAIEmbeddings
-from .queryDB import get_course_by_course_number
+from .llmCache import llm_cache_for, llm_cache_scope
+from langgraph.types import Send
+from langgraph.config import get_stream_writer
+from .embeddingCache import embeddings
+from .queryDB import aget_course_by_course_number, course_catalog, course_embedding_index, search_courses, special_topics_retriever
+from .catalog import Course, course_credits, prompt_fields
+from .embeddingIndex import course_to_text
+from .config import CREDIT_BALANCER, MAX_CONCURRENT_PLAN_CALLS, PROMPT_COURSE_FORMAT, PROMPT_COURSE_TOKEN_BUDGET
+from .utils import gather_with_concurrency
+from .scheduler import build_semester_plan
+from .creditBalancer import balance_plan_credits
+from .promptEncoding import CourseTable, fit_token_budget
+import asyncio
 import json
-import math
-import os
 import numpy as np
 
 load_dotenv()
 
-PATH = os.getcwd()
+llm = ChatOpenAI(model = "gpt-4.1-nano", cache = llm_cache_for("rephrase_query_for_planning_schedule"))
 
-vector_db_path = os.path.join(PATH,"agent","VectorDB")
-# print(vector_db_path)
-
-llm = ChatOpenAI(model = "gpt-4.1-nano")
-
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-
-regular_courses_database = Chroma(collection_name="RegularCourses",embedding_function=embeddings,persist_directory=vector_db_path)
-special_topics_database = Chroma(collection_name="SpecialCourses",embedding_function=embeddings,persist_directory=vector_db_path)
-
-regular_courses_retriver_for_planning = regular_courses_database.as_retriever(search_kwargs={'k': 15})
-special_courses_retriver_for_planning = special_topics_database.as_retriever(search_kwargs={'k': 1})
+# Courses retrieved per search from the regular and special topics collections.
+regular_courses_search_k = 15
+special_courses_search_k = 1
 
 
 llm_for_course_attributes = llm.with_structured_output(CourseAttributes)
@@ -43,11 +41,15 @@ llm_json_for_filter_2 = ChatOpenAI(
     temperature=0.3
 )
 
-llm_json_for_planning_agent = ChatOpenAI(
-    model="gpt-4.1-nano",
-    model_kwargs={"response_format": {"type": "json_object"}},
-    temperature=0.4
-)
+# Focus strategy handed to each parallel plan branch, keyed by plan number.
+PLAN_VARIETY_INSTRUCTIONS = {
+    1: "Maximize specialization — select courses that dive deep into one area to build expert-level mastery.",
+    2: "Optimize versatility — choose a wide range of topics across subfields to prepare for multiple career paths or interests.",
+    3: "Target outcomes — pick courses based on concrete goals like job readiness, portfolio building, or research publication.",
+    4: "Follow curiosity — let personal interest or passion drive the selection, even if it doesn't align directly with formal goals.",
+}
+
+DEFAULT_VARIETY_INSTRUCTION = "Create a unique combination different from typical recommendations."
 
 
 def reset_previous_plans(state:AgentState):
@@ -68,6 +70,7 @@ def reset_previous_plans(state:AgentState):
             - Course and planning-related fields emptied or reset (e.g., `final_course_list`, 
               `number_of_plans`, `semester_plans`, `planning_completed`).
             - Messages initialized with a "Reset Previous Details" status entry.
+            - `plan_candidates` set to None, which clears the fan-out channel.
     """
     return {
         "query":state.query,
@@ -90,6 +93,7 @@ def reset_previous_plans(state:AgentState):
         "course_numbers":[],
         "course_titles":[],
         "filtered_course_list":[],
+        "plan_candidates":None,
         "number_of_plans":0,
         "semester_plans":[],
         "planning_completed":False,
@@ -99,7 +103,7 @@ def reset_previous_plans(state:AgentState):
         "error":""
     }
 
-def rephrase_query_for_planning_schedule(state:AgentState):
+async def rephrase_query_for_planning_schedule(state:AgentState):
     """
     Rephrase a user's course planning query for improved semantic search.
 
@@ -181,11 +185,13 @@ def rephrase_query_for_planning_schedule(state:AgentState):
 
     prompt = prompt.format_messages(user_query=query,dept=dept,college=college)
 
-    response = llm.invoke(prompt,temperature = 0.5).content
+    # Each plan slot keeps its own cached rephrasing so parallel candidates still retrieve different courses.
+    with llm_cache_scope("rephrase_query_for_planning_schedule", semantic_text=query, namespace=f"plan_{state.number_of_plans}"):
+        response = (await llm.ainvoke(prompt,temperature = 0.5)).content
 
     return {"rephrased_query":response}
 
-def get_courses_for_building_schedule(state: AgentState):
+async def get_courses_for_building_schedule(state: AgentState):
     """
     Retrieve and structure relevant courses for academic schedule building.
 
@@ -194,6 +200,10 @@ def get_courses_for_building_schedule(state: AgentState):
     dictionaries, and updates the `final_course_list` with any new courses not 
     already included. Core courses and zero-credit-hour courses are excluded.
 
+    The rephrased query searches the whole catalog; the original query is 
+    searched with metadata filters instead, in the student's department first 
+    and then the rest of their college (`queryDB.search_courses`).
+
     Args:
         state (AgentState): The current state containing query details, 
             previously selected courses, and core course numbers.
@@ -212,29 +222,14 @@ def get_courses_for_building_schedule(state: AgentState):
 
     already_present_courses = {crn["course_number"]: True for crn in final_course_list}
 
-    def restructure_retrivals(documents: List[Document]):
+    def restructure_retrivals(courses):
         restructured = []
-        for doc in documents:
-            metadata :str = doc.metadata
+        for data in courses:
             try:
-                credits_hours = metadata["credit_hours"]
-                if credits_hours=='0' or metadata["course_number"] in core_course_numbers_set:
+                if data["course_number"] in core_course_numbers_set:
+                    continue
+                if data["credits_max"] == 0:
                     continue
-                if metadata["credit_hours"].lower().__contains__("or"):
-                    credits_hours = credits_hours.split(" ")[-1]
-                lines = doc.page_content.split("\n")
-                description = lines[1] if len(lines) > 1 else ""
-
-                data = {
-                    "title": metadata["title"],
-                    "description": description,
-                    "credit_hours": credits_hours,
-                    "course_number": metadata["course_number"],
-                    "college": metadata["college"],
-                    "department": metadata["department"],
-                    "dept_code": metadata["dept_code"],
-                    "prerequisites": metadata["prerequisites"]
-                }
 
                 restructured.append(data)
 
@@ -243,14 +238,14 @@ def get_courses_for_building_schedule(state: AgentState):
                     already_present_courses[str(data["course_number"])] = True
             except Exception as e:
                 pass
-                # print(doc)
         return restructured
 
     restructured_courses = []
     
-    regular_courses_1 = restructure_retrivals(regular_courses_retriver_for_planning.get_relevant_documents(query=rephrased_query))
-    regular_courses_2 = restructure_retrivals(regular_courses_retriver_for_planning.get_relevant_documents(query=query+f" {state.college} {state.department}."))
-    special_courses = restructure_retrivals(special_courses_retriver_for_planning.get_relevant_documents(query=rephrased_query))
+    regular_courses_1 = restructure_retrivals(await asyncio.to_thread(search_courses, rephrased_query, regular_courses_search_k))
+    # The student's own department first, widened to the college and then the catalog only if it runs short.
+    regular_courses_2 = restructure_retrivals(await asyncio.to_thread(search_courses, query, regular_courses_search_k, state.college, state.department, strict=True))
+    special_courses = restructure_retrivals(await asyncio.to_thread(search_courses, rephrased_query, special_courses_search_k, retriever=special_topics_retriever))
     
     restructured_courses.extend(regular_courses_1)
     restructured_courses.extend(regular_courses_2)
@@ -259,82 +254,126 @@ def get_courses_for_building_schedule(state: AgentState):
 
     return {"course_list": restructured_courses, "final_course_list": final_course_list}
 
-def check_total_number_of_plans(state:AgentState):
+def assign_plan_strategies(state:AgentState):
     """
-    Check if the maximum number of academic plans has been reached.
+    Fan plan generation out into one parallel branch per requested plan.
 
-    This function compares the current number of generated plans with the 
-    allowed maximum and returns a status indicating whether to continue 
-    generating plans or stop.
+    Each branch receives a copy of the state whose `number_of_plans` is the
+    index of the plan it builds, so `filter_courses_1` picks up the matching
+    entry of `PLAN_VARIETY_INSTRUCTIONS` for that branch.
 
     Args:
-        state (AgentState): The current agent state containing the number of 
-            generated plans and the maximum allowed plans.
+        state (AgentState): The current agent state containing the maximum 
+            number of plans to generate.
 
     Returns:
-        str: 
-            - "finished" if the number of plans has reached or exceeded the limit.
-            - "generate_more_plans" if more plans can still be created.
+        list[Send]: One `Send` to `generate_plan_candidate` per plan.
     """
-    num_plans = state.number_of_plans
-    if num_plans >= state.max_number_of_plans:
-        return "finished"
-    else:
-        return "generate_more_plans"
+    return [
+        Send("generate_plan_candidate", copy_state(state, {"number_of_plans": plan_idx}))
+        for plan_idx in range(max(1, state.max_number_of_plans))
+    ]
 
-def filter_courses_1(state: AgentState):
+async def generate_plan_candidate(state: AgentState):
     """
-    Filter and select elective courses to create a unique academic plan.
+    Build a single candidate elective plan inside one branch of the fan-out.
 
-    This function uses an LLM to choose a set of elective courses that fit the 
-    student's academic or career goals, while following constraints such as 
-    credit limits, course uniqueness, difficulty level, and relevance. Each 
-    invocation generates a distinct plan variation based on pre-defined 
-    variety instructions.
+    Runs the per-plan chain (rephrase → retrieve → filter_courses_1) on a 
+    branch-local copy of the state. Branches run concurrently, so the result 
+    is written to the `plan_candidates` channel instead of the shared plan 
+    fields; `get_unique_plans` merges the candidates afterwards.
 
     Args:
-        state (AgentState): The current agent state containing query details, 
-            course lists, credit limits, core course data, and planning context.
+        state (AgentState): Branch state from `assign_plan_strategies`, with
+            `number_of_plans` set to the index of the plan to build.
 
     Returns:
         dict: A dictionary with:
-            - "filtered_course_list" (list): Updated list of course plan variations.
-            - "number_of_plans" (int): Incremented count of generated plans.
+            - "plan_candidates" (list): A single candidate holding the plan 
+              number, its rephrased query, the selected electives and the 
+              courses retrieved for it.
     """
+    state = copy_state(state, {"final_course_list": [], "filtered_course_list": []})
 
-    query = state.query
-    rephrased_query = state.rephrased_query
-    course_list = state.course_list
-    college = state.college
-    department = state.department
-    core_courses = get_course_by_course_number(state.core_course_numbers)
-    core_courses_credits = sum([int(course["credit_hours"].split(" ")[-1]) for course in core_courses])
-    max_creds = state.max_credits
-    remaining_credits = max_creds - core_courses_credits
-    prev_filtered_course_list = state.filtered_course_list
-    core_course_numbers = state.core_course_numbers
-    
-    average_creds = sum([int(course["credit_hours"].split(" ")[-1]) for course in course_list])//len(course_list)
-    num_subjects_to_add = max(1,int(remaining_credits//average_creds))
+    for step in (rephrase_query_for_planning_schedule, get_courses_for_building_schedule, filter_courses_1):
+        update = await step(state)
+        state = copy_state(state, update)
 
-    current_plan = state.number_of_plans + 1
-
-    # variety_instructions = {
-    #     1: "Prioritize advanced or specialized courses that others might overlook.",
-    #     2: "Focus on the most essential and core courses for this goal.",
-    #     3: "Consider alternative courses that provide different perspectives or approaches.",
-    #     4: "Include courses that might be interdisciplinary or from other departments.",
-    # }
-    
-    variety_instructions = {
-        1: "Maximize specialization — select courses that dive deep into one area to build expert-level mastery.",
-        2: "Optimize versatility — choose a wide range of topics across subfields to prepare for multiple career paths or interests.",
-        3: "Target outcomes — pick courses based on concrete goals like job readiness, portfolio building, or research publication.",
-        4: "Follow curiosity — let personal interest or passion drive the selection, even if it doesn't align directly with formal goals.",
+    return {
+        "plan_candidates": [{
+            "plan_number": state.number_of_plans,
+            "rephrased_query": state.rephrased_query,
+            "courses": state.filtered_course_list[-1],
+            "final_course_list": state.final_course_list,
+        }]
     }
 
+async def courses_within_budget(courses: List[dict], goal: str, budget: int = PROMPT_COURSE_TOKEN_BUDGET,
+                                course_format: str = PROMPT_COURSE_FORMAT) -> List[dict]:
+    """
+    Cut a prompt's candidate courses to `budget` tokens.
+
+    Candidates are ranked by cosine similarity between `goal` (the rephrased
+    query) and their stored embeddings, and the most similar ones are kept
+    while their prompt text fits (`promptEncoding.fit_token_budget`, tokens
+    counted locally). The prompt therefore stays the same size however many
+    courses the plans have accumulated.
+
+    Returns:
+        list: The kept courses, most similar first.
+    """
+    if not courses:
+        return courses
+    goal_vector = await embeddings.aembed_query(goal)
+    scores = await course_embedding_index.similarities(goal_vector, courses)
+    return fit_token_budget(courses, scores, budget, course_format)
+
+def filter_1_prompt(query: str, rephrased_query: str, course_list: List[dict], core_courses: List[dict],
+                    college: str, department: str, max_creds: int, core_course_numbers: List[str],
+                    current_plan: int, course_format: str = PROMPT_COURSE_FORMAT):
+    """
+    Build the elective-selection prompt of `filter_courses_1`.
+
+    With `course_format="table"` (the default, `PROMPT_COURSE_FORMAT`) the
+    courses are shown as compact `CourseTable`s and the model answers with
+    row IDs; with "json" they are shown as indented JSON and the model
+    answers with full course objects, as before.
+
+    Returns:
+        tuple: (prompt, the `CourseTable` to decode the answer with, or None for "json").
+    """
+    core_courses_credits = sum(course_credits(course) for course in core_courses)
+    remaining_credits = max_creds - core_courses_credits
+
+    average_creds = sum(course_credits(course) for course in course_list)//len(course_list)
+    num_subjects_to_add = max(1,int(remaining_credits//average_creds))
 
-    variety_instruction = variety_instructions.get(current_plan, "Create a unique combination different from typical recommendations.")
+    if course_format == "json":
+        table = None
+        core_courses_text = json.dumps([prompt_fields(course) for course in core_courses], indent=2)
+        elective_courses_text = json.dumps([prompt_fields(course) for course in course_list], indent=2)
+        output_structure = """{
+        "courses": [
+            {
+                "title": "string",
+                "description": "string",
+                "credit_hours": "string",
+                "course_number": "string",
+                "college": "string",
+                "department":"string",
+                "dept_code": "string",
+                "prerequisites": "string"
+            }
+        ]
+    }"""
+    else:
+        table = CourseTable()
+        core_courses_text = f"{CourseTable.FORMAT}\n\n{table.render(core_courses)}"
+        elective_courses_text = table.render(course_list)
+        output_structure = """{"courses": ["<id>", "<id>"]}
+    where each <id> is the `id` of a selected course in the Available Elective Courses table."""
+
+    variety_instruction = PLAN_VARIETY_INSTRUCTIONS.get(current_plan, DEFAULT_VARIETY_INSTRUCTION)
 
     prompt = f"""You are an intelligent academic course planning assistant but for that you need to carefully filter and select the most suitable elective courses from the course list.
 
@@ -402,14 +441,14 @@ def filter_courses_1(state: AgentState):
     Selected Core Courses:
     (Already completed — do not include again)
 
-    {json.dumps(core_courses, indent=2)}
+    {core_courses_text}
 
     ---
 
     Available Elective Courses:
     (Use this list only — recommend relevant electives from here)
 
-    {json.dumps(course_list, indent=2)}
+    {elective_courses_text}
 
     ---
 
@@ -421,20 +460,7 @@ def filter_courses_1(state: AgentState):
         
     Output Format (Very Important):  
     Return your response as a JSON object with this exact structure:
-    {{
-        "courses": [
-            {{
-                "title": "string",
-                "description": "string",
-                "credit_hours": "string",
-                "course_number": "string",
-                "college": "string",
-                "department":"string",
-                "dept_code": "string",
-                "prerequisites": "string"
-            }}
-        ]
-    }}
+    {output_structure}
 
     - Do NOT include any other text, explanation, or formatting.  
     - Each course must come from the provided elective course list.  
@@ -446,10 +472,49 @@ def filter_courses_1(state: AgentState):
 
     """
 
-    response_content = llm_json_for_filter_1.invoke(prompt).content
+    return prompt, table
+
+async def filter_courses_1(state: AgentState):
+    """
+    Filter and select elective courses to create a unique academic plan.
+
+    This function uses an LLM to choose a set of elective courses that fit the 
+    student's academic or career goals, while following constraints such as 
+    credit limits, course uniqueness, difficulty level, and relevance. Each 
+    invocation generates a distinct plan variation based on pre-defined 
+    variety instructions. The candidates in `course_list` are first cut to 
+    `PROMPT_COURSE_TOKEN_BUDGET` tokens, most similar to the rephrased goal 
+    first (`courses_within_budget`).
+
+    Args:
+        state (AgentState): The current agent state containing query details, 
+            course lists, credit limits, core course data, and planning context.
+
+    Returns:
+        dict: A dictionary with:
+            - "filtered_course_list" (list): Updated list of course plan variations.
+            - "number_of_plans" (int): Incremented count of generated plans.
+    """
+
+    query = state.query
+    rephrased_query = state.rephrased_query
+    course_list = await courses_within_budget(state.course_list, rephrased_query or query)
+    college = state.college
+    department = state.department
+    core_courses = await aget_course_by_course_number(state.core_course_numbers)
+    max_creds = state.max_credits
+    prev_filtered_course_list = state.filtered_course_list
+    core_course_numbers = state.core_course_numbers
+
+    current_plan = state.number_of_plans + 1
+
+    prompt, table = filter_1_prompt(query, rephrased_query, course_list, core_courses, college, department,
+                                    max_creds, core_course_numbers, current_plan)
+
+    response_content = (await llm_json_for_filter_1.ainvoke(prompt)).content
     response_json = json.loads(response_content)
     
-    response = response_json["courses"] 
+    response = table.decode(response_json["courses"]) if table is not None else response_json["courses"]
     
 
     already_suggested = {}
@@ -463,7 +528,7 @@ def filter_courses_1(state: AgentState):
         if already_suggested.get(course_num, False):
             continue
         already_suggested[course_num] = True
-        unique_new_filtered_course.append(course)  
+        unique_new_filtered_course.append(course_catalog.record(course))  
 
     return {
         "filtered_course_list": prev_filtered_course_list + [unique_new_filtered_course],
@@ -472,31 +537,46 @@ def filter_courses_1(state: AgentState):
 
 def get_unique_plans(state: AgentState):
     """
-    Remove duplicate course plans based on course numbers.
+    Merge the parallel plan candidates and remove duplicate course plans.
 
-    This function ensures that only unique academic plans remain by comparing 
-    the sorted list of course numbers for each plan. Duplicate plans (with the 
-    same set of course numbers) are removed.
+    Candidates produced by `generate_plan_candidate` are ordered by plan 
+    number and their retrieved courses are merged into `final_course_list`. 
+    Only unique academic plans remain, compared by the sorted list of course 
+    numbers for each plan. Duplicate plans (with the same set of course 
+    numbers) are removed.
 
     Parameters
     ----------
     state : AgentState
-        The current agent state containing `filtered_course_list` with course plans.
+        The current agent state containing `plan_candidates` with the course 
+        plans built by each branch.
 
     Returns
     -------
     dict
         A dictionary with:
         - "filtered_course_list" (list): Unique course plans.
+        - "final_course_list" (list): Courses retrieved across all branches.
+        - "rephrased_query" (str): Rephrased query of the first plan.
         - "number_of_plans" (int): The total count of unique plans.
     """
 
-    filtered_course_list = state.filtered_course_list
+    candidates = sorted(state.plan_candidates, key=lambda candidate: candidate["plan_number"])
+
+    final_course_list = []
+    already_present_courses = set()
+
+    for candidate in candidates:
+        for course in candidate["final_course_list"]:
+            if course["course_number"] not in already_present_courses:
+                already_present_courses.add(course["course_number"])
+                final_course_list.append(course)
 
     seen = set()
     unique_plans = []
 
-    for plan in filtered_course_list:
+    for candidate in candidates:
+        plan = candidate["courses"]
         
         course_nums = tuple(sorted(course["course_number"] for course in plan))  
         
@@ -506,23 +586,174 @@ def get_unique_plans(state: AgentState):
 
     return {
         "filtered_course_list": unique_plans,
+        "final_course_list": final_course_list,
+        "rephrased_query": candidates[0]["rephrased_query"] if candidates else state.rephrased_query,
         "number_of_plans": len(unique_plans)
     }
 
-def filter_courses_2(state: AgentState):
+def balance_plan_prompt(plan, available_courses, credit_difference, query, college, department, max_creds,
+                        course_format: str = PROMPT_COURSE_FORMAT):
+    """
+    Build the ADD/REMOVE prompt of `llm_balance_plan`. Courses are encoded as
+    in `filter_1_prompt`: with "table" the model lists the final plan as row IDs.
+
+    Returns:
+        tuple: (prompt, the `CourseTable` to decode the answer with, or None for "json").
+    """
+    average_credit = (
+        sum(course_credits(course) for course in plan) // len(plan)
+        if plan else 3
+    )
+
+    action = "ADD" if credit_difference > 0 else "REMOVE"
+    abs_credit_diff = abs(credit_difference)
+
+    # If removing, calculate how many courses can be safely removed (max)
+    if action == "REMOVE":
+        max_courses_to_remove = abs_credit_diff // average_credit if average_credit else 1
+        if max_courses_to_remove == 0:
+            max_courses_to_remove = 1  # Ensure model doesn't remove everything
+
+    if course_format == "json":
+        table = None
+        current_plan_courses = json.dumps([prompt_fields(course) for course in plan], indent=2)
+        available_courses_json = json.dumps([prompt_fields(course) for course in available_courses], indent=2)
+        final_plan_structure = """[
+        {
+          "title": "string",
+          "description": "string",
+          "credit_hours": "string",
+          "course_number": "string",
+          "college": "string",
+          "department": "string",
+          "dept_code": "string",
+          "prerequisites": "string",
+          "term": "string"
+        }
+      ]"""
+    else:
+        table = CourseTable()
+        current_plan_courses = f"{CourseTable.FORMAT}\n\n{table.render(plan)}"
+        available_courses_json = table.render(available_courses)
+        final_plan_structure = '["<id>", "<id>"]'
+
+    instruction_lines = [
+        f"You need to **{action.lower()} approximately {abs_credit_diff} credits worth of electives**."
+        f"For you information the avaliable list of electives have average credits = {average_credit}",
+    ]
+
+    if action == "REMOVE":
+        instruction_lines += [
+            f"- Try to remove **no more than {max_courses_to_remove} course(s)** unless strictly necessary.",
+            "- Prefer removing **fewer higher-credit electives** than many small ones.",
+            "- Keep the overall direction of the plan intact."
+        ]
+
+    elif action == "ADD":
+        courses_to_add = max(1,(abs(credit_difference)//average_credit))
+
+        instruction_lines += [
+            f"- You must add between {courses_to_add} and {courses_to_add + 2} subjects (inclusive range) to the current plan below.",
+            f"- Strictly avoid adding fewer than the minimum or more than the maximum number of courses indicated above."
+            f"- If there are (x) numbers of courses are in current plan then return at least (x+{courses_to_add}) number of courses"
+            "- Select electives that best enhance the plan and align with the student's goal.",
+        ]
+
+    instruction = "\n".join(instruction_lines)
+
+
+    prompt = f"""You are an academic advisor helping optimize a graduate student's course plan.
+
+    Student Goal: {query}  
+    Department: {department}  
+    College: {college}  
+
+    ACTION: {action}  
+    {instruction}
+
+    CURRENT PLAN (Electives Only):  
+    {current_plan_courses}
+
+    AVAILABLE COURSES (Excludes core and current plan):  
+    **Rember this instruction\n\n{instruction_lines}**
+    {available_courses_json}
+
+    RULES:  
+    1. Final plan must include all core courses and have **core + electives ≥ {max_creds} credits**.  
+    2. Modify only from the "AVAILABLE COURSES" list.  
+    3. Prioritize electives that align with the goal: **"{query}"**.  
+    4. Avoid filler or unrelated courses.  
+    5. Only include valid, properly credited graduate-level courses.  
+    6. Do not duplicate any course.  
+    7. Do not overshoot the target credits significantly.  
+    8. If a valid adjustment is not possible, return the current plan unchanged and explain why.  
+    9. Prefer **6000-level (intermediate)** and **7000-level (advanced)** courses.  
+       - 5000-level: Foundational / prerequisites  
+       - 6000-level: Intermediate graduate core  
+       - 7000-level: Advanced or research-focused  
+
+    Output Format:
+    {{
+      "action_taken": "{action}",
+      "courses_modified": ["course_number1", "course_number2"],
+      "final_plan": {final_plan_structure},
+      "reasoning": "Brief explanation of the decisions made"
+    }}
+
+
+    Ensure the final elective plan supports the student’s goal and credit requirement.
+    FOLLOW THE GIVEN INSTRUCTIONS STRICTLY.
+    
+    Now {action} course as per instructions.
+
+    Return answer in JSON format only.
+    
+    """
+
+    return prompt, table
+
+async def llm_balance_plan(plan, available_courses, credit_difference, query, college, department, max_creds):
+    """
+    Ask the LLM to add or remove electives so the plan moves by `credit_difference`
+    credits. This was filter_courses_2's only strategy; it is kept for
+    `CREDIT_BALANCER=llm` and for `benchmarks/credit_balancing.py`.
+
+    Returns
+    -------
+    list
+        The elective plan proposed by the model (its credits are not checked here).
+    """
+    prompt, table = balance_plan_prompt(plan, available_courses, credit_difference, query, college, department, max_creds)
+
+    response_content = (await llm_json_for_filter_2.ainvoke(prompt)).content
+    response_json = json.loads(response_content)
+    if table is not None:
+        return table.decode(response_json["final_plan"])
+    return course_catalog.records(response_json["final_plan"])
+
+async def filter_courses_2(state: AgentState):
     """
     Adjust course plans to meet a specific credit requirement.
 
-    This function iterates through each filtered course plan and uses an LLM 
-    to either add or remove electives so that the total credits (core + electives) 
-    meet the maximum allowed credits. The LLM receives detailed instructions 
-    including available courses, current plan, student goal, and adjustment rules.
+    Each elective plan is brought to exactly `max_credits - core credits` by an 
+    exact-credit knapsack (`creditBalancer.balance_plan_credits`) over the plan 
+    and the remaining `final_course_list` courses: the plan's electives are kept 
+    where possible, the lowest-relevance ones are dropped first and the 
+    candidates most similar to the goal are added first. Relevance is the cosine 
+    similarity between the goal (query + rephrased query) and the stored course 
+    embeddings, so the node needs one query embedding and no LLM call.
+
+    With `CREDIT_BALANCER=llm` the previous behaviour is used instead: one LLM 
+    call per plan (at most `MAX_CONCURRENT_PLAN_CALLS` at once), falling back to 
+    the original plan when the model misses the target. The courses offered to 
+    the model are cut to `PROMPT_COURSE_TOKEN_BUDGET` tokens as in `filter_courses_1`.
 
     Parameters
     ----------
     state : AgentState
         The current agent state containing:
         - query (str): Student’s academic or career goal.
+        - rephrased_query (str): LLM-rephrased version of the goal.
         - college (str): Name of the college.
         - department (str): Department name.
         - core_course_numbers (list): List of core course numbers.
@@ -542,196 +773,83 @@ def filter_courses_2(state: AgentState):
     college = state.college
     department = state.department
 
-    core_courses = get_course_by_course_number(state.core_course_numbers)
-    core_courses_credits = sum([int(course["credit_hours"].split(" ")[-1]) for course in core_courses])
+    core_courses = await aget_course_by_course_number(state.core_course_numbers)
+    core_courses_credits = sum(course_credits(course) for course in core_courses)
 
     max_creds = state.max_credits
     remaining_credits = max_creds - core_courses_credits
 
     filtered_course_list = state.filtered_course_list
     final_course_list = state.final_course_list
-
-    optimized_plans = []
-
-    for plan_idx, plan in enumerate(filtered_course_list):
-        current_credits = sum([int(course["credit_hours"].split(" ")[-1]) for course in plan])
+    core_course_numbers = set(state.core_course_numbers)
+
+    if CREDIT_BALANCER != "llm":
+        pool = [course for course in final_course_list if course["course_number"] not in core_course_numbers]
+        pool_numbers = {course["course_number"] for course in pool}
+        pool += [course for plan in filtered_course_list for course in plan if course["course_number"] not in pool_numbers]
+        goal_vector = await embeddings.aembed_query(f"{query}\n{state.rephrased_query}")
+        scores = await course_embedding_index.similarities(goal_vector, pool) if pool else []
+        relevance = {course["course_number"]: float(score) for course, score in zip(pool, scores)}
+
+        optimized_plans = []
+        for plan in filtered_course_list:
+            current_course_numbers = {course["course_number"] for course in plan}
+            candidates = [course for course in pool if course["course_number"] not in current_course_numbers]
+            balanced = balance_plan_credits(plan, candidates, relevance, remaining_credits)
+            optimized_plans.append(plan if balanced is None else balanced)
+        return {
+            "filtered_course_list": optimized_plans
+        }
+
+    async def optimize_plan(plan_idx, plan):
+        current_credits = sum(course_credits(course) for course in plan)
         credit_difference = remaining_credits - current_credits
 
         if credit_difference == 0:
-            optimized_plans.append(plan)
-            continue
-
-        average_credit = (
-            sum([int(course["credit_hours"].split(" ")[-1]) for course in plan]) // len(plan)
-            if plan else 3
-        )
-
-        action = "ADD" if credit_difference > 0 else "REMOVE"
-        abs_credit_diff = abs(credit_difference)
-
-        # If removing, calculate how many courses can be safely removed (max)
-        if action == "REMOVE":
-            max_courses_to_remove = abs_credit_diff // average_credit if average_credit else 1
-            if max_courses_to_remove == 0:
-                max_courses_to_remove = 1  # Ensure model doesn't remove everything
+            return plan
 
         current_course_numbers = {c["course_number"] for c in plan}
-        available_courses = [
-            c for c in final_course_list if c["course_number"] not in current_course_numbers
-        ]
-
-        current_plan_courses = json.dumps(plan, indent=2)
-        available_courses_json = json.dumps(available_courses, indent=2)
-
-        instruction_lines = [
-            f"You need to **{action.lower()} approximately {abs_credit_diff} credits worth of electives**."
-            f"For you information the avaliable list of electives have average credits = {average_credit}",
-        ]
-
-        if action == "REMOVE":
-            instruction_lines += [
-                f"- Try to remove **no more than {max_courses_to_remove} course(s)** unless strictly necessary.",
-                "- Prefer removing **fewer higher-credit electives** than many small ones.",
-                "- Keep the overall direction of the plan intact."
-            ]
-
-        elif action == "ADD":
-            courses_to_add = max(1,(abs(credit_difference)//average_credit))
-
-            instruction_lines += [
-                f"- You must add between {courses_to_add} and {courses_to_add + 2} subjects (inclusive range) to the current plan below.",
-                f"- Strictly avoid adding fewer than the minimum or more than the maximum number of courses indicated above."
-                f"- If there are (x) numbers of courses are in current plan then return at least (x+{courses_to_add}) number of courses"
-                "- Select electives that best enhance the plan and align with the student's goal.",
-            ]
-
-        instruction = "\n".join(instruction_lines)
-
-
-        prompt = f"""You are an academic advisor helping optimize a graduate student's course plan.
-
-        Student Goal: {query}  
-        Department: {department}  
-        College: {college}  
-
-        ACTION: {action}  
-        {instruction}
-
-        CURRENT PLAN (Electives Only):  
-        {current_plan_courses}
-
-        AVAILABLE COURSES (Excludes core and current plan):  
-        **Rember this instruction\n\n{instruction_lines}**
-        {available_courses_json}
-
-        RULES:  
-        1. Final plan must include all core courses and have **core + electives ≥ {max_creds} credits**.  
-        2. Modify only from the "AVAILABLE COURSES" list.  
-        3. Prioritize electives that align with the goal: **"{query}"**.  
-        4. Avoid filler or unrelated courses.  
-        5. Only include valid, properly credited graduate-level courses.  
-        6. Do not duplicate any course.  
-        7. Do not overshoot the target credits significantly.  
-        8. If a valid adjustment is not possible, return the current plan unchanged and explain why.  
-        9. Prefer **6000-level (intermediate)** and **7000-level (advanced)** courses.  
-           - 5000-level: Foundational / prerequisites  
-           - 6000-level: Intermediate graduate core  
-           - 7000-level: Advanced or research-focused  
-
-        Output Format:
-        {{
-          "action_taken": "{action}",
-          "courses_modified": ["course_number1", "course_number2"],
-          "final_plan": [
-            {{
-              "title": "string",
-              "description": "string",
-              "credit_hours": "string",
-              "course_number": "string",
-              "college": "string",
-              "department": "string",
-              "dept_code": "string",
-              "prerequisites": "string",
-              "term": "string"
-            }}
-          ],
-          "reasoning": "Brief explanation of the decisions made"
-        }}
-
-
-        Ensure the final elective plan supports the student’s goal and credit requirement.
-        FOLLOW THE GIVEN INSTRUCTIONS STRICTLY.
-        
-        Now {action} course as per instructions.
-
-        Return answer in JSON format only.
-        
-        """
-
-        response_content = llm_json_for_filter_2.invoke(prompt).content
-        response_json = json.loads(response_content)
-        optimized_plan = response_json["final_plan"]
+        available_courses = await courses_within_budget(
+            [c for c in final_course_list if c["course_number"] not in current_course_numbers],
+            state.rephrased_query or query,
+        )
+        optimized_plan = await llm_balance_plan(plan, available_courses, credit_difference, query, college, department, max_creds)
 
-        optimized_credits = sum([int(course["credit_hours"].split(" ")[-1]) for course in optimized_plan])
+        optimized_credits = sum(course_credits(course) for course in optimized_plan)
         total_credits_with_core = optimized_credits + core_courses_credits
 
         if total_credits_with_core >= max_creds:
-            optimized_plans.append(optimized_plan)
-        else:
-            print(
-                f"Plan {plan_idx + 1}: Credit mismatch! Core + electives = {total_credits_with_core} < {max_creds}. Using original plan."
-            )
-            optimized_plans.append(plan)
+            return optimized_plan
+        print(
+            f"Plan {plan_idx + 1}: Credit mismatch! Core + electives = {total_credits_with_core} < {max_creds}. Using original plan."
+        )
+        return plan
+
+    optimized_plans = await gather_with_concurrency(
+        MAX_CONCURRENT_PLAN_CALLS,
+        [optimize_plan(plan_idx, plan) for plan_idx, plan in enumerate(filtered_course_list)]
+    )
 
     return {
         "filtered_course_list": optimized_plans
     }
 
-def parse_credit_hours(credit_str):
-    """
-    Parse the numeric value of credit hours from a credit string.
-
-    If the string contains a "TO" (credit range), the function returns the 
-    upper bound. Otherwise, it attempts to parse the numeric value directly.
-
-    Parameters
-    ----------
-    credit_str : str
-        Credit hours string, e.g., "3", "2 TO 4", "4".
-
-    Returns
-    -------
-    int
-        The parsed integer credit value, or 0 if parsing fails.
-    """
-    if "TO" in credit_str:
-        parts = credit_str.split("TO")
-        try:
-            return int(parts[1].strip())
-        except:
-            return 0
-    else:
-        try:
-            return int(credit_str.strip())
-        except:
-            return 0
-        
-def planning_agent(state: AgentState):
+async def planning_agent(state: AgentState):
     """
     Generate semester-by-semester course schedules for a graduate student.
 
-    This function takes a set of core and elective courses and uses an LLM 
-    to create semester-wise plans that respect prerequisites, credit limits, 
-    and course priorities. Core courses are scheduled first, electives are 
-    distributed, and the plan adheres to minimum and maximum credits per semester.
+    Each elective plan is laid out together with the core courses by the local
+    scheduler (`scheduler.build_semester_plan`), without an LLM call: electives
+    are taken in relevance order up to `max_credits`, every semester stays within
+    `min_creds_per_sem`..`max_creds_per_sem`, prerequisites are scheduled first
+    and capstone/project courses go last. Each plan is also emitted as a draft
+    `plan` event on the custom stream as soon as it is ready.
 
     Parameters
     ----------
     state : AgentState
         The current agent state containing:
         - query (str): The student's academic or career goal.
-        - college (str): College name.
-        - department (str): Department name.
         - filtered_course_list (list): List of elective course plans.
         - core_course_numbers (list): List of required core course numbers.
         - max_creds_per_sem (int): Maximum credits allowed per semester.
@@ -745,126 +863,23 @@ def planning_agent(state: AgentState):
         - "semester_plans" (list): A list of JSON objects, each representing a plan with semester-wise schedules.
         - "filtered_course_list" (list): Updated elective plans filtered according to the courses actually used in the semester schedules.
     """
-    query = state.query
-    college = state.college
-    department = state.department
     filtered_course_list = state.filtered_course_list
-    core_courses = get_course_by_course_number(state.core_course_numbers)
-
-    core_courses_credits = sum([int(course["credit_hours"].split(" ")[-1]) for course in core_courses])
-
-
-    max_creds_per_sem = state.max_creds_per_sem
-    min_creds_per_sem = state.min_creds_per_sem
-    max_total_credits = state.max_credits
-    max_allowed_credits = max_total_credits
-
-    min_number_of_terms = max(1, math.ceil(max_total_credits / max_creds_per_sem))
-    max_number_of_terms = max(2, math.ceil(max_total_credits / min_creds_per_sem))
-
-    remaining_credits = max_total_credits - core_courses_credits
+    core_courses = await aget_course_by_course_number(state.core_course_numbers)
+    writer = get_stream_writer()
 
     semester_plans = []
-
     for plan_idx, elective_plan in enumerate(filtered_course_list):
-        core_courses_json = json.dumps(core_courses, indent=2)
-        elective_courses_json = json.dumps(elective_plan, indent=2)
-
-        average_credit = (
-            sum([int(course["credit_hours"].split(" ")[-1]) for course in elective_plan]) // len(elective_plan)
-            if elective_plan else 3
+        plan = build_semester_plan(
+            plan_number=plan_idx + 1,
+            core_courses=core_courses,
+            electives=elective_plan,
+            goal=state.query,
+            min_creds_per_sem=state.min_creds_per_sem,
+            max_creds_per_sem=state.max_creds_per_sem,
+            max_total_credits=state.max_credits,
         )
-
-        subs_to_add = math.ceil(remaining_credits/average_credit)
-
-
-        prompt = f"""You are an academic advisor creating a semester-by-semester course schedule for a graduate student.
-
-        Student Goal: {query}
-        Department: {department}
-        College: {college}
-
-        FOR REFERENCE:
-
-        Graduate course numbers generally follow this pattern:  
-           - 5000-level courses (5XXX) are foundational and may serve as prerequisites.  
-           - 6000-level courses (6XXX) are intermediate or core graduate topics.  
-           - 7000-level courses (7XXX) are advanced or research-focused graduate courses generally during last semesters.  
-        
-        Use this to guide your selections toward deeper learning.
-        
-        SCHEDULING CONSTRAINTS:
-        - Credits per semester: {min_creds_per_sem} to {max_creds_per_sem}
-        - The number of semesters (terms) can be between {min_number_of_terms} and {max_number_of_terms} both INCLUSIVE
-        - Total credits required (core + electives): at least {max_total_credits} but not more than {max_allowed_credits+1} both INCLUSIVE
-        - Must respect course prerequisites
-        - Core courses and foundational should be prioritized and scheduled early when possible.
-
-        CORE COURSES (must all be strictly included — including Capstone or Project-based courses such as Data Science Capstone):
-        {core_courses_json}
-
-        ELECTIVE COURSES (add **atleast {subs_to_add-1} OR MORE subjects from below list**):
-        {elective_courses_json}
-
-        RULES:
-        1. You need to add **atleast minimum {subs_to_add-1} OR MORE subjects approximately** from the elective courses to comleted the total plan credits.
-        2. Every course in the list must be scheduled exactly once
-        3. Respect prerequisite relationships (schedule prerequisites before dependent courses)
-        4. Each semester must have between {min_creds_per_sem} and {max_creds_per_sem} credits
-        5. Try to balance the workload across semesters
-        6. Assume all courses are available every semester unless blocked by prerequisites
-        7. Do not calculate total credits — simply break the course list into valid semesters
-        8. DO NOT INCLUDE FOUNDATIONAL COURSES IN FINAL SEMESTERS AND ALSO TRY TO PLACE THEM AS SOON AS POSSIBLE 
-        9. EVERY core course listed (including capstone/project courses like "Data Science Capstone") MUST be included exactly once. DO NOT skip any core course — failure to include even one is invalid.
-        10. CAPSTONE or final projects if present in the core courses should be included in final stages of the plan
-        11. **Do not make up course Numbers by yourself.**
-        12. If you fall short of elective course to complete the credits return all the re arranged electives. 
-        
-        Return your response as a JSON object with this exact structure:
-        {{
-        "plan_number": {plan_idx + 1},
-        "total_semesters": "Number of semesters included in the plan",
-        "semester_schedule": [
-            {{
-            "semester": 1,
-            "courses": [
-                {{
-                "course_number": "DS5110",
-                "title": "Course Title",
-                "description": "Summarised Course Description...",
-                "reason": "Brief reason how this course will help the student according to this plan .....",
-                "credit_hours": "4",
-                "type": "core or elective",
-                }}
-            ],
-            "total_credits": 12,
-            }}
-        ],
-        "reason_behind_planning": "Detailed reason why this plan was structured in this way, including how prerequisites were respected, why courses were grouped in specific semesters, how workload was balanced, and any trade-offs made to meet credit or term constraints."
-        }}
-
-        PLEASE DO NOT REPEAT COURSES NOT MATTER WHAT BUT PLEASE DON'T REPEAT COURSES. 
-        **INCLUDE ALL THE COURE COURSES PROVIDED STRICTLY.**
-        **Do not make up course numbers.**
-        Do not hardcode the number of semesters. Instead, use as many semesters as needed within the allowed range. Ensure course credits match and all constraints are satisfied."""
-
-
-        response_content = llm_json_for_planning_agent.invoke(prompt).content
-        response_json = json.loads(response_content)
-
-        # Recalculate total credits per semester
-        for semester in response_json.get("semester_schedule", []):
-            recalculated = sum(parse_credit_hours(c["credit_hours"]) for c in semester["courses"])
-            if "total_credits" not in semester or int(semester["total_credits"]) != recalculated:
-                semester["total_credits"] = recalculated
-
-        # Recalculate total credits for the entire plan
-        calculated_total_credits = sum(
-            semester["total_credits"] for semester in response_json["semester_schedule"]
-        )
-        response_json["total_credits"] = calculated_total_credits
-
-        semester_plans.append(response_json)
+        writer({"event": "plan", "stage": "draft", "plan_number": plan_idx + 1, "plan": plan})
+        semester_plans.append(plan)
 
     filtered_course_numbers_per_plan = []
 
@@ -906,61 +921,14 @@ def get_unique_courses(all_courses, current_courses):
     current_set = {course["course_number"] for course in current_courses}
     return [course for course in all_courses if course["course_number"] not in current_set]
 
-def get_unique_courses_with_credit_matching(all_courses, current_courses, req_credits):
-    """
-    Filter courses to get only unique courses matching a specific credit value.
-
-    Parameters
-    ----------
-    all_courses : list
-        List of all available courses (each course is a dictionary with "course_number" and "credit_hours").
-    current_courses : list
-        List of courses already included in the student's plan.
-    req_credits : int
-        Required credit hours to match.
-
-    Returns
-    -------
-    list
-        Courses that are not in `current_courses` and have `credit_hours` equal to `req_credits`.
-    """
-    current_set = {course["course_number"] for course in current_courses}
-    filtered_courses = []
-
-    for course in all_courses:
-        crn = course["course_number"]
-        if crn not in current_set:
-            course_credits = parse_credit_hours(str(course["credit_hours"]))
-            if course_credits == req_credits:
-                filtered_courses.append(course)
-    
-    return filtered_courses
-
-def cosine_similarity(a, b):
-    """
-    Compute the cosine similarity between two vectors.
-
-    Parameters
-    ----------
-    a : np.ndarray
-        First vector.
-    b : np.ndarray
-        Second vector.
-
-    Returns
-    -------
-    float
-        Cosine similarity value between vectors `a` and `b`.
-    """
-    dot_product = np.dot(a, b)
-    norm_a = np.linalg.norm(a)
-    norm_b = np.linalg.norm(b)
-    return dot_product / (norm_a * norm_b + 1e-10)
-
-def get_best_similar_option_by_course(current_course, all_courses):
+async def get_best_similar_option_by_course(current_course, all_courses):
     """
     Find the most semantically similar course from a list based on an existing course.
 
+    The stored embedding of `current_course` is compared against the stored 
+    embeddings of `all_courses` with one matrix-vector product, so no 
+    embedding call is made when every course is in the catalog.
+
     Parameters
     ----------
     current_course : dict
@@ -975,26 +943,21 @@ def get_best_similar_option_by_course(current_course, all_courses):
         - best_match (dict): The course from `all_courses` most similar to `current_course`.
         - best_index (int): Index of the best matching course in `all_courses`.
     """
-    curr_str = f"{current_course['course_number']} - {current_course['title']} - {current_course['description']}"
-    embd1 = embeddings.embed_query(curr_str)
-
-    best_score, best_index = -1, 0
+    embd1 = course_embedding_index.vector(current_course["course_number"])
+    if embd1 is None:
+        embd1 = await embeddings.aembed_query(course_to_text(current_course))
 
-    for idx, course in enumerate(all_courses):
-        new_str = f"{course['course_number']} - {course['title']} - {course['description']}"
-        embd2 = embeddings.embed_query(new_str)
-        
-        similarity = cosine_similarity(embd1, embd2)
-        
-        if similarity > best_score:
-            best_score = similarity
-            best_index = idx
+    similarities = await course_embedding_index.similarities(embd1, all_courses)
+    best_index = int(np.argmax(similarities))
     
     return all_courses[best_index], best_index
 
-def get_best_similar_option_by_query(user_query , rephrased_query , all_courses):
+async def rank_courses_by_query(user_query, rephrased_query, all_courses):
     """
-    Find the course most semantically similar to a user query from a list of courses.
+    Order courses by semantic similarity to a user query, most similar first.
+
+    Only the combined query is embedded; the candidate courses are scored 
+    against their stored embeddings with one matrix-vector product.
 
     Parameters
     ----------
@@ -1003,31 +966,22 @@ def get_best_similar_option_by_query(user_query , rephrased_query , all_courses)
     rephrased_query : str
         The LLM-rephrased version of the user query.
     all_courses : list
-        A list of course dictionaries to compare against.
+        A list of course dictionaries to rank.
 
     Returns
     -------
-    dict
-        The course from `all_courses` that is most semantically similar to the combined query.
+    list
+        The courses of `all_courses`, most similar to the combined query first.
     """
+    if not all_courses:
+        return []
     curr_str = f"{user_query}\n{rephrased_query}"
-    embd1 = embeddings.embed_query(curr_str)
-
-    best_score, best_index = -1, 0
+    embd1 = await embeddings.aembed_query(curr_str)
 
-    for idx, course in enumerate(all_courses):
-        new_str = f"{course['course_number']} - {course['title']} - {course['description']}"
-        embd2 = embeddings.embed_query(new_str)
-        
-        similarity = cosine_similarity(embd1, embd2)
-        
-        if similarity > best_score:
-            best_score = similarity
-            best_index = idx
-    
-    return all_courses[best_index]
+    similarities = await course_embedding_index.similarities(embd1, all_courses)
+    return [all_courses[idx] for idx in np.argsort(-similarities, kind="stable")]
 
-def final_duplicate_check(state: AgentState):
+async def final_duplicate_check(state: AgentState):
     """
     Ensure there are no duplicate courses across semester plans by replacing duplicates 
     with the most similar available alternative courses.
@@ -1069,7 +1023,7 @@ def final_duplicate_check(state: AgentState):
 
                 if found:
                     # Replace duplicate
-                    replacement, repl_index = get_best_similar_option_by_course(
+                    replacement, repl_index = await get_best_similar_option_by_course(
                         current_course=course,
                         all_courses=courses_not_included
                     )
@@ -1077,8 +1031,8 @@ def final_duplicate_check(state: AgentState):
                     plan["semester_schedule"][semester_index]["courses"][course_index] = replacement
 
                     credits_diff = (
-                        parse_credit_hours(str(replacement["credit_hours"])) -
-                        parse_credit_hours(str(course["credit_hours"]))
+                        course_credits(replacement) -
+                        course_credits(course)
                     )
 
                     plan["semester_schedule"][semester_index]["total_credits"] += credits_diff
@@ -1097,10 +1051,16 @@ def final_duplicate_check(state: AgentState):
         "filtered_course_list": final_filtered_course_list
     }
 
-def final_course_addition_check(state: AgentState):
+async def final_course_addition_check(state: AgentState):
     """
-    Ensure each semester plan meets the total credit requirements by adding additional
-    elective courses if needed, prioritizing courses semantically similar to the student's goal.
+    Fill each semester plan up towards the total credit limit with additional
+    elective courses, prioritizing courses semantically similar to the student's goal.
+
+    Candidates are taken in order of similarity while the plan total stays within
+    `max_credits`, and the plan is laid out again by `scheduler.build_semester_plan`,
+    so added courses get a semester that respects the per-semester bounds,
+    prerequisites and capstone placement, plus their own `reason` and `type`.
+    A plan is only replaced when the new layout carries more credits.
 
     Parameters
     ----------
@@ -1110,6 +1070,7 @@ def final_course_addition_check(state: AgentState):
         - filtered_course_list: Current elective courses selected per plan.
         - final_course_list: All available courses.
         - max_credits: Maximum total credits allowed.
+        - min_creds_per_sem: Minimum credits required per semester.
         - max_creds_per_sem: Maximum credits allowed per semester.
         - query: Original user query.
         - rephrased_query: LLM-rephrased user query.
@@ -1127,62 +1088,43 @@ def final_course_addition_check(state: AgentState):
     plans = state.semester_plans
     max_creds = state.max_credits
     filtered_course_list = state.filtered_course_list
-    all_courses = state.final_course_list
-    max_credits_per_sem = state.max_creds_per_sem        
+    ranked_courses = None
 
     for plan_idx, plan in enumerate(plans):
         if plan["total_credits"] >= max_creds:
             continue
 
-        current_filtered = filtered_course_list[plan_idx]
-        dummy_all_courses = all_courses[:]  # shallow copy, OK since we only filter
-
-        for semester in plan["semester_schedule"]:
-            sem_credits = semester["total_credits"]
-            if sem_credits >= max_credits_per_sem:
-                continue
-
-            remaining_credits = max_credits_per_sem - sem_credits
-
-            # Try to find a course matching exact credits, or decrement if not found
-            temp_credits = remaining_credits
-            courses_not_included = []
-
-            while temp_credits > 0:
-                courses_not_included = get_unique_courses_with_credit_matching(
-                    dummy_all_courses,
-                    current_courses=current_filtered,
-                    req_credits=temp_credits
-                )
-                if courses_not_included:
-                    break
-                temp_credits -= 1
-
-            if not courses_not_included:
-                continue
-
-            course_to_add = get_best_similar_option_by_query(
-                state.query,
-                state.rephrased_query,
-                all_courses=courses_not_included
-            )
-
-            if not course_to_add:
-                continue
-
-            # Add course to semester
-            semester["courses"].append(course_to_add)
-            credits_to_add = parse_credit_hours(str(course_to_add["credit_hours"]))
-            semester["total_credits"] += credits_to_add
-            plan["total_credits"] += credits_to_add
-
-            current_filtered.append(course_to_add)
-
-            # Remove added course from dummy_all_courses
-            dummy_all_courses = get_unique_courses(
-                all_courses=dummy_all_courses,
-                current_courses=current_filtered
-            )
+        if ranked_courses is None:
+            ranked_courses = await rank_courses_by_query(state.query, state.rephrased_query, state.final_course_list)
+
+        planned = [course for semester in plan["semester_schedule"] for course in semester["courses"]]
+        remaining_credits = max_creds - plan["total_credits"]
+        candidates = [
+            course for course in get_unique_courses(ranked_courses, current_courses=planned)
+            if 0 < course_credits(course) <= remaining_credits
+        ]
+        if not candidates:
+            continue
+
+        # Courses replaced by final_duplicate_check carry no type and count as electives.
+        updated_plan = build_semester_plan(
+            plan_number=plan["plan_number"],
+            core_courses=[Course.intern(course) for course in planned if course.get("type") == "core"],
+            electives=[Course.intern(course) for course in planned if course.get("type") != "core"] + candidates,
+            goal=state.query,
+            min_creds_per_sem=state.min_creds_per_sem,
+            max_creds_per_sem=state.max_creds_per_sem,
+            max_total_credits=max_creds,
+        )
+        if updated_plan["total_credits"] <= plan["total_credits"]:
+            continue
+
+        plans[plan_idx] = updated_plan
+        planned_numbers = {course["course_number"] for course in planned}
+        filtered_course_list[plan_idx].extend(
+            course for semester in updated_plan["semester_schedule"] for course in semester["courses"]
+            if course["course_number"] not in planned_numbers
+        )
 
     return {
         "planning_completed": True,
@@ -1190,4 +1132,4 @@ def final_course_addition_check(state: AgentState):
         "semester_plans": plans,
         "messages": [["AI","Planning",plans]],
         "filtered_course_list": filtered_course_list
-    }
\ No newline at end of file
+    }
@@ -0,0 +1,146 @@
+from typing import Any, Dict, Iterable, List, Sequence
+from .catalog import prerequisite_course_numbers, prompt_fields
+from .courseSummaries import summarize_description
+import json
+import threading
+
+def course_summary(course: Dict[str, Any]) -> str:
+    """One-line summary of a course for prompts: the stored ingest-time one when present."""
+    return course.get("summary") or summarize_description(course.get("description") or "")
+
+class CourseTable:
+    """
+    Compact prompt encoding for course lists.
+
+    Instead of `json.dumps(courses, indent=2)` (every key repeated for every
+    course, full descriptions), courses are rendered one per line as
+
+        id|course|title|cr|dept|prereqs|summary
+
+    with a short numeric `id`, the credit string, the dept_code, the
+    in-catalog prerequisite course numbers and a one-line description
+    summary. Department and college names, which are the same for most rows,
+    are listed once per dept_code below the table.
+
+    IDs are assigned in the order courses are first rendered and stay the
+    same across every `render` call of one table, so a prompt can show
+    several lists (current plan, available courses) and the model answers
+    with IDs from any of them. `decode` maps such an answer back to the
+    course records; unknown IDs are dropped, and course numbers are
+    accepted too in case the model answers with those.
+    """
+
+    HEADER = "id|course|title|cr|dept|prereqs|summary"
+    FORMAT = (
+        "Courses are listed one per line as `id|course|title|cr|dept|prereqs|summary` "
+        "(cr = credit hours, prereqs = prerequisite course numbers); department and "
+        "college names are listed per dept code below each table. Refer to courses by `id`."
+    )
+
+    def __init__(self):
+        self._courses: Dict[str, Any] = {}
+        self._ids: Dict[str, str] = {}
+
+    def id_of(self, course: Dict[str, Any]) -> str:
+        course_number = course["course_number"]
+        if course_number not in self._ids:
+            self._ids[course_number] = str(len(self._ids) + 1)
+            self._courses[self._ids[course_number]] = course
+        return self._ids[course_number]
+
+    def render(self, courses: Sequence[Dict[str, Any]]) -> str:
+        lines = [self.HEADER]
+        departments = {}
+        for course in courses:
+            lines.append(f"{self.id_of(course)}|{course_prompt_text(course, 'table')}")
+            departments.setdefault(course.get("dept_code", ""), (course.get("department", ""), course.get("college", "")))
+        lines.append("")
+        lines += [f"{code}: {department} / {college}" for code, (department, college) in departments.items() if code]
+        return "\n".join(lines)
+
+    def decode(self, ids: Iterable[Any]) -> List[Dict[str, Any]]:
+        """Course records for the given IDs (or course numbers) in answer order, without repeats."""
+        found, seen = [], set()
+        for key in ids:
+            key = str(key.get("id", key.get("course_number", "")) if isinstance(key, dict) else key).strip()
+            course = self._courses.get(key) or self._courses.get(self._ids.get(key, ""))
+            if course is not None and course["course_number"] not in seen:
+                seen.add(course["course_number"])
+                found.append(course)
+        return found
+
+# Tokenizer of the planning model (gpt-4.1-nano), loaded on first use.
+TOKEN_ENCODING = "o200k_base"
+
+_encoding = None
+_encoding_lock = threading.Lock()
+# (course_number, course_format) -> tokens of that course's prompt text.
+_course_tokens: Dict[tuple, int] = {}
+
+def count_tokens(text: str) -> int:
+    """
+    Tokens of `text` under the planning model's tokenizer, counted locally with
+    tiktoken. If the encoding cannot be loaded (no network on first use and no
+    cached copy), a characters / 4 estimate is used instead.
+    """
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+                except Exception:
+                    _encoding = False
+    if _encoding is False:
+        return (len(text) + 3) // 4
+    return len(_encoding.encode(text))
+
+def course_prompt_text(course: Dict[str, Any], course_format: str) -> str:
+    """The text one course takes up in a prompt of the given format: a `CourseTable` row without its id, or indented JSON."""
+    if course_format == "json":
+        return json.dumps(prompt_fields(course), indent=2)
+    return "|".join([
+        course["course_number"],
+        course.get("title", "").replace("|", "/"),
+        str(course.get("credit_hours", "")),
+        course.get("dept_code", ""),
+        " ".join(prerequisite_course_numbers(course.get("prerequisite_expr"))) or "-",
+        course_summary(course).replace("|", "/"),
+    ])
+
+def plan_outline(plan: Dict[str, Any]) -> str:
+    """A semester plan as one line per course (number, title, credits, summary) under its semester."""
+    lines = []
+    for semester in plan.get("semester_schedule", []):
+        lines.append(f"Semester {semester['semester']}:")
+        lines += [
+            f"- {course['course_number']} {course.get('title', '')} ({course.get('credit_hours', '')} cr): {course_summary(course)}"
+            for course in semester.get("courses", [])
+        ]
+    return "\n".join(lines)
+
+def course_tokens(course: Dict[str, Any], course_format: str) -> int:
+    key = (course["course_number"], course_format)
+    if key not in _course_tokens:
+        _course_tokens[key] = count_tokens(course_prompt_text(course, course_format)) + 1
+    return _course_tokens[key]
+
+def fit_token_budget(courses: Sequence[Dict[str, Any]], scores: Sequence[float], budget: int, course_format: str) -> List[Dict[str, Any]]:
+    """
+    The highest-scoring courses whose prompt text fits in `budget` tokens.
+
+    Courses are taken in descending score order (ties keep their input order)
+    until the next one would overflow the budget; the best course is always
+    kept so a prompt never ends up without candidates. The result is in
+    score order, most relevant first.
+    """
+    ranked = sorted(range(len(courses)), key=lambda idx: -float(scores[idx]))
+    selected, used = [], 0
+    for idx in ranked:
+        tokens = course_tokens(courses[idx], course_format)
+        if selected and used + tokens > budget:
+            break
+        selected.append(courses[idx])
+        used += tokens
+    return selected
@@ -1,6 +1,15 @@
 from pydantic import BaseModel,Field
 from typing import Annotated,Sequence,List,Dict,Union,Any
+import copy
+import dataclasses
 import operator
+from .catalog import Course
+
+def extend_or_reset(left: list, right: Union[list, None]) -> list:
+    """Reducer that appends updates from parallel branches, or clears the channel when given None."""
+    if right is None:
+        return []
+    return list(left) + list(right)
 
 class UserIntent(BaseModel):
     """Users Current Query Intent"""
@@ -16,6 +25,9 @@ class CourseAttributes(BaseModel):
         
         course_titles (List[str]): A list of course titles (e.g., ["Machine Learning", "Data Visualization"])
             used for querying the course database by title.
+
+        department_code (str): Department code the student explicitly asked about (e.g., "CS"),
+            searched first instead of their own department. Empty when they named none.
     """
     course_numbers: List[str] = Field(
         description="Stores list of course numbers as strings for searching in database by course_number"
@@ -23,6 +35,10 @@ class CourseAttributes(BaseModel):
     course_titles: List[str] = Field(
         description="Stores list of course titles as strings for searching in database by title"
     )    
+    department_code: str = Field(
+        description="Department code the student explicitly asked about (e.g. \"CS\"), empty string if none",
+        default=""
+    )
 
 class AgentState(BaseModel):
     """Full Agent State"""
@@ -38,24 +54,27 @@ class AgentState(BaseModel):
     
     intent:str = Field(description="Users Current Query Intent",default="")
     
-    final_course_list: List[Dict[str, str]] = Field(description="Contains the fetched courses from all the plans.",default=[])    
-    course_list: List[Dict[str, str]] = Field(description = "Contains the fetched courses for a specific goal for a specific plan.",default=[])
+    final_course_list: List[Course] = Field(description="Contains the fetched courses from all the plans.",default=[])    
+    course_list: List[Course] = Field(description = "Contains the fetched courses for a specific goal for a specific plan.",default=[])
     
-    courses_from_users_query : List[Dict[str,str]] = Field(description="Contains courses mentioned in users query by course_numbers or course_titles.",default=[]) 
+    courses_from_users_query : List[Course] = Field(description="Contains courses mentioned in users query by course_numbers or course_titles.",default=[]) 
 
     courses_from_users_query_after_summarization : Dict[str,Any] = Field(description="containes final list of coures after llm call courses_from_users_query",default={})
 
     core_course_numbers : List[str] = Field(description="Contains course numbers of Core Courses the student has to do.",default=[])
-    core_course: List[Dict[str, str]] = Field(description="Contains Details about Core Courses the student has to do.",default=[])
+    core_course: List[Course] = Field(description="Contains Details about Core Courses the student has to do.",default=[])
     
     course_numbers: List[str] = Field(description="Stores list of course numbers as strings for searching in database by course_number",default=[])
     course_titles: List[str] = Field(description="Stores list of course titles as strings for searching in database by title",default=[])
+    search_department: str = Field(description="Department code the user's query asked about; title searches prefer it over the student's department when set",default="")
     
     max_credits:int = Field(description="Maximum credits the student can do during their degree",default=0)
     max_creds_per_sem:int = Field(description="Maximum credits the student can do per semester",default=0)
     min_creds_per_sem:int = Field(description="Minimum credits the student needs to do per semester",default=0)
     
-    filtered_course_list: list[list[Dict[str,str]]] = Field(description="List containing list of filtered courses in form of dictionary from full course list",default=[])
+    filtered_course_list: list[list[Course]] = Field(description="List containing list of filtered courses in form of dictionary from full course list",default=[])
+
+    plan_candidates: Annotated[List[Dict[str,Any]],extend_or_reset] = Field(default_factory=list,description="Candidate plans written concurrently by the plan generation branches.")
     
     number_of_plans : int = Field(description="Current Number of plans made",default=0)
     max_number_of_plans: int = Field(description="Total Number of plans to be made",default=1) 
@@ -75,4 +94,40 @@ class AgentState(BaseModel):
         description="Contains information about the changes to be done in the plan."
     )
 
-    error:str =  Field(description="Error during Execution",default="")
\ No newline at end of file
+    error:str =  Field(description="Error during Execution",default="")
+
+def lightweight_state_schema(model: type) -> type:
+    """
+    Build a plain dataclass with the same fields, defaults and reducers as a
+    pydantic state model.
+
+    LangGraph rebuilds the state object for every node it runs; for a pydantic
+    model that means validating every field (each course in every course
+    list) on each transition, while a dataclass is only constructed. Values
+    are not checked or coerced, so input has to be validated before it
+    enters the graph (see `app.get_state`).
+    """
+    fields = []
+    for name, info in model.model_fields.items():
+        annotation = info.annotation
+        reducers = tuple(item for item in info.metadata if callable(item))
+        if reducers:
+            annotation = Annotated[(annotation, *reducers)]
+        if info.default_factory is not None:
+            default = dataclasses.field(default_factory=info.default_factory)
+        elif isinstance(info.default, (list, dict, set)):
+            default = dataclasses.field(default_factory=lambda value=info.default: copy.copy(value))
+        else:
+            default = dataclasses.field(default=info.default)
+        fields.append((name, annotation, default))
+    schema = dataclasses.make_dataclass(f"Lightweight{model.__name__}", fields)
+    schema.__module__ = __name__
+    return schema
+
+LightweightAgentState = lightweight_state_schema(AgentState)
+
+def copy_state(state, update: Dict[str, Any]):
+    """Copy of a state object of either schema with the `update` fields replaced (reducers are not applied)."""
+    if isinstance(state, BaseModel):
+        return state.model_copy(update=update)
+    return dataclasses.replace(state, **update)
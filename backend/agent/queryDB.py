@@ -1,9 +1,14 @@
 from dotenv import load_dotenv
-from typing import List
+from typing import Dict, List, Optional
 import re
 from langchain_community.vectorstores import Chroma
-from langchain_openai.embeddings import OpenAIEmbeddings
+from .embeddingCache import embeddings
+from .catalog import CourseCatalog, parse_course_document
+from .config import COURSE_SUMMARIES_PATH, RETRIEVER_BACKEND, SEARCH_TIER_PENALTY
+from .courseRetriever import make_retriever
+from .embeddingIndex import CourseEmbeddingIndex
 import warnings
+import asyncio
 import os
 
 warnings.filterwarnings("ignore")
@@ -16,29 +21,36 @@ vector_db_path = os.path.join(PATH,"agent","VectorDB")
 
 # print(vector_db_path)
 
-embeddings = OpenAIEmbeddings(model="text-embedding-3-large")
-
 regular_courses_database = Chroma(collection_name="RegularCourses",embedding_function=embeddings,persist_directory = vector_db_path)
 special_topics_database = Chroma(collection_name="SpecialCourses",embedding_function=embeddings,persist_directory= vector_db_path)
 
-regular_retriever_for_search_using_titles_for_n = regular_courses_database.as_retriever(search_kwargs={'k': 3})
-regular_retriever_for_search_using_titles_for_1 = regular_courses_database.as_retriever(search_kwargs={'k': 1})
+# Stored course embeddings of both collections, shared by similarity scoring and the in-memory retrievers.
+course_embedding_index = CourseEmbeddingIndex([regular_courses_database, special_topics_database])
+
+# Nearest-neighbour search over each collection: Chroma itself, or an in-memory index (RETRIEVER_BACKEND).
+regular_courses_retriever = make_retriever(regular_courses_database, RETRIEVER_BACKEND, course_embedding_index)
+special_topics_retriever = make_retriever(special_topics_database, RETRIEVER_BACKEND, course_embedding_index)
 
-special_retriever_for_search_using_titles = special_topics_database.as_retriever(search_kwargs={'k': 1})
+# Matches returned per title by get_course_by_course_titles
+regular_title_search_k_for_n = 3
+regular_title_search_k_for_1 = 1
+special_title_search_k = 1
+
+course_catalog = CourseCatalog([regular_courses_database, special_topics_database], summaries_path=COURSE_SUMMARIES_PATH)
 
 def get_course_by_course_number(course_numbers:List[str]):
 
     """
-    Retrieve course details from the vector databases based on course numbers.
+    Retrieve course details from the in-memory catalog based on course numbers.
 
     Args:
         course_numbers (list[str]): A list of course numbers to search for.
 
     Process:
-        - Query both the RegularCourses and SpecialCourses Chroma collections.
-        - Combine results from both databases.
-        - Extract a clean description (second line of stored document if available).
-        - Filter out internal metadata keys like "data_id".
+        - Look each course number up in `course_catalog`, which holds both the
+          RegularCourses and SpecialCourses collections with descriptions
+          already parsed.
+        - Unknown course numbers are skipped; no database round trip is made.
 
     Returns:
         list[dict]: A list of course dictionaries containing:
@@ -49,26 +61,94 @@ def get_course_by_course_number(course_numbers:List[str]):
             - Other metadata from the database.
     """
 
-    regular_courses = regular_courses_database.get(where={"course_number": {"$in": course_numbers}})
-    special_courses = special_topics_database.get(where={"course_number": {"$in": course_numbers}})
+    return course_catalog.get_many(course_numbers)
+
+def search_tiers(college: str = "", department: str = "") -> List[Optional[Dict]]:
+    """
+    Chroma `where` filters of the department-first search cascade.
 
-    all_documents = regular_courses.get("documents", []) + special_courses.get("documents", [])
-    all_metadatas = regular_courses.get("metadatas", []) + special_courses.get("metadatas", [])
+    The student's college and department are resolved against the catalog
+    (`CourseCatalog.search_scope`) and turn into disjoint tiers: the same
+    dept_code, then the rest of the college, then everything else. Tiers
+    for values the catalog does not know are left out; with neither known
+    the search is a single unfiltered query (`[None]`).
+    """
+    if not college and not department:
+        return [None]
+    dept_code, college = course_catalog.search_scope(college, department)
+    if dept_code and college:
+        return [
+            {"dept_code": dept_code},
+            {"$and": [{"college": college}, {"dept_code": {"$ne": dept_code}}]},
+            {"college": {"$ne": college}},
+        ]
+    if dept_code:
+        return [{"dept_code": dept_code}, {"dept_code": {"$ne": dept_code}}]
+    if college:
+        return [{"college": college}, {"college": {"$ne": college}}]
+    return [None]
 
-    course_docs = []
-    for doc, meta in zip(all_documents, all_metadatas):
-        lines = doc.split("\n")
-        description = lines[1].strip() if len(lines) > 1 else ""
-        filtered_meta = {k: v for k, v in meta.items() if k not in ['data_id']}
-        
-        course_docs.append({
-            **filtered_meta,
-            "description": description
-        })
-        
-    return course_docs
+def search_by_vectors(retriever, vectors: List[List[float]], k: int, tiers: List[Optional[Dict]] = (None,), strict: bool = False):
+    """
+    Run batched nearest-neighbour queries against a course collection.
+
+    Args:
+        retriever: The collection's retriever (`courseRetriever`).
+        vectors (list[list[float]]): Query embeddings, one per title.
+        k (int): Number of matches to return per query embedding.
+        tiers (list[dict | None]): Disjoint metadata filters, nearest the
+            student first (see `search_tiers`). Each tier is one batched query
+            for its top `k`; the hits are merged by cosine similarity less
+            `SEARCH_TIER_PENALTY` per tier after the first, so a much closer
+            course from another department still outranks a department one.
+        strict (bool): Keep the tiers in order instead: a tier is queried
+            only for the embeddings that still have fewer than `k` matches,
+            so the department tier alone answers whenever it holds enough.
+
+    Returns:
+        list[list[dict]]: Catalog records (with the typed credit/prerequisite
+        fields) for each query embedding, best match first.
+    """
+    if strict:
+        matches = [[] for _ in vectors]
+        pending = list(range(len(vectors)))
+        for where in tiers:
+            if not pending:
+                break
+            hits = retriever.query([vectors[idx] for idx in pending], k, where)
+            for idx, tier_hits in zip(pending, hits):
+                found = {course["course_number"] for course in matches[idx]}
+                for doc, meta in tier_hits:
+                    if len(matches[idx]) < k and meta.get("course_number") not in found:
+                        matches[idx].append(course_catalog.record(parse_course_document(doc, meta)))
+            pending = [idx for idx in pending if len(matches[idx]) < k]
+        return matches
+
+    scored = [[] for _ in vectors]
+    if vectors:
+        for tier, where in enumerate(tiers):
+            for idx, tier_hits in enumerate(retriever.query_scored(vectors, k, where)):
+                scored[idx].extend((score - tier * SEARCH_TIER_PENALTY, tier, doc, meta) for score, doc, meta in tier_hits)
+    matches = []
+    for hits in scored:
+        found, courses = set(), []
+        for _, _, doc, meta in sorted(hits, key=lambda hit: (-hit[0], hit[1])):
+            if len(courses) < k and meta.get("course_number") not in found:
+                courses.append(course_catalog.record(parse_course_document(doc, meta)))
+                found.add(meta.get("course_number"))
+        matches.append(courses)
+    return matches
+
+def search_courses(query: str, k: int, college: str = "", department: str = "", retriever = regular_courses_retriever, strict: bool = False):
+    """
+    Top `k` courses for a free-text query, preferring the same department,
+    then the rest of the college, then all others (`search_tiers`); with
+    `strict`, later tiers only fill what the earlier ones leave short (see
+    `search_by_vectors`). Without college and department the search is unfiltered.
+    """
+    return search_by_vectors(retriever, [embeddings.embed_query(query)], k, search_tiers(college, department), strict)[0]
 
-def get_course_by_course_titles(course_titles: List[str],k=None):
+def get_course_by_course_titles(course_titles: List[str],k=None,college: str = "",department: str = ""):
     """
     Retrieve course details from the vector databases based on course titles.
 
@@ -77,13 +157,19 @@ def get_course_by_course_titles(course_titles: List[str],k=None):
         k (int, optional): Number of top matches to return per query.
             - If None: returns top 3 matches.
             - If set: returns top 1 match.
+        college (str, optional): Student's college, searched after the department.
+        department (str, optional): Student's department, searched first.
 
     Process:
-        - Use different retrievers for regular vs. special topic courses.
+        - Embed all titles in a single `embed_documents` batch.
         - Detect special topic courses by checking for keywords in the title.
-        - Query the appropriate vector store retriever.
-        - Extract clean description from document content.
-        - Remove internal metadata keys like "data_id".
+        - Send one batched similarity query per collection (regular vs. special topics)
+          and search tier (`search_tiers`): the student's department, the rest of
+          the college and the whole catalog, merged by similarity with a small
+          penalty per tier away from the department (`SEARCH_TIER_PENALTY`).
+        - Regroup the matches per title, in the order the titles were given.
+        - Extract clean description from document content and drop internal
+          metadata keys like "data_id".
 
     Returns:
         list[dict]: A list of course dictionaries containing:
@@ -93,32 +179,36 @@ def get_course_by_course_titles(course_titles: List[str],k=None):
             - description (str)
             - Other metadata from the database.
     """
+    if not course_titles:
+        return []
+
     if k is None:
-        regular_retriever_for_search_using_titles = regular_retriever_for_search_using_titles_for_n
+        regular_k = regular_title_search_k_for_n
     else:
-        regular_retriever_for_search_using_titles = regular_retriever_for_search_using_titles_for_1
-    course_docs = []
+        regular_k = regular_title_search_k_for_1
 
-    for title in course_titles:
-        if re.match(r"(special|topics)",title.lower()):
-            docs = special_retriever_for_search_using_titles.invoke(title)
-        else:
-            docs = regular_retriever_for_search_using_titles.invoke(title)
-        for doc_obj in docs:
-            doc = doc_obj.page_content
-            meta = doc_obj.metadata
-            lines = doc.split("\n")
-            description = lines[1].strip() if len(lines) > 1 else ""
-            filtered_meta = {k: v for k, v in meta.items() if k not in ['data_id']}
-            
-            course_docs.append({
-                **filtered_meta,
-                "description": description
-            })
+    vectors = embeddings.embed_documents(course_titles)
+
+    special_positions = [idx for idx, title in enumerate(course_titles) if re.match(r"(special|topics)",title.lower())]
+    special_set = set(special_positions)
+    regular_positions = [idx for idx in range(len(course_titles)) if idx not in special_set]
+
+    tiers = search_tiers(college, department)
+    matches_per_title = {}
+    for positions, retriever, search_k in (
+        (regular_positions, regular_courses_retriever, regular_k),
+        (special_positions, special_topics_retriever, special_title_search_k),
+    ):
+        matches = search_by_vectors(retriever, [vectors[idx] for idx in positions], search_k, tiers)
+        matches_per_title.update(zip(positions, matches))
+
+    course_docs = []
+    for idx in range(len(course_titles)):
+        course_docs.extend(matches_per_title.get(idx, []))
 
     return course_docs
 
-def query_database(course_numbers: List[str], course_titles: List[str], k = None):
+def query_database(course_numbers: List[str], course_titles: List[str], k = None, college: str = "", department: str = ""):
     """
     Retrieve course details by course numbers and/or course titles.
 
@@ -126,6 +216,8 @@ def query_database(course_numbers: List[str], course_titles: List[str], k = None
         course_numbers (list[str]): Course numbers to search for in the database.
         course_titles (list[str]): Course titles to search for in the database.
         k (int, optional): Number of top matches to return for title-based searches.
+        college (str, optional): College whose courses title searches prefer.
+        department (str, optional): Department whose courses title searches prefer most.
 
     Process:
         - Fetch matching courses by course number (if provided).
@@ -141,6 +233,26 @@ def query_database(course_numbers: List[str], course_titles: List[str], k = None
         results.extend(get_course_by_course_number(course_numbers))
 
     if course_titles:
-        results.extend(get_course_by_course_titles(course_titles,k=k))
+        results.extend(get_course_by_course_titles(course_titles,k=k,college=college,department=department))
 
     return results
+
+async def aget_course_by_course_number(course_numbers:List[str]):
+    """
+    Async variant of `get_course_by_course_number`.
+
+    Lookups are served from the in-memory catalog; if it has not been loaded
+    yet, the (blocking) load runs in a worker thread.
+    """
+    if not course_catalog.loaded:
+        await asyncio.to_thread(course_catalog.load)
+    return get_course_by_course_number(course_numbers)
+
+async def aquery_database(course_numbers: List[str], course_titles: List[str], k = None, college: str = "", department: str = ""):
+    """
+    Async variant of `query_database`.
+
+    Runs the (blocking) vector searches and title embeddings in a worker thread
+    so that graph nodes can await it without stalling the event loop.
+    """
+    return await asyncio.to_thread(query_database, course_numbers, course_titles, k, college, department)
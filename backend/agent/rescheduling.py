@@ -4,7 +4,9 @@ import json
 import re
 from .pydanticModels import AgentState
 from langchain_openai import ChatOpenAI
-from .queryDB import query_database
+from .queryDB import aquery_database
+from .catalog import course_credits
+from .promptEncoding import plan_outline
 import warnings
 from langchain_core.messages import AIMessage
 
@@ -53,7 +55,7 @@ def get_course_numbers_from_plan(plan: dict) -> List[str]:
                 course_numbers.append(course_number)
     return course_numbers
 
-def extract_course_attributes_for_rescheduling(state: AgentState):
+async def extract_course_attributes_for_rescheduling(state: AgentState):
     """
     Determine which courses in a given plan should be replaced based on the user's rescheduling request.
 
@@ -116,7 +118,7 @@ def extract_course_attributes_for_rescheduling(state: AgentState):
     }}
     """
 
-    response = llm_for_rescheduling_agent.invoke(prompt).content
+    response = (await llm_for_rescheduling_agent.ainvoke(prompt)).content
 
     replacements = json.loads(response)
 
@@ -138,7 +140,7 @@ def extract_course_attributes_for_rescheduling(state: AgentState):
     
     return {"rescheduling_attributes": filtered_repl}
 
-def replace_courses(state:AgentState):
+async def replace_courses(state:AgentState):
     """
     Apply course replacements in the target plan and update total credits.
 
@@ -151,7 +153,8 @@ def replace_courses(state:AgentState):
     Process:
         - For each course in the specified plan, check if a replacement is required.
         - If a replacement is a valid course number, query the DB by course number.
-        - If a replacement is a title/description, query the DB by course title.
+        - If a replacement is a title/description, query the DB by course title,
+          preferring the student's department and then college.
         - Update the course in the plan, adjust semester and total credits.
         - Track old→new course mappings for reporting.
 
@@ -177,14 +180,14 @@ def replace_courses(state:AgentState):
                 replacement_value = replacement_value.strip()
                 match = re.search(r"(^[A-Z]+\d{4})",replacement_value)
                 if match:
-                    replacement = query_database(course_numbers=[replacement_value],course_titles=[])[0]
+                    replacement = (await aquery_database(course_numbers=[replacement_value],course_titles=[]))[0]
                 else:
-                    replacement = query_database(course_numbers=[],course_titles=[replacement_value],k=1)[0]
+                    replacement = (await aquery_database(course_numbers=[],course_titles=[replacement_value],k=1,college=state.college,department=state.department))[0]
                 new_mapping[f"{course_number} - {course["title"]}"] = f"{replacement["course_number"]} - {replacement["title"]}"
                 
                 plan["semester_schedule"][semester_idx]["courses"][course_idx] = replacement            
             
-            semester_credits += int(plan["semester_schedule"][semester_idx]["courses"][course_idx]["credit_hours"].split(" ")[-1])
+            semester_credits += course_credits(plan["semester_schedule"][semester_idx]["courses"][course_idx])
         
         plan["semester_schedule"][semester_idx]["total_credits"] = semester_credits
         
@@ -200,7 +203,7 @@ def replace_courses(state:AgentState):
             "rescheduling_attributes":new_mapping
     }
 
-def generate_summary_for_rescheduled_plan(state: "AgentState"):
+async def generate_summary_for_rescheduled_plan(state: "AgentState"):
     """
     Create a short summary explaining changes in the rescheduled plan.
 
@@ -213,7 +216,8 @@ def generate_summary_for_rescheduled_plan(state: "AgentState"):
 
     Process:
         - Generate a text prefix listing all replaced courses.
-        - Ask the LLM to summarize the updated plan in 2–3 lines:
+        - Ask the LLM to summarize the updated plan (as a per-semester outline
+          of course numbers, titles, credits and stored summaries) in 2–3 lines:
             - What the plan now emphasizes.
             - How it supports the goal.
         - Append this reasoning to the updated plan.
@@ -248,10 +252,10 @@ def generate_summary_for_rescheduled_plan(state: "AgentState"):
     {goal}
 
     Updated Plan:
-    {updated_plan}
+    {plan_outline(updated_plan)}
     """
 
-    response = llm.invoke(prompt).content.strip()
+    response = (await llm.ainvoke(prompt)).content.strip()
 
     updated_plan["reason_behind_planning"] = prefix +"\n"+response
 
@@ -2,14 +2,19 @@ from .pydanticModels import AgentState,UserIntent
 import re
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
+from .llmCache import llm_cache_for, llm_cache_scope
+from .intentClassifier import intent_classifier, INTENT_EXAMPLES
 from dotenv import load_dotenv
 load_dotenv()
 
-llm = ChatOpenAI(model = "gpt-4.1-nano")
+RESCHEDULE_PATTERN = re.compile(r"(reschedule|restructure)\s+(plan|schedule)\s+(\d+)", re.IGNORECASE)
+
+# Deterministic, so near-duplicate messages may share a cached classification.
+llm = ChatOpenAI(model = "gpt-4.1-nano", temperature = 0, cache = llm_cache_for("check_intent"))
 
 llm_for_intent_check = llm.with_structured_output(UserIntent)
 
-def check_intent(state: AgentState):
+async def check_intent(state: AgentState):
     """
     Determine the user's intent based on their query.
 
@@ -20,12 +25,14 @@ def check_intent(state: AgentState):
     Process:
         1. Checks if the message matches the format for rescheduling or restructuring a specific plan:
            e.g., "reschedule plan 3" → returns {"intent": "reschedule_3"}.
-        2. If not matched, sends the query to an LLM classifier that categorizes it into one of:
+        2. Otherwise asks the local `intent_classifier` (keyword rules, then nearest
+           centroid over the prompt examples) and uses its answer when confident.
+        3. If still unresolved, sends the query to an LLM classifier that categorizes it into one of:
            - "greeting" → User is greeting the assistant.
            - "course_details" → User requests course names, descriptions, or prerequisites.
            - "build_schedule" → User asks for help creating or modifying a course schedule/plan.
            - "short_term_planning" → User provides prior coursework and a goal, asking for next steps.
-        3. Uses structured output parsing with `UserIntent` Pydantic model to ensure a clean response.
+        4. Uses structured output parsing with `UserIntent` Pydantic model to ensure a clean response.
 
     Returns:
         dict: Dictionary containing:
@@ -34,11 +41,15 @@ def check_intent(state: AgentState):
 
     message: str = state.query.strip()
 
-    match = re.search(r"(reschedule|restructure)\s+(plan|schedule)\s+(\d+)", message, re.IGNORECASE)
+    match = RESCHEDULE_PATTERN.search(message)
     if match:
         plan_number = match.group(3)
         return {"intent": f"reschedule_{plan_number}"}
 
+    prediction = await intent_classifier.aclassify(message)
+    if prediction is not None:
+        return {"intent": prediction.intent}
+
     prompt = """
     You are a classification agent. Classify the user's query into one of these intent classes:
     ["greeting", "course_details", "build_schedule", "short_term_planning"]
@@ -53,38 +64,7 @@ def check_intent(state: AgentState):
 
     Examples:
 
-    User: Hi, how are you?
-    Intent: greeting
-
-    User: Hello there!
-    Intent: greeting
-
-    User: Can you give me details about the Data Science and AI courses?
-    Intent: course_details
-
-    User: I want to know about the DS2500 course.
-    Intent: course_details
-
-    User: Can you build a schedule for me to become a lawyer?
-    Intent: build_schedule
-
-    User: Help me create a study plan to become a certified dietician.
-    Intent: build_schedule
-
-    User: I can't take this NLP course. Can you tell me some other courses?
-    Intent: build_schedule
-
-    User: My college doesn't allow courses from CPS. Can you tell me what else I can take?
-    Intent: build_schedule
-
-    User: I've done OOP, Data Structures, and DBMS. I want to get into Machine Learning. What should I take next?
-    Intent: short_term_planning
-
-    User: I completed Deep Learning and NLP. I want to become an ML Engineer — suggest my next 5 courses.
-    Intent: short_term_planning
-
-    User: Taken Stats, Python, and Intro to AI. What are some advanced courses I can do this fall to specialize in NLP?
-    Intent: short_term_planning
+{examples}
 
     Now classify:
     User: {user_query}
@@ -92,9 +72,11 @@ def check_intent(state: AgentState):
 
     """
     
+    examples = "\n\n".join(f"    User: {text}\n    Intent: {intent}" for text, intent in INTENT_EXAMPLES)
     prompt_template = ChatPromptTemplate.from_template(prompt)
-    formatted_prompt = prompt_template.format_messages(user_query=message)
-    response = llm_for_intent_check.invoke(formatted_prompt).intent
+    formatted_prompt = prompt_template.format_messages(user_query=message, examples=examples)
+    with llm_cache_scope("check_intent", semantic_text=message):
+        response = (await llm_for_intent_check.ainvoke(formatted_prompt)).intent
     return {"intent": str(response)}
 
 def intent_based_router(state:AgentState):
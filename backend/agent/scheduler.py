@@ -0,0 +1,324 @@
+from typing import Dict, List, Optional, Set
+from .catalog import Course, PlannedCourse, course_credits, prerequisite_course_numbers
+import math
+import re
+
+# Capstone, thesis and practicum courses, and project courses named as such ("Master's
+# Project", "Research Project", "Engineering Leadership Challenge Project 1" and its
+# continuation), but not courses about projects ("Project Management", "Construction
+# Project Control") or a thesis proposal, which comes before the thesis.
+CAPSTONE_PATTERN = re.compile(r"\b(capstone|practicum)\b|\bthesis\b(?!\s+proposal)|\bproject(\s+(\d+|continuation)\b|\s*$)", re.IGNORECASE)
+
+# Returned by `SemesterScheduler.try_schedule` when the search ran out of nodes
+# before proving or disproving that the credit bounds can be met.
+BUDGET_EXHAUSTED = "budget_exhausted"
+
+class _BudgetExhausted(Exception):
+    pass
+
+def course_level(course_number: str) -> int:
+    """Leading digit of the course number (5 for DS5110); 0 when absent."""
+    digits = re.search(r"\d", course_number)
+    return int(digits.group()) if digits else 0
+
+def is_capstone(course: dict) -> bool:
+    return bool(CAPSTONE_PATTERN.search(course.get("title", "")))
+
+def prerequisite_edges(courses: List[dict]) -> Dict[str, Set[str]]:
+    """
+    In-plan prerequisites of every course, keyed by course_number.
+
+    Read from the catalog's parsed `prerequisite_expr`; prerequisites outside
+    the plan are assumed to be satisfied by admission. Alternatives ("A Or B")
+    are treated conservatively: every in-plan alternative is placed earlier.
+    """
+    in_plan = {course["course_number"] for course in courses}
+    return {
+        course["course_number"]: {
+            number for number in prerequisite_course_numbers(course.get("prerequisite_expr"))
+            if number in in_plan and number != course["course_number"]
+        }
+        for course in courses
+    }
+
+class SemesterScheduler:
+    """
+    Assigns courses to semesters without an LLM.
+
+    Every semester is kept between `min_credits` and `max_credits` (when the
+    course credits allow it), prerequisites land in strictly earlier semesters,
+    capstone/project courses go to the final semester, and otherwise courses are
+    placed as early as possible in priority order: core before elective, then
+    lower course levels first. The assignment is a depth-first search over
+    semesters with credit-based pruning; all attempts of one call share `node_budget`
+    visited nodes. When no exact layout is found (or the budget runs out first),
+    `schedule` falls back to a greedy earliest-fit layout that is then rebalanced
+    towards `min_credits`; it may break the bounds, which `credit_violations` reports.
+    """
+
+    def __init__(self, min_credits: int, max_credits: int, node_budget: int = 20000):
+        self.min_credits = min_credits
+        self.max_credits = max_credits
+        self.node_budget = node_budget
+
+    def _order(self, courses: List[dict], edges: Dict[str, Set[str]]) -> List[dict]:
+        def priority(item):
+            idx, course = item
+            return (is_capstone(course), course.get("type") != "core", course_level(course["course_number"]), idx)
+
+        remaining = sorted(enumerate(courses), key=priority)
+        placed: Set[str] = set()
+        ordered = []
+        while remaining:
+            pick = next(
+                (item for item in remaining if edges[item[1]["course_number"]] <= placed),
+                remaining[0],  # a prerequisite cycle: fall back to priority order
+            )
+            remaining.remove(pick)
+            placed.add(pick[1]["course_number"])
+            ordered.append(pick[1])
+        return ordered
+
+    def _search(self, ordered: List[dict], credits: List[int], edges, terms: int, strict_capstone: bool, budget: List[int]) -> Optional[List[int]]:
+        """Assignment of `ordered` to `terms` semesters, None if there is none; raises `_BudgetExhausted`."""
+        loads = [0] * terms
+        assignment: Dict[str, int] = {}
+        suffix = [0] * (len(ordered) + 1)
+        for idx in range(len(ordered) - 1, -1, -1):
+            suffix[idx] = suffix[idx + 1] + credits[idx]
+
+        def visit(idx: int) -> bool:
+            budget[0] -= 1
+            if budget[0] < 0:
+                raise _BudgetExhausted()
+            shortfall = sum(max(0, self.min_credits - load) for load in loads)
+            if shortfall > suffix[idx]:
+                return False
+            if idx == len(ordered):
+                return shortfall == 0
+            course = ordered[idx]
+            earliest = max((assignment[prereq] + 1 for prereq in edges[course["course_number"]] if prereq in assignment), default=0)
+            if strict_capstone and is_capstone(course):
+                earliest = max(earliest, terms - 1)
+            for term in range(earliest, terms):
+                if loads[term] + credits[idx] > self.max_credits:
+                    continue
+                loads[term] += credits[idx]
+                assignment[course["course_number"]] = term
+                if visit(idx + 1):
+                    return True
+                loads[term] -= credits[idx]
+                del assignment[course["course_number"]]
+            return False
+
+        if visit(0):
+            return [assignment[course["course_number"]] for course in ordered]
+        return None
+
+    def _greedy(self, ordered: List[dict], credits: List[int], edges) -> List[int]:
+        loads: List[int] = []
+        terms: Dict[str, int] = {}
+        for course, credit in zip(ordered, credits):
+            term = max((terms[prereq] + 1 for prereq in edges[course["course_number"]] if prereq in terms), default=0)
+            while term < len(loads) and loads[term] + credit > self.max_credits:
+                term += 1
+            while term >= len(loads):
+                loads.append(0)
+            loads[term] += credit
+            terms[course["course_number"]] = term
+
+        # Earliest-fit leaves the later semesters light: move courses forward into
+        # semesters under `min_credits` while the donor stays at or above it, the
+        # receiver stays within `max_credits` and dependants still come later.
+        moved = True
+        while moved:
+            moved = False
+            for target in range(len(loads)):
+                if loads[target] >= self.min_credits:
+                    continue
+                for course, credit in zip(ordered, credits):
+                    number = course["course_number"]
+                    source = terms[number]
+                    if (source >= target or loads[source] - credit < self.min_credits
+                            or loads[target] + credit > self.max_credits
+                            or any(terms[other["course_number"]] <= target for other in ordered if number in edges[other["course_number"]])):
+                        continue
+                    loads[source] -= credit
+                    loads[target] += credit
+                    terms[number] = target
+                    moved = True
+                    if loads[target] >= self.min_credits:
+                        break
+        return [terms[course["course_number"]] for course in ordered]
+
+    def _layout(self, courses: List[dict], allow_greedy: bool):
+        if not courses:
+            return []
+        edges = prerequisite_edges(courses)
+        ordered = self._order(courses, edges)
+        credits = [course_credits(course) for course in ordered]
+        total = sum(credits)
+        fewest = max(1, math.ceil(total / self.max_credits)) if self.max_credits > 0 else 1
+        most = max(fewest, int(total // self.min_credits)) if self.min_credits > 0 else fewest
+        assignment, exhausted = None, False
+        budget = [self.node_budget]
+        try:
+            for strict_capstone in (True, False):
+                for terms in range(fewest, most + 1):
+                    assignment = self._search(ordered, credits, edges, terms, strict_capstone, budget)
+                    if assignment is not None:
+                        break
+                if assignment is not None:
+                    break
+        except _BudgetExhausted:
+            exhausted = True
+        if assignment is None:
+            if not allow_greedy:
+                return BUDGET_EXHAUSTED if exhausted else None
+            assignment = self._greedy(ordered, credits, edges)
+        semesters: List[List[dict]] = [[] for _ in range(max(assignment) + 1)]
+        for course, term in zip(ordered, assignment):
+            semesters[term].append(course)
+        return [semester for semester in semesters if semester]
+
+    def try_schedule(self, courses: List[dict]):
+        """
+        Like `schedule`, but returns None when the credit bounds cannot be met and
+        `BUDGET_EXHAUSTED` when the search gave up before finding out.
+        """
+        return self._layout(courses, allow_greedy=False)
+
+    def schedule(self, courses: List[dict]) -> List[List[dict]]:
+        """
+        Returns:
+            list: Semesters in order, each a list of the given course dicts.
+        """
+        return self._layout(courses, allow_greedy=True)
+
+    def credit_violations(self, loads: List[int]) -> List[str]:
+        """One description per semester load outside `min_credits`..`max_credits`."""
+        violations = []
+        for term, load in enumerate(loads):
+            if load < self.min_credits:
+                violations.append(f"semester {term + 1} carries {load} credits, below the minimum of {self.min_credits}")
+            elif load > self.max_credits:
+                violations.append(f"semester {term + 1} carries {load} credits, above the maximum of {self.max_credits}")
+        return violations
+
+def select_courses(core_courses: List[dict], electives: List[dict], max_total_credits: int) -> List[dict]:
+    """
+    All core courses, then electives in the given (relevance) order while the total
+    stays within `max_total_credits`. Each returned course carries its `type`.
+    """
+    selected = [{**course, "type": "core"} for course in core_courses]
+    seen = {course["course_number"] for course in selected}
+    total = sum(course_credits(course) for course in selected)
+    for course in electives:
+        credits = course_credits(course)
+        if course["course_number"] in seen or total + credits > max_total_credits:
+            continue
+        selected.append({**course, "type": "elective"})
+        seen.add(course["course_number"])
+        total += credits
+    return selected
+
+def course_reason(course: dict, goal: str, prerequisites: List[str], last_term: bool) -> str:
+    if is_capstone(course) and last_term:
+        return "Capstone/project course placed at the end so it can draw on everything studied before it."
+    if course["type"] == "core":
+        reason = "Required core course, scheduled early because later courses build on it."
+    elif course_level(course["course_number"]) >= 7:
+        reason = f"Advanced elective that deepens the specialisation needed to {goal}."
+    else:
+        reason = f"Elective that builds skills directly relevant to the goal: {goal}."
+    if prerequisites:
+        reason += f" Taken after {', '.join(prerequisites)}, its prerequisite{'s' if len(prerequisites) > 1 else ''} in this plan."
+    elif last_term and course["type"] != "core":
+        reason += " Placed in the final semester to balance the credit load."
+    return reason
+
+def build_semester_plan(plan_number: int, core_courses: List[dict], electives: List[dict], goal: str,
+                        min_creds_per_sem: int, max_creds_per_sem: int, max_total_credits: int) -> dict:
+    """
+    Lay out one plan in the same JSON shape the planning prompt asked the LLM for:
+    `plan_number`, `total_semesters`, `semester_schedule` (semester, courses with
+    course_number/title/description/reason/credit_hours/type as `PlannedCourse`
+    views over the shared records, total_credits),
+    `total_credits` and `reason_behind_planning`.
+    """
+    scheduler = SemesterScheduler(min_creds_per_sem, max_creds_per_sem)
+    selected = select_courses(core_courses, electives, max_total_credits)
+    # A total that no number of semesters can split within the bounds (28 credits at
+    # exactly 8 per semester) is fixed by dropping the least relevant electives. An
+    # exhausted search proves nothing, so it keeps the electives and lays them out greedily.
+    candidate, semesters = list(selected), None
+    while semesters is None and any(course["type"] == "elective" for course in candidate):
+        semesters = scheduler.try_schedule(candidate)
+        if semesters == BUDGET_EXHAUSTED:
+            semesters = scheduler.schedule(candidate)
+        elif semesters is None:
+            last_elective = max(idx for idx, course in enumerate(candidate) if course["type"] == "elective")
+            candidate.pop(last_elective)
+    if semesters is None:
+        candidate, semesters = selected, scheduler.schedule(selected)
+    selected = candidate
+    edges = prerequisite_edges(selected)
+    goal_text = goal.strip().rstrip(".")
+
+    schedule = []
+    for term, semester_courses in enumerate(semesters):
+        courses = []
+        for course in semester_courses:
+            prerequisites = sorted(edges[course["course_number"]])
+            courses.append(PlannedCourse(
+                Course.intern(course),
+                reason=course_reason(course, goal_text, prerequisites, term == len(semesters) - 1),
+                type=course["type"],
+            ))
+        schedule.append({
+            "semester": term + 1,
+            "courses": courses,
+            "total_credits": sum(course["credits_max"] for course in courses),
+        })
+
+    total_credits = sum(semester["total_credits"] for semester in schedule)
+    loads = [semester["total_credits"] for semester in schedule]
+    violations = scheduler.credit_violations(loads)
+    reason = (
+        f"{len(schedule)} semesters carrying {', '.join(map(str, loads))} credits "
+        f"(allowed {min_creds_per_sem}-{max_creds_per_sem} per semester) for {total_credits} credits in total."
+    )
+    if violations:
+        reason += f" These courses could not be laid out within the per-semester bounds: {'; '.join(violations)}."
+
+    # Only what the final layout actually satisfies is claimed.
+    term_of = {course["course_number"]: term for term, semester_courses in enumerate(semesters) for course in semester_courses}
+    clauses = []
+    core_terms = [term_of[course["course_number"]] for course in selected if course["type"] == "core"]
+    elective_terms = [term_of[course["course_number"]] for course in selected if course["type"] != "core"]
+    if core_terms and elective_terms and max(core_terms) <= min(elective_terms):
+        clauses.append("core courses come first")
+    levels = [(course_level(course["course_number"]), term_of[course["course_number"]]) for course in selected]
+    if len({level for level, _ in levels}) > 1 and all(
+        term <= other_term for level, term in levels for other_level, other_term in levels if level < other_level
+    ):
+        clauses.append("lower-level courses are placed before advanced ones")
+    ordered_pairs = sum(len(prereqs) for prereqs in edges.values())
+    respected = sum(term_of[prereq] < term_of[number] for number, prereqs in edges.items() for prereq in prereqs)
+    if ordered_pairs and respected == ordered_pairs:
+        clauses.append(f"{ordered_pairs} in-plan prerequisite relationship{'s are' if ordered_pairs != 1 else ' is'} respected")
+    elif ordered_pairs:
+        clauses.append(f"only {respected} of {ordered_pairs} in-plan prerequisite relationships could be respected")
+    capstones = [course["course_number"] for course in selected if is_capstone(course)]
+    if capstones and all(term_of[number] == len(semesters) - 1 for number in capstones):
+        clauses.append(f"{', '.join(capstones)} {'are' if len(capstones) > 1 else 'is'} kept for the end")
+    if clauses:
+        reason += f" {clauses[0][0].upper()}{clauses[0][1:]}{''.join('; ' + clause for clause in clauses[1:])}."
+
+    return {
+        "plan_number": plan_number,
+        "total_semesters": len(schedule),
+        "semester_schedule": schedule,
+        "total_credits": total_credits,
+        "reason_behind_planning": reason,
+    }
@@ -1,14 +1,18 @@
 from .pydanticModels import AgentState
 from langchain_openai.chat_models import ChatOpenAI
+from .llmCache import llm_cache_for, llm_cache_scope
 from dotenv import load_dotenv
 import json
 from .states import get_short_planning_state
-from .queryDB import query_database
+from .queryDB import aquery_database
+from .catalog import prompt_fields
 load_dotenv()
 
 llm = ChatOpenAI(model = "gpt-4.1-nano")
 
-def get_attributes_for_short_plan(state: AgentState):
+llm_for_short_plan_attributes = ChatOpenAI(model = "gpt-4.1-nano", cache = llm_cache_for("get_attributes_for_short_plan"))
+
+async def get_attributes_for_short_plan(state: AgentState):
     
     """
     Generate a list of new, advanced course titles for a student based on their prior coursework and academic goals.
@@ -22,7 +26,6 @@ def get_attributes_for_short_plan(state: AgentState):
     Process:
         - Analyzes student's completed subjects.
         - Suggests 5–7 distinct, advanced topics not previously studied.
-        - Appends "– {department}, {college}" to each course title.
         - Avoids foundational (5XXX-level) courses, overlapping topics, and redundant suggestions.
         - Ensures only one course is chosen from similar categories (e.g., "Deep Learning" vs "Applied Deep Learning").
 
@@ -45,7 +48,6 @@ def get_attributes_for_short_plan(state: AgentState):
     - If a goal (e.g., PhD in AI, role in cybersecurity, etc.) is mentioned, recommend topics aligned with that goal.
     - If no goal is specified, suggest diverse, relevant, and advanced topics from the department that are different from what the student already knows.
     - Only return titles of new topics that student has not covered — no explanations or descriptions.
-    - For each suggested topic, append " – {department}, {college}" at the end of the title.
     - Avoid recommending foundational course which generally means course starting from 5XXX.
     - Avoid recommending anything that overlaps with what they have already studied or what you have already suggested.
     - Make sure you suggest only one course from overlapping or similar course like for eg. Deep Learning and then applied deep learning
@@ -55,16 +57,15 @@ def get_attributes_for_short_plan(state: AgentState):
 
     Output Format:
     Return a Python list of 5–7 strings.
-    Each string should follow this format:
-    "Topic Title – {department}, {college}"
+    Each string should be a plain topic title, without department or college names.
 
     Example Output: (STRICT)
     {{"topics":[
-    "Generative AI – {department}, {college}",
-    "Secure Federated Learning – {department}, {college}",
-    "Advanced Robotics and Perception – {department}, {college}",
-    "Causal Inference in Machine Learning – {department}, {college}",
-    "Ethics and Policy in Autonomous Systems – {department}, {college}"
+    "Generative AI",
+    "Secure Federated Learning",
+    "Advanced Robotics and Perception",
+    "Causal Inference in Machine Learning",
+    "Ethics and Policy in Autonomous Systems"
     ]}}
 
     ---
@@ -75,10 +76,10 @@ def get_attributes_for_short_plan(state: AgentState):
 
     Output:
     {{"topics":[
-    "Machine Learning Foundations – Computer Science, Northeastern University",
-    "Cloud Computing and Microservices – Computer Science, Northeastern University",
-    "Computer Vision Basics – Computer Science, Northeastern University",
-    "Network Security – Computer Science, Northeastern University"
+    "Machine Learning Foundations",
+    "Cloud Computing and Microservices",
+    "Computer Vision Basics",
+    "Network Security"
     ]}}
 
     ---
@@ -89,10 +90,10 @@ def get_attributes_for_short_plan(state: AgentState):
 
     Output:
     {{"topics":[
-    "Bias and Fairness in NLP – Computer Science, Northeastern University",
-    "AI for Humanitarian Applications – Computer Science, Northeastern University",
-    "Multilingual Representation Learning – Computer Science, Northeastern University",
-    "Low-Resource NLP Techniques – Computer Science, Northeastern University"
+    "Bias and Fairness in NLP",
+    "AI for Humanitarian Applications",
+    "Multilingual Representation Learning",
+    "Low-Resource NLP Techniques"
     ]}}
 
     ---
@@ -105,7 +106,8 @@ def get_attributes_for_short_plan(state: AgentState):
     Return a valid JSON format list with topics that student hasn't covered, no explaination required.
     """
     
-    response = llm.invoke(prompt,temperature=0.7).content
+    with llm_cache_scope("get_attributes_for_short_plan", semantic_text=query):
+        response = (await llm_for_short_plan_attributes.ainvoke(prompt,temperature=0.7)).content
     response = json.loads(response)["topics"]
     return {"course_titles":response}
 
@@ -134,16 +136,18 @@ def get_unique_dicts(courses_list):
     
     return unique_dicts
 
-def get_course_details_for_short_term_planning(state:AgentState):
+async def get_course_details_for_short_term_planning(state:AgentState):
     """
     Retrieve detailed course information for a given list of course titles.
 
     Args:
         state (AgentState): The current agent state containing:
             - course_titles (list[str]): Course titles to look up.
+            - college, department (str): Student's college and department.
 
     Process:
-        - Queries the course database using course titles (no course numbers).
+        - Queries the course database using course titles (no course numbers),
+          filtered to the student's department first, then their college.
         - Removes duplicates using get_unique_dicts.
 
     Returns:
@@ -151,10 +155,23 @@ def get_course_details_for_short_term_planning(state:AgentState):
             {"courses_from_users_query": [list of unique course dictionaries]}
     """
     courses_titles = state.course_titles
-    courses_list = query_database(course_numbers=[],course_titles=courses_titles)
+    courses_list = await aquery_database(course_numbers=[],course_titles=courses_titles,college=state.college,department=state.department)
     return {"courses_from_users_query":get_unique_dicts(courses_list)}
 
-def build_short_term_plan(state:AgentState):
+def short_term_suggestion(course) -> dict:
+    """A course as a short-term plan suggestion, described by its stored summary."""
+    return {
+        "course_number": course["course_number"],
+        "college": course["college"],
+        "department": course["department"],
+        "title": course["title"],
+        "description": course["summary"],
+        "keywords": list(course["keywords"]),
+        "credit_hours": course["credit_hours"],
+        "prerequisites": course["prerequisites"],
+    }
+
+async def build_short_term_plan(state:AgentState):
     """
     Generate a tailored short-term academic plan for the student.
 
@@ -170,7 +187,9 @@ def build_short_term_plan(state:AgentState):
         - Prefers courses from the same department or college.
         - Avoids overlap with previously studied topics.
         - Orders results from easiest to hardest (based on prerequisites).
-        - Generates a brief, original (≤2 lines) summary of each course description.
+        - The model only answers with course numbers; each suggestion's
+          `description` is the course's stored ingest-time summary, so no
+          summarization happens per request.
 
     Returns:
         dict: Dictionary containing:
@@ -188,7 +207,7 @@ def build_short_term_plan(state:AgentState):
     college = state.college
     department  = state.department
     courses_list = state.courses_from_users_query
-    courses_list_json = json.dumps(courses_list,indent=5)
+    courses_list_json = json.dumps([prompt_fields(course) for course in courses_list],indent=5)
     
     prompt = f"""
     You are an academic advisor at the {department} department of {college}.
@@ -196,7 +215,8 @@ def build_short_term_plan(state:AgentState):
     A student has shared their academic goal, and you are provided with a list of course options, each including:
     - title
     - course_number
-    - description
+    - summary
+    - keywords
     - college
     - department
     - prerequisites
@@ -217,42 +237,34 @@ def build_short_term_plan(state:AgentState):
     - Select the most relevant courses (maximum 6)
     - Prioritize courses that align closely with the student's goal
     - Prefer courses from the same department or college
-    - Avoid any course that overlaps with what the student likely already knows (based on title or description)
+    - Avoid any course that overlaps with what the student likely already knows (based on title, summary or keywords)
     - Sort the selected courses in increasing order of difficulty based on prerequisites
-    - For each selected course, return a **brief and original summary** of its description (max 2 lines), NOT a copy of the original description
     - Do not return any course that student has already studied or has told you that he already has studied or completed this courses.
 
     ❗ Output format must be valid JSON ONLY — no extra text, no comments, no headings.
 
     Output Format (Strict JSON):
     {{
-    "content": {{
-        "suggestions": [
-        {{
-            "course_number": "string",
-            "college": "string",
-            "department": "string",
-            "title": "string",
-            "description": "Brief summary in your own words",
-            "credit_hours": "string or int",
-            "prerequisites": "string or list"
-        }}
-        ],
-        "explaination": "1–2 lines on why this selection supports the goal."
-    }}
+    "course_numbers": ["course_number of each selected course, in order"],
+    "explaination": "1–2 lines on why this selection supports the goal."
     }}
     ---
 
     Available Courses:
     {courses_list_json}
 
-    NOW RETURN A VALID JSON OBJECT ONLY. DO NOT COPY THE ORIGINAL DESCRIPTION. SUMMARIZE IT IN NEW WORDS IN UNDER 2 LINES.
+    NOW RETURN A VALID JSON OBJECT ONLY.
     """
 
-    response = llm.invoke(prompt).content
-    response = json.loads(response)
-    
-    # print(json.dumps(response,indent=2))
+    answer = json.loads((await llm.ainvoke(prompt)).content)
+    courses_by_number = {course["course_number"]: course for course in courses_list}
+    selected = [courses_by_number[number] for number in dict.fromkeys(answer.get("course_numbers", [])) if number in courses_by_number]
+    response = {
+        "content": {
+            "suggestions": [short_term_suggestion(course) for course in selected[:6]],
+            "explaination": answer.get("explaination", ""),
+        }
+    }
 
     return {
         "short_term_plan":response,
@@ -0,0 +1,81 @@
+from typing import Any, AsyncIterator, Callable, Dict, List, Tuple
+import asyncio
+
+class _Flight:
+    def __init__(self):
+        self.items: List[Any] = []
+        self.done = False
+        self.condition = asyncio.Condition()
+        # Callers currently reading the flight's items (leader included).
+        self.subscribers = 0
+        self.task = None
+
+class SingleFlight:
+    """
+    Share one in-flight async producer among concurrent callers with the same key.
+
+    The first `subscribe` for a key starts the producer in its own task; callers
+    that arrive while it runs replay the items produced so far and then follow
+    live ones. Because the producer is not tied to any caller, a disconnecting
+    client never cancels the work for the others. The key is released as soon
+    as the producer finishes, so nothing is cached past the flight itself.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.flights = 0
+        self.coalesced = 0
+
+    def subscribe(self, key: str, producer: Callable[[], AsyncIterator[Any]]) -> Tuple[AsyncIterator[Any], bool]:
+        """
+        Returns:
+            tuple: (iterator over the flight's items, True if this call started the flight).
+        """
+        flight = self._flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = self._flights[key] = _Flight()
+            flight.task = asyncio.create_task(self._pump(key, flight, producer()))
+            self.flights += 1
+        else:
+            self.coalesced += 1
+        return self._follow(flight), leader
+
+    async def _pump(self, key: str, flight: _Flight, items: AsyncIterator[Any]):
+        try:
+            async for item in items:
+                async with flight.condition:
+                    flight.items.append(item)
+                    flight.condition.notify_all()
+        finally:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+            async with flight.condition:
+                flight.done = True
+                flight.condition.notify_all()
+
+    async def _follow(self, flight: _Flight):
+        index = 0
+        flight.subscribers += 1
+        try:
+            while True:
+                async with flight.condition:
+                    await flight.condition.wait_for(lambda: index < len(flight.items) or flight.done)
+                    batch = flight.items[index:]
+                    done = flight.done
+                index += len(batch)
+                for item in batch:
+                    yield item
+                if done:
+                    return
+        finally:
+            flight.subscribers -= 1
+
+    def stats(self) -> dict:
+        """Flights started, callers that joined one, flights running now and the callers following them."""
+        return {
+            "flights": self.flights,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._flights),
+            "subscribers": sum(flight.subscribers for flight in self._flights.values()),
+        }
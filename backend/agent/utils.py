@@ -0,0 +1,47 @@
+import asyncio
+
+async def gather_with_concurrency(limit, coroutines):
+    """
+    Await coroutines concurrently with at most `limit` of them running at once.
+
+    Args:
+        limit (int): Maximum number of coroutines awaited at the same time.
+        coroutines (list): Coroutines to run.
+
+    Returns:
+        list: Results in the same order as `coroutines`.
+    """
+    semaphore = asyncio.Semaphore(max(1, limit))
+
+    async def run(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(run(coroutine) for coroutine in coroutines))
+
+async def as_completed_with_concurrency(limit, coroutines):
+    """
+    Run coroutines with at most `limit` in flight and yield results as they finish.
+
+    Args:
+        limit (int): Maximum number of coroutines awaited at the same time.
+        coroutines (iterable): Coroutines to run; consumed lazily, so a large
+            batch does not create all of its tasks up front.
+
+    Yields:
+        Results in completion order.
+    """
+    coroutines = iter(coroutines)
+    pending = set()
+    for coroutine in coroutines:
+        pending.add(asyncio.ensure_future(coroutine))
+        if len(pending) >= max(1, limit):
+            break
+    while pending:
+        done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        for task in done:
+            yield task.result()
+        for coroutine in coroutines:
+            pending.add(asyncio.ensure_future(coroutine))
+            if len(pending) >= max(1, limit):
+                break
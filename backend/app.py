@@ -1,12 +1,24 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
 from typing import List
 from dotenv import load_dotenv
-from agent.agent import get_agent
+from agent.agent import get_agent, create_checkpointer
 import json
+import time
 from agent.actionMap import actionMap
+from agent.queryDB import course_catalog, course_embedding_index, regular_courses_retriever, special_topics_retriever
+from agent.catalog import course_json
+from agent.pydanticModels import AgentState
+from agent.embeddingCache import embeddings
+from agent.llmCache import llm_response_cache
+from agent.intentClassifier import intent_classifier
+from agent.config import BATCH_CONCURRENCY, COALESCE_REQUESTS, RETRIEVER_BACKEND
+from agent.routers import RESCHEDULE_PATTERN
+from agent.singleFlight import SingleFlight
+from agent.utils import as_completed_with_concurrency
+import uuid
 import os
 import boto3
 
@@ -30,6 +42,9 @@ def create_database():
 # FastAPI setup
 app = FastAPI(debug=True)
 
+# Identical planning requests in flight at the same time share one graph run.
+plan_flights = SingleFlight()
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -43,11 +58,24 @@ app.add_middleware(
 
 # Ensure DB is created at startup
 @app.on_event("startup")
-def startup_event():
+async def startup_event():
     create_database()
-    global agent
-    agent = get_agent()
-    print("Agent initialized")
+    course_catalog.load()
+    print(f"Loaded {len(course_catalog)} courses into the catalog")
+    course_embedding_index.load()
+    print(f"Loaded {len(course_embedding_index)} course embeddings")
+    for retriever in (regular_courses_retriever, special_topics_retriever):
+        retriever.load()
+    print(f"Using the {RETRIEVER_BACKEND} retriever")
+    global agent, checkpointer
+    checkpointer = await create_checkpointer()
+    agent = get_agent(checkpointer)
+    print(f"Agent initialized with {checkpointer.gauges()['backend']} checkpointer")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if hasattr(checkpointer, "aclose"):
+        await checkpointer.aclose()
 
 class NecessaryParams(BaseModel):
     query: str
@@ -61,7 +89,11 @@ class NecessaryParams(BaseModel):
     max_number_of_plans: int
 
 def get_state(params: NecessaryParams):
-    return {
+    """
+    Initial graph input for a request. It is validated against `AgentState`
+    here, once, because the graph's default dataclass state does not validate.
+    """
+    st = {
         "query": params.query,
         "messages":[["User","Query",params.query]],
         "college": params.college,
@@ -72,6 +104,12 @@ def get_state(params: NecessaryParams):
         "max_creds_per_sem": params.max_creds_per_sem,
         "max_number_of_plans": params.max_number_of_plans
     }
+    AgentState.model_validate(st)
+    return st
+
+def sse_event(event: str, payload) -> str:
+    """Named SSE event; clients that only read plain `data:` blocks skip it."""
+    return f"event: {event}\ndata: {json.dumps(payload, default=course_json)}\n\n"
 
 @app.get("/")
 def read_root():
@@ -81,6 +119,76 @@ def read_root():
 def options_root():
     return {}
 
+@app.get("/stats")
+def read_stats():
+    return {"embedding_cache": embeddings.stats(), "llm_cache": llm_response_cache.stats(), "intent_classifier": intent_classifier.stats(), "checkpointer": checkpointer.gauges(), "coalescing": plan_flights.stats()}
+
+async def run_turn(st: dict, config: dict):
+    """
+    Run one conversation turn, yielding ("sse", text) items as nodes finish and
+    finally ("done", turn) where `turn` holds the messages the nodes added, the
+    last value written to every other channel and the name of the last node.
+    A failure yields ("error", message) instead of "done".
+    """
+    request_start = time.perf_counter()
+    task_start = {}
+    completed_plans = 0
+    node_messages = []
+    updates = {key: value for key, value in st.items() if key != "messages"}
+    last_node = None
+    try:
+        async for mode, chunk in agent.astream(st, config=config, stream_mode=["tasks", "custom"]):
+            if mode == "custom":
+                yield "sse", sse_event(chunk["event"], chunk)
+                continue
+            if "result" not in chunk:
+                task_start[chunk["id"]] = time.perf_counter()
+                continue
+            key, val = chunk["name"], chunk["result"] or {}
+            last_node = key
+            now = time.perf_counter()
+            progress = {
+                "node": key,
+                "label": actionMap[key],
+                "elapsed_ms": round((now - task_start.pop(chunk["id"], now)) * 1000),
+                "total_ms": round((now - request_start) * 1000),
+            }
+            yield "sse", f"data: {actionMap[key]}\n\n"
+            if key=="generate_plan_candidate":
+                completed_plans += 1
+                progress.update(plans_completed=completed_plans, plans_total=st["max_number_of_plans"])
+                yield "sse", f"data: Working on plan {completed_plans}/{st['max_number_of_plans']}\n\n"
+            yield "sse", sse_event("progress", progress)
+            for channel, value in val.items():
+                if channel not in ("messages", "plan_candidates"):
+                    updates[channel] = value
+            for message in val.get("messages", []):
+                node_messages.append(message)
+                if message[0] == "AI":
+                    yield "sse", sse_event("message", message)
+        yield "done", {"node_messages": node_messages, "updates": updates, "last_node": last_node}
+    except Exception as e:
+        yield "error", str(e)
+
+def coalescing_key(params: NecessaryParams):
+    """
+    Key shared by requests that must produce the same plan: the normalized
+    parameters without `thread_id`. Rescheduling depends on the thread's own
+    plans, so those requests are never coalesced (None).
+    """
+    if not COALESCE_REQUESTS or RESCHEDULE_PATTERN.search(params.query):
+        return None
+    return json.dumps({
+        "query": " ".join(params.query.lower().split()),
+        "college": params.college.strip(),
+        "department": params.department.strip(),
+        "core_course_numbers": sorted({number.strip().upper() for number in params.core_course_numbers}),
+        "min_creds_per_sem": params.min_creds_per_sem,
+        "max_creds_per_sem": params.max_creds_per_sem,
+        "max_credits": params.max_credits,
+        "max_number_of_plans": params.max_number_of_plans,
+    }, sort_keys=True)
+
 @app.post("/get_response")
 async def stream_response(params: NecessaryParams):
     st = get_state(params)
@@ -88,21 +196,88 @@ async def stream_response(params: NecessaryParams):
     
     async def event_generator():
         yield f"data: Starting the process.\n\n"
-        flag = 0
-        try:
-            for chunk in agent.stream(st, config=config):
-                for key, val in chunk.items():
-                    if key=="filter_courses_1":
-                        flag = 1
-                    yield f"data: {actionMap[key]}\n\n"
-                if flag==1:
-                    yield f"data: Working on plan {str(agent.get_state(config=config).values['number_of_plans'])}/{str(agent.get_state(config=config).values['max_number_of_plans'])}\n\n"
-            yield f"data: [FINAL_OUTPUT] {json.dumps(agent.get_state(config=config).values['messages'], indent=2)}\n\n"
-        except Exception as e:
-            yield f"data: Error {e}\n\n"
+        key = coalescing_key(params)
+        if key is None:
+            events, leader = run_turn(st, config), True
+        else:
+            events, leader = plan_flights.subscribe(key, lambda: run_turn(st, config))
+        async for kind, payload in events:
+            if kind == "sse":
+                yield payload
+            elif kind == "error":
+                yield f"data: Error {payload}\n\n"
+            else:
+                turn_messages = st["messages"] + payload["node_messages"]
+                if not leader:
+                    # Record the shared result in this caller's own thread, as if its graph had run.
+                    values = {**payload["updates"], **{k: v for k, v in st.items() if k != "messages"}, "messages": turn_messages}
+                    await agent.aupdate_state(config, values, as_node=payload["last_node"])
+                yield f"data: [FINAL_OUTPUT] {json.dumps(turn_messages, indent=2, default=course_json)}\n\n"
 
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
+def parse_batch_line(line: str, index: int, batch_id: str) -> NecessaryParams:
+    data = json.loads(line)
+    data.setdefault("thread_id", f"batch-{batch_id}-{index}")
+    return NecessaryParams(**data)
+
+async def run_batch_item(index: int, line: str, batch_id: str) -> dict:
+    """
+    Run one JSONL line through the agent. Parse and graph errors are reported
+    in the record instead of failing the whole batch.
+    """
+    start = time.perf_counter()
+    record = {"index": index}
+    try:
+        params = parse_batch_line(line, index, batch_id)
+        record.update(thread_id=params.thread_id, query=params.query)
+        final_state = await agent.ainvoke(get_state(params), config={"configurable": {"thread_id": params.thread_id}})
+        record.update(status="ok", intent=final_state.get("intent"), response=final_state["messages"][-1])
+    except Exception as e:
+        record.update(status="error", error=str(e))
+    record["latency_ms"] = round((time.perf_counter() - start) * 1000)
+    return record
+
+def summarize_batch(records: List[dict], wall_seconds: float) -> dict:
+    latencies = sorted(record["latency_ms"] for record in records)
+    def percentile(pct):
+        return latencies[min(len(latencies) - 1, max(0, round(pct / 100 * len(latencies)) - 1))] if latencies else 0
+    return {
+        "items": len(records),
+        "ok": sum(record["status"] == "ok" for record in records),
+        "errors": sum(record["status"] == "error" for record in records),
+        "wall_seconds": round(wall_seconds, 3),
+        "throughput_per_minute": round(len(records) / wall_seconds * 60, 2) if wall_seconds else 0.0,
+        "latency_ms": {"p50": percentile(50), "p90": percentile(90), "p99": percentile(99), "max": latencies[-1] if latencies else 0},
+    }
+
+async def run_batch(lines, concurrency: int = BATCH_CONCURRENCY):
+    """
+    Plan every JSONL line of `NecessaryParams` (thread_id optional) with at most
+    `concurrency` graphs in flight, sharing the process-wide embedding, LLM and
+    catalog caches. Yields one JSON-serializable record per line as it finishes
+    (completion order, with its input `index`), then a final `{"summary": ...}`
+    record with throughput and latency percentiles.
+    """
+    batch_id = uuid.uuid4().hex[:8]
+    start = time.perf_counter()
+    records = []
+    items = ((index, line) for index, line in enumerate(line for line in lines if line.strip()))
+    async for record in as_completed_with_concurrency(concurrency, (run_batch_item(index, line, batch_id) for index, line in items)):
+        records.append(record)
+        yield record
+    yield {"summary": summarize_batch(records, time.perf_counter() - start)}
+
+@app.post("/plans/batch")
+async def plan_batch(request: Request, concurrency: int = BATCH_CONCURRENCY):
+    lines = (await request.body()).decode("utf-8").splitlines()
+
+    async def jsonl_generator():
+        async for record in run_batch(lines, concurrency):
+            yield json.dumps(record, default=course_json) + "\n"
+
+    return StreamingResponse(jsonl_generator(), media_type="application/x-ndjson")
+
 
 # from fastapi import FastAPI
 # from fastapi.responses import StreamingResponse
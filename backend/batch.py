@@ -0,0 +1,56 @@
+"""
+Command-line batch planner: the CLI counterpart of `POST /plans/batch`.
+
+Reads `NecessaryParams` as JSONL (one object per line, thread_id optional) or a
+`planTesting.json`-style file (`{"tests": [...]}`), plans every item with bounded
+concurrency in this process, and writes one JSON line per finished item plus a
+final summary line with throughput and latency percentiles.
+
+Run from the `backend` directory:
+
+    python batch.py cohort.jsonl -o plans.jsonl --concurrency 8
+    python batch.py planTesting.json --repeat 50
+"""
+import argparse
+import asyncio
+import json
+import sys
+
+import app as server
+from agent.catalog import course_json
+
+
+def read_lines(path: str, repeat: int):
+    with open(path) as f:
+        text = f.read()
+    if path.endswith(".json"):
+        lines = [json.dumps(item) for item in json.loads(text)["tests"]]
+    else:
+        lines = [line for line in text.splitlines() if line.strip()]
+    return lines * repeat
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL of NecessaryParams, or a planTesting.json-style file")
+    parser.add_argument("-o", "--output", help="Output JSONL path (stdout when omitted)")
+    parser.add_argument("--concurrency", type=int, default=server.BATCH_CONCURRENCY, help="Plans computed at once")
+    parser.add_argument("--repeat", type=int, default=1, help="Repeat the input, e.g. to simulate a cohort")
+    args = parser.parse_args()
+
+    await server.startup_event()
+    output = open(args.output, "w") if args.output else sys.stdout
+    try:
+        async for record in server.run_batch(read_lines(args.input, args.repeat), args.concurrency):
+            output.write(json.dumps(record, default=course_json) + "\n")
+            output.flush()
+            if "summary" in record:
+                print(json.dumps(record["summary"], indent=2), file=sys.stderr)
+    finally:
+        if args.output:
+            output.close()
+        await server.shutdown_event()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,119 @@
+"""
+Per-step checkpoint write/read latency for the available checkpointer backends.
+
+Replays the checkpoints a schedule-building run produces (one per graph step,
+with a realistic `final_course_list`, `semester_plans` and a growing `messages`
+list) against:
+
+- memory: the bounded in-process `BoundedMemorySaver`;
+- sqlite: `SqliteCheckpointSaver` with the plain msgpack serializer;
+- sqlite+zlib: `SqliteCheckpointSaver` with `CompressedSerializer` (the default).
+
+and reports p50/p99 `aput`/`aget_tuple` latency plus stored bytes per thread.
+
+Run from the `backend` directory:
+
+    python -m benchmarks.checkpoint_latency --threads 20 --steps 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import tempfile
+import time
+
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.base.id import uuid6
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from agent.checkpointer import BoundedMemorySaver, CompressedSerializer, SqliteCheckpointSaver
+
+CATALOG_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "testing", "database.json")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def sample_state(courses, step: int, rng: random.Random):
+    final_course_list = rng.sample(courses, 60)
+    semester_plans = [
+        {
+            "plan_number": plan,
+            "semesters": [
+                {"semester": semester, "courses": [{**course, "reason": "Builds on the previous semester."} for course in rng.sample(final_course_list, 2)]}
+                for semester in range(1, 5)
+            ],
+        }
+        for plan in range(1, 5)
+    ]
+    messages = [["AI", f"Step {idx}", "Completed"] for idx in range(2 * step)]
+    return {
+        "query": "Make me a plan to become a data scientist",
+        "final_course_list": final_course_list,
+        "semester_plans": semester_plans,
+        "messages": messages,
+    }
+
+
+async def replay(saver, courses, threads: int, steps: int):
+    rng = random.Random(0)
+    put_ms, get_ms = [], []
+    for thread in range(threads):
+        config = {"configurable": {"thread_id": f"bench-{thread}", "checkpoint_ns": ""}}
+        versions = {}
+        for step in range(steps):
+            checkpoint = empty_checkpoint()
+            checkpoint["id"] = str(uuid6(clock_seq=step))
+            checkpoint["channel_values"] = sample_state(courses, step, rng)
+            new_versions = {}
+            for channel in checkpoint["channel_values"]:
+                versions[channel] = new_versions[channel] = saver.get_next_version(versions.get(channel), None)
+            checkpoint["channel_versions"] = dict(versions)
+
+            start = time.perf_counter()
+            config = await saver.aput(config, checkpoint, {"source": "loop", "step": step}, new_versions)
+            put_ms.append((time.perf_counter() - start) * 1000)
+
+            start = time.perf_counter()
+            await saver.aget_tuple({"configurable": {"thread_id": f"bench-{thread}"}})
+            get_ms.append((time.perf_counter() - start) * 1000)
+    return put_ms, get_ms
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--threads", type=int, default=20, help="Conversation threads to replay")
+    parser.add_argument("--steps", type=int, default=10, help="Checkpoints written per thread")
+    args = parser.parse_args()
+
+    with open(CATALOG_PATH) as f:
+        courses = json.load(f)
+
+    print(f"{args.threads} threads x {args.steps} steps")
+    print(f"{'backend':<14}{'put p50':>10}{'put p99':>10}{'get p50':>10}{'get p99':>10}{'KB/thread':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [
+            ("memory", lambda: BoundedMemorySaver()),
+            ("sqlite", lambda: SqliteCheckpointSaver.open(os.path.join(tmp, "plain.sqlite"), serde=JsonPlusSerializer())),
+            ("sqlite+zlib", lambda: SqliteCheckpointSaver.open(os.path.join(tmp, "zlib.sqlite"), serde=CompressedSerializer())),
+        ]
+        for name, factory in backends:
+            saver = factory()
+            if asyncio.iscoroutine(saver):
+                saver = await saver
+            put_ms, get_ms = await replay(saver, courses, args.threads, args.steps)
+            if hasattr(saver, "aclose"):
+                await saver.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            size = saver.gauges()["bytes"] / args.threads / 1024
+            if hasattr(saver, "aclose"):
+                await saver.aclose()
+            print(f"{name:<14}{percentile(put_ms, 50):>10.2f}{percentile(put_ms, 99):>10.2f}"
+                  f"{percentile(get_ms, 50):>10.2f}{percentile(get_ms, 99):>10.2f}{size:>12.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
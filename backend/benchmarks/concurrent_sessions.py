@@ -0,0 +1,102 @@
+"""
+Load benchmark for the /get_response SSE endpoint with a mocked LLM.
+
+Fires N concurrent sessions at `stream_response` and reports p50/p99 session
+latency for two LLM client behaviours:
+
+- blocking: the mocked client sleeps on the event-loop thread, which is what
+  the synchronous `agent.stream(...)` loop did before the async path existed.
+- async: the mocked client awaits (`ainvoke`), as the async nodes now do.
+
+Every session sends the same request, so each behaviour is run twice: with
+request coalescing off (`COALESCE_REQUESTS=false`, one graph run per
+session) and on (all sessions share one graph run).
+
+Run from the `backend` directory:
+
+    python -m benchmarks.concurrent_sessions --sessions 50 --latency 0.2
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+from langchain_core.runnables import RunnableLambda
+
+import app as server
+from agent import routers
+from agent.agent import get_agent
+from agent.pydanticModels import UserIntent
+
+
+def mocked_intent_llm(latency: float, blocking: bool):
+    def invoke(_prompt):
+        time.sleep(latency)
+        return UserIntent(intent="greeting")
+
+    async def ainvoke(_prompt):
+        if blocking:
+            time.sleep(latency)
+        else:
+            await asyncio.sleep(latency)
+        return UserIntent(intent="greeting")
+
+    return RunnableLambda(invoke, afunc=ainvoke)
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+async def run_session(idx: int, run_id: str):
+    params = server.NecessaryParams(
+        query="Hi there!",
+        college="Khoury Coll of Comp Sciences CS",
+        department="Data Science DS",
+        min_creds_per_sem=8,
+        max_creds_per_sem=8,
+        core_course_numbers=[],
+        max_credits=32,
+        thread_id=f"{run_id}-{idx}",
+        max_number_of_plans=1,
+    )
+    start = time.perf_counter()
+    response = await server.stream_response(params)
+    async for _event in response.body_iterator:
+        pass
+    return time.perf_counter() - start
+
+
+async def run_load(sessions: int, run_id: str, coalesce: bool):
+    server.COALESCE_REQUESTS = coalesce
+    start = time.perf_counter()
+    latencies = await asyncio.gather(*[run_session(idx, run_id) for idx in range(sessions)])
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=50, help="Number of concurrent sessions")
+    parser.add_argument("--latency", type=float, default=0.2, help="Mocked LLM latency in seconds")
+    args = parser.parse_args()
+
+    server.agent = get_agent()
+    # Force every session through the mocked LLM rather than the local intent fast path.
+    routers.intent_classifier.threshold = float("inf")
+
+    print(f"{args.sessions} concurrent sessions, mocked LLM latency {args.latency * 1000:.0f} ms")
+    print(f"{'mode':<10}{'coalesce':<10}{'p50 (ms)':>12}{'p99 (ms)':>12}{'wall (s)':>12}")
+    for coalesce in (False, True):
+        for mode in ("blocking", "async"):
+            routers.llm_for_intent_check = mocked_intent_llm(args.latency, blocking=(mode == "blocking"))
+            latencies, wall = asyncio.run(run_load(args.sessions, f"{mode}-{coalesce}", coalesce))
+            print(f"{mode:<10}{'on' if coalesce else 'off':<10}"
+                  f"{percentile(latencies, 50) * 1000:>12.1f}{percentile(latencies, 99) * 1000:>12.1f}{wall:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
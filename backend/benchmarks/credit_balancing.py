@@ -0,0 +1,174 @@
+"""
+Success rate and latency of filter_courses_2's credit balancing strategies.
+
+Builds plans that miss their elective credit target (too many or too few
+electives) from the course catalog and balances each one with:
+
+- knapsack: `creditBalancer.balance_plan_credits`, the default;
+- llm: the previous gpt-4.1-nano ADD/REMOVE prompt (`planning.llm_balance_plan`),
+  only with `--llm` (needs OPENAI_API_KEY).
+
+For every strategy it reports how often the target is hit exactly, how often
+the old acceptance rule (core + electives >= max_credits) holds, the mean
+credit overshoot, p50/p99 latency and the mean goal relevance of the result.
+Relevance is a TF-IDF cosine between the goal and each course's title and
+description, so the knapsack run needs neither the vector store nor an API key.
+
+Run from the `backend` directory:
+
+    python -m benchmarks.credit_balancing --scenarios 200 --llm
+"""
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import re
+import time
+from collections import Counter
+
+import numpy as np
+
+from agent.creditBalancer import balance_plan_credits
+from agent.catalog import course_credits, normalize_course, resolve_subject_codes
+
+CATALOG_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "testing", "database.json")
+
+GOALS = [
+    "I want to become a data scientist",
+    "Plan my masters to become a machine learning engineer working on NLP",
+    "I want a career in cybersecurity and network defense",
+    "Help me become a software engineer building distributed systems",
+    "I want to work on computer vision and robotics",
+    "Prepare me for a product analytics and business intelligence role",
+]
+CORE_CREDITS = 16
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def credits(courses):
+    return sum(course_credits(course) for course in courses)
+
+
+class TfidfRelevance:
+    def __init__(self, courses):
+        self.courses = courses
+        docs = [self.tokens(f"{course.get('title', '')} {course.get('description', '')}") for course in courses]
+        frequency = Counter(token for doc in docs for token in set(doc))
+        self.idf = {token: math.log(len(docs) / count) for token, count in frequency.items()}
+        self.vectors = [self.vector(doc) for doc in docs]
+
+    @staticmethod
+    def tokens(text):
+        return [token for token in re.findall(r"[a-z]+", text.lower()) if len(token) > 2]
+
+    def vector(self, tokens):
+        weights = {token: count * self.idf.get(token, 0.0) for token, count in Counter(tokens).items()}
+        norm = math.sqrt(sum(value * value for value in weights.values())) or 1.0
+        return {token: value / norm for token, value in weights.items()}
+
+    def scores(self, goal):
+        query = self.vector(self.tokens(goal))
+        return {
+            course["course_number"]: sum(weight * vector.get(token, 0.0) for token, weight in query.items())
+            for course, vector in zip(self.courses, self.vectors)
+        }
+
+
+def build_scenarios(courses, relevance: TfidfRelevance, count: int, seed: int):
+    rng = random.Random(seed)
+    graduate = [course for course in courses if re.search(r"[5-7]\d{3}$", course["course_number"]) and course_credits(course) > 0]
+    scenarios = []
+    for _ in range(count):
+        goal = rng.choice(GOALS)
+        scores = relevance.scores(goal)
+        pool = sorted(graduate, key=lambda course: -scores[course["course_number"]])[:60]
+        plan = rng.sample(pool[:30], rng.randint(3, 7))
+        max_credits = rng.choice([30, 32, 36])
+        target = max_credits - CORE_CREDITS
+        if credits(plan) == target:
+            plan = plan[:-1]
+        candidates = [course for course in pool if course not in plan]
+        scenarios.append({"goal": goal, "plan": plan, "candidates": candidates, "scores": scores, "target": target})
+    return scenarios
+
+
+def report(name, results, scenarios):
+    exact = sum(1 for (total, _, _), scenario in zip(results, scenarios) if total == scenario["target"])
+    legacy = sum(1 for (total, _, _), scenario in zip(results, scenarios) if total >= scenario["target"])
+    overshoot = np.mean([max(0, total - scenario["target"]) for (total, _, _), scenario in zip(results, scenarios)])
+    latencies = [latency for _, latency, _ in results]
+    relevance = np.mean([score for _, _, score in results])
+    count = len(scenarios)
+    print(f"{name:<10}{exact / count:>8.1%}{legacy / count:>10.1%}{overshoot:>11.2f}"
+          f"{percentile(latencies, 50):>11.2f}{percentile(latencies, 99):>11.2f}{relevance:>11.3f}")
+
+
+def mean_relevance(plan, scores):
+    return float(np.mean([scores.get(course["course_number"], 0.0) for course in plan])) if plan else 0.0
+
+
+def run_knapsack(scenarios):
+    results = []
+    for scenario in scenarios:
+        start = time.perf_counter()
+        plan = balance_plan_credits(scenario["plan"], scenario["candidates"], scenario["scores"], scenario["target"])
+        latency = (time.perf_counter() - start) * 1000
+        plan = scenario["plan"] if plan is None else plan
+        results.append((credits(plan), latency, mean_relevance(plan, scenario["scores"])))
+    return results
+
+
+async def run_llm(scenarios, concurrency: int):
+    from agent.planning import llm_balance_plan
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def balance(scenario):
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                plan = await llm_balance_plan(
+                    scenario["plan"], scenario["candidates"], scenario["target"] - credits(scenario["plan"]),
+                    scenario["goal"], "", "", scenario["target"] + CORE_CREDITS,
+                )
+            except Exception:
+                plan = scenario["plan"]
+            latency = (time.perf_counter() - start) * 1000
+        # filter_courses_2 keeps the original plan when the model misses the target.
+        if credits(plan) < scenario["target"]:
+            plan = scenario["plan"]
+        return credits(plan), latency, mean_relevance(plan, scenario["scores"])
+
+    return await asyncio.gather(*(balance(scenario) for scenario in scenarios))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", type=int, default=200, help="Plans to balance")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm", action="store_true", help="Also balance every plan with the LLM prompt")
+    parser.add_argument("--concurrency", type=int, default=8, help="LLM calls in flight with --llm")
+    args = parser.parse_args()
+
+    with open(CATALOG_PATH) as f:
+        courses = json.load(f)
+    subject_codes = resolve_subject_codes(courses)
+    courses = [normalize_course(course, subject_codes) for course in courses]
+    scenarios = build_scenarios(courses, TfidfRelevance(courses), args.scenarios, args.seed)
+
+    print(f"{len(scenarios)} plans, elective targets {sorted({scenario['target'] for scenario in scenarios})}")
+    print(f"{'strategy':<10}{'exact':>8}{'>=target':>10}{'overshoot':>11}{'p50 ms':>11}{'p99 ms':>11}{'relevance':>11}")
+    report("knapsack", run_knapsack(scenarios), scenarios)
+    if args.llm:
+        report("llm", asyncio.run(run_llm(scenarios, args.concurrency)), scenarios)
+
+
+if __name__ == "__main__":
+    main()
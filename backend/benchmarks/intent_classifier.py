@@ -0,0 +1,105 @@
+"""
+Accuracy/coverage report for the local intent classifier used by `check_intent`.
+
+Runs `intent_classifier.apredict` over a labelled set of student queries and
+reports, per confidence threshold, the share of traffic resolved locally and
+how often those local answers agree with the label. With `--llm`, the same
+queries are also sent to the gpt-4.1-nano classifier (needs OPENAI_API_KEY)
+and agreement between the local answers and the LLM is reported as well.
+
+Run from the `backend` directory:
+
+    python -m benchmarks.intent_classifier --llm
+"""
+import argparse
+import asyncio
+import time
+
+from agent.intentClassifier import intent_classifier
+from agent.pydanticModels import AgentState
+from agent import routers
+
+LABELLED_QUERIES = [
+    ("hi", "greeting"),
+    ("Hello!", "greeting"),
+    ("hey there, how are you doing?", "greeting"),
+    ("Good morning", "greeting"),
+    ("thanks!", "greeting"),
+    ("yo what's up", "greeting"),
+    ("Tell me about DS5220", "course_details"),
+    ("What are the prerequisites for CS 5800?", "course_details"),
+    ("How many credits is DS4400?", "course_details"),
+    ("Give me the description of INFO6105", "course_details"),
+    ("What does CS6120 cover?", "course_details"),
+    ("Which courses teach natural language processing?", "course_details"),
+    ("Show me courses on cloud computing", "course_details"),
+    ("What machine learning courses are offered in the Khoury college?", "course_details"),
+    ("Are there any courses on cryptography?", "course_details"),
+    ("Build me a plan to become a data scientist", "build_schedule"),
+    ("I want to become a machine learning engineer, make a schedule", "build_schedule"),
+    ("Create a study plan for a career in cybersecurity", "build_schedule"),
+    ("Help me plan my masters to get into quantitative finance", "build_schedule"),
+    ("I can't take DS5220, what else can I take instead?", "build_schedule"),
+    ("My department doesn't allow CY courses, suggest alternatives", "build_schedule"),
+    ("Plan my courses so I can work in robotics", "build_schedule"),
+    ("I'd like a 2 year schedule focused on computer vision", "build_schedule"),
+    ("Make a schedule for becoming a product manager in tech", "build_schedule"),
+    ("I have completed ML and DL, what next?", "short_term_planning"),
+    ("I've taken Algorithms and Databases. What should I take next semester for data engineering?", "short_term_planning"),
+    ("Done with Python and Statistics, suggest 3 courses to move toward NLP", "short_term_planning"),
+    ("I finished Intro to AI and Linear Algebra; which advanced courses should I do this spring?", "short_term_planning"),
+    ("Already took DS5110 and DS5220. Next courses for a deep learning focus?", "short_term_planning"),
+    ("Completed networks and OS, want to go into security, what's next?", "short_term_planning"),
+]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--llm", action="store_true", help="Also classify every query with the LLM")
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.5, 0.6, 0.7, 0.8, 0.9, 0.95])
+    return parser.parse_args()
+
+
+async def llm_intent(query: str) -> str:
+    # Bypass the local stage so the LLM answers every query.
+    threshold = intent_classifier.threshold
+    intent_classifier.threshold = float("inf")
+    try:
+        return (await routers.check_intent(AgentState(query=query)))["intent"]
+    finally:
+        intent_classifier.threshold = threshold
+
+
+async def main():
+    args = parse_args()
+    start = time.perf_counter()
+    predictions = [await intent_classifier.apredict(query) for query, _ in LABELLED_QUERIES]
+    local_ms = (time.perf_counter() - start) * 1000 / len(LABELLED_QUERIES)
+    llm_labels = [await llm_intent(query) for query, _ in LABELLED_QUERIES] if args.llm else None
+
+    print(f"{len(LABELLED_QUERIES)} labelled queries, {local_ms:.1f} ms per local prediction")
+    header = f"{'threshold':>10}{'resolved':>10}{'vs label':>10}"
+    if llm_labels:
+        header += f"{'vs LLM':>10}"
+    print(header)
+    for threshold in args.thresholds:
+        resolved = [idx for idx, prediction in enumerate(predictions) if prediction.confidence >= threshold]
+        share = len(resolved) / len(predictions)
+        label_agreement = sum(predictions[idx].intent == LABELLED_QUERIES[idx][1] for idx in resolved) / max(1, len(resolved))
+        row = f"{threshold:>10.2f}{share:>10.0%}{label_agreement:>10.0%}"
+        if llm_labels:
+            llm_agreement = sum(predictions[idx].intent == llm_labels[idx] for idx in resolved) / max(1, len(resolved))
+            row += f"{llm_agreement:>10.0%}"
+        print(row)
+    if llm_labels:
+        llm_accuracy = sum(label == intent for label, (_, intent) in zip(llm_labels, LABELLED_QUERIES)) / len(LABELLED_QUERIES)
+        print(f"LLM agreement with labels: {llm_accuracy:.0%}")
+
+    print("\nmisses at the configured threshold:")
+    for (query, label), prediction in zip(LABELLED_QUERIES, predictions):
+        if prediction.confidence >= intent_classifier.threshold and prediction.intent != label:
+            print(f"  {query!r}: {prediction.intent} ({prediction.source}, {prediction.confidence:.2f}), expected {label}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
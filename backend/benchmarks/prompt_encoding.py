@@ -0,0 +1,196 @@
+"""
+Prompt tokens of the course-list encodings used by the planning prompts.
+
+For every case in `planTesting.json` it builds the `filter_courses_1` prompt
+(`planning.filter_1_prompt`) and the ADD/REMOVE prompt of
+`CREDIT_BALANCER=llm` (`planning.balance_plan_prompt`) with both course
+formats:
+
+- json: every course as indented JSON with its full description;
+- table: `promptEncoding.CourseTable`, with short IDs and one-line summaries.
+
+It reports prompt tokens, the tokens of the answer each format asks for
+(full course objects versus a list of IDs) and the time to build the
+prompt.
+
+It then grows the candidate list the way `final_course_list` grows with
+`max_number_of_plans` (one retrieval of `--courses` per plan) and reports
+the ADD/REMOVE prompt size without and with the token budget
+(`promptEncoding.fit_token_budget` at `PROMPT_COURSE_TOKEN_BUDGET`, ranked
+by the same TF-IDF similarity instead of embeddings).
+
+With `--llm` it also sends both filter_courses_1 prompts to
+gpt-4.1-nano and reports p50/p99 latency plus how many of the returned
+courses exist in the prompt's list.
+
+The course list of a case is the `--courses` catalog courses with the
+highest TF-IDF similarity to its query, drawn from the courses that have a
+description in the recorded `llmResponses*.json` runs (the raw catalog
+export has none). Tokens are counted with tiktoken's o200k_base encoding
+when it can be loaded, otherwise estimated as characters / 4.
+
+Run from the `backend` directory (importing `agent.planning` needs
+OPENAI_API_KEY set, to any value unless `--llm` is given):
+
+    python -m benchmarks.prompt_encoding --courses 31 --llm
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from agent.catalog import CourseCatalog, prompt_fields
+from agent.config import PROMPT_COURSE_TOKEN_BUDGET
+from agent.planning import balance_plan_prompt, filter_1_prompt
+from agent.promptEncoding import fit_token_budget
+from benchmarks.credit_balancing import TfidfRelevance, percentile
+
+BACKEND_DIR = os.path.join(os.path.dirname(__file__), "..")
+CATALOG_PATH = os.path.join(BACKEND_DIR, "..", "testing", "database.json")
+CASES_PATH = os.path.join(BACKEND_DIR, "planTesting.json")
+RECORDED_RUNS = [os.path.join(BACKEND_DIR, name) for name in ("llmResponses.json", "llmResponses4plans.json")]
+FORMATS = ("json", "table")
+
+
+def token_counter():
+    try:
+        import tiktoken
+        encoding = tiktoken.get_encoding("o200k_base")
+        return (lambda text: len(encoding.encode(text))), "tiktoken o200k_base"
+    except Exception:
+        return (lambda text: round(len(text) / 4)), "estimated as characters / 4"
+
+
+def recorded_descriptions() -> dict:
+    """course_number -> description for every course that appears in the recorded runs."""
+    found = {}
+
+    def walk(value):
+        if isinstance(value, dict):
+            if value.get("course_number") and value.get("description"):
+                found[value["course_number"]] = value["description"]
+            for item in value.values():
+                walk(item)
+        elif isinstance(value, list):
+            for item in value:
+                walk(item)
+        elif isinstance(value, str) and value.lstrip()[:1] in ("[", "{"):
+            try:
+                walk(json.loads(value))
+            except ValueError:
+                pass
+
+    for path in RECORDED_RUNS:
+        with open(path) as f:
+            walk(json.load(f))
+    return found
+
+
+def load_courses():
+    with open(CATALOG_PATH) as f:
+        raw = json.load(f)
+    descriptions = recorded_descriptions()
+    for course in raw:
+        course["description"] = descriptions.get(course["course_number"], "")
+    return CourseCatalog([]).load_courses(raw)
+
+
+def build_cases(catalog, course_count: int):
+    with open(CASES_PATH) as f:
+        tests = json.load(f)["tests"]
+    pool = [catalog.get(number) for number in sorted(catalog._courses) if catalog.get(number)["description"]]
+    relevance = TfidfRelevance(pool)
+    cases = []
+    for test in tests:
+        core = catalog.get_many(test["core_course_numbers"])
+        scores = relevance.scores(test["query"])
+        ranked = [(course, scores[course["course_number"]]) for course in sorted(pool, key=lambda course: -scores[course["course_number"]])
+                  if course["course_number"] not in test["core_course_numbers"]]
+        cases.append({**test, "core": core, "course_list": [course for course, _ in ranked[:course_count]], "ranked": ranked})
+    return cases
+
+
+def answer(course_format: str, table, courses):
+    """The answer a model gives in `course_format` when it picks `courses`."""
+    if table is None:
+        return json.dumps({"courses": [prompt_fields(course) for course in courses]}, indent=2)
+    return json.dumps({"courses": [table.id_of(course) for course in courses]})
+
+
+def balance_tokens(case, count, plans: int, course_count: int, budget):
+    """ADD/REMOVE prompt tokens when `final_course_list` holds `plans` retrievals, optionally cut to `budget`."""
+    available = case["ranked"][4:4 + plans * course_count]
+    courses = [course for course, _ in available]
+    if budget is not None:
+        courses = fit_token_budget(courses, [score for _, score in available], budget, "table")
+    prompt, _ = balance_plan_prompt(case["course_list"][:3], courses, 4, case["query"], case["college"],
+                                    case["department"], case["max_credits"], course_format="table")
+    return count(prompt)
+
+
+def prompts(case, course_format: str):
+    args = (case["query"], case["query"], case["course_list"], case["core"], case["college"], case["department"],
+            case["max_credits"], case["core_course_numbers"], 1)
+    start = time.perf_counter()
+    filter_prompt, table = filter_1_prompt(*args, course_format=course_format)
+    build_ms = (time.perf_counter() - start) * 1000
+    picked = case["course_list"][:4]
+    balance_prompt, _ = balance_plan_prompt(picked[:3], case["course_list"][4:], 4, case["query"], case["college"],
+                                            case["department"], case["max_credits"], course_format=course_format)
+    return filter_prompt, answer(course_format, table, picked), balance_prompt, build_ms
+
+
+async def time_llm(cases, course_format: str):
+    from agent.planning import llm_json_for_filter_1
+
+    latencies, valid, returned = [], 0, 0
+    for case in cases:
+        prompt, table = filter_1_prompt(case["query"], case["query"], case["course_list"], case["core"], case["college"],
+                                        case["department"], case["max_credits"], case["core_course_numbers"], 1,
+                                        course_format=course_format)
+        start = time.perf_counter()
+        content = (await llm_json_for_filter_1.ainvoke(prompt)).content
+        latencies.append((time.perf_counter() - start) * 1000)
+        picked = json.loads(content).get("courses", [])
+        known = {course["course_number"] for course in case["course_list"]}
+        chosen = table.decode(picked) if table is not None else picked
+        returned += len(picked)
+        valid += sum(1 for course in chosen if course.get("course_number") in known)
+    return latencies, valid, returned
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=31, help="Courses in each case's course_list (15 + 15 + 1 retrieved)")
+    parser.add_argument("--max-plans", type=int, default=5, help="Largest max_number_of_plans in the growth sweep")
+    parser.add_argument("--llm", action="store_true", help="Also time the filter_courses_1 prompts against gpt-4.1-nano")
+    args = parser.parse_args()
+
+    count, counter = token_counter()
+    cases = build_cases(load_courses(), args.courses)
+    print(f"{len(cases)} cases, {args.courses} courses each, tokens {counter}")
+    print(f"{'format':<8}{'filter_1 in':>13}{'filter_1 out':>14}{'balance in':>12}{'build ms':>10}")
+    for course_format in FORMATS:
+        rows = [prompts(case, course_format) for case in cases]
+        print(f"{course_format:<8}{sum(count(row[0]) for row in rows) / len(rows):>13.0f}"
+              f"{sum(count(row[1]) for row in rows) / len(rows):>14.0f}"
+              f"{sum(count(row[2]) for row in rows) / len(rows):>12.0f}"
+              f"{sum(row[3] for row in rows) / len(rows):>10.2f}")
+
+    print(f"\nADD/REMOVE prompt tokens (table) as plans grow, budget {PROMPT_COURSE_TOKEN_BUDGET}")
+    print(f"{'plans':<8}{'unbudgeted':>12}{'budgeted':>10}")
+    for plans in range(1, args.max_plans + 1):
+        unbudgeted = sum(balance_tokens(case, count, plans, args.courses, None) for case in cases) / len(cases)
+        budgeted = sum(balance_tokens(case, count, plans, args.courses, PROMPT_COURSE_TOKEN_BUDGET) for case in cases) / len(cases)
+        print(f"{plans:<8}{unbudgeted:>12.0f}{budgeted:>10.0f}")
+
+    if args.llm:
+        print(f"\n{'format':<8}{'p50 ms':>10}{'p99 ms':>10}{'valid picks':>13}")
+        for course_format in FORMATS:
+            latencies, valid, returned = asyncio.run(time_llm(cases, course_format))
+            print(f"{course_format:<8}{percentile(latencies, 50):>10.0f}{percentile(latencies, 99):>10.0f}{f'{valid}/{returned}':>13}")
+
+
+if __name__ == "__main__":
+    main()
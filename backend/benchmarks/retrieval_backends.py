@@ -0,0 +1,150 @@
+"""
+Recall@k and query latency of the retriever backends (`RETRIEVER_BACKEND`).
+
+Ground truth is exact cosine search (`ExactRetriever`). For every backend
+(chroma, exact, graph at several `ef` values) it reports recall@k against
+that truth and p50/p99 latency of single-query calls, the way
+`search_by_vectors` sends a free-text search. It does this for two kinds
+of query:
+
+- unfiltered searches;
+- the department tier of the search cascade (`{"dept_code": ...}`).
+
+It also reports the time to load (and, for graph, build) each in-memory
+index.
+
+Queries are stored course embeddings mixed with Gaussian noise (`--noise`)
+and re-normalised, which stand in for embedded search text without API
+calls. The filtered queries use the department of the course they came
+from.
+
+The existing RegularCourses collection is used by default. With
+`--synthetic N`, or when that collection is empty, an in-memory Chroma
+collection is built instead. It holds one clustered synthetic vector per
+course of `testing/database.json` (cycled up to N), where each department
+is a cluster.
+
+Run from the `backend` directory (importing `agent.queryDB` needs
+OPENAI_API_KEY set, to any value):
+
+    python -m benchmarks.retrieval_backends --k 15 --queries 200
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from agent.courseRetriever import ChromaRetriever, ExactRetriever, GraphRetriever
+
+CATALOG_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "testing", "database.json")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def synthetic_collection(count: int, dimensions: int, rng: np.random.Generator):
+    """In-memory Chroma collection of `count` clustered vectors with catalog metadata."""
+    import chromadb
+    from langchain_community.vectorstores import Chroma
+
+    with open(CATALOG_PATH) as f:
+        courses = json.load(f)
+    centres = {}
+    ids, vectors, documents, metadatas = [], [], [], []
+    for idx in range(count):
+        course = courses[idx % len(courses)]
+        code = course["dept_code"]
+        if code not in centres:
+            centres[code] = rng.standard_normal(dimensions)
+        vector = centres[code] + 1.2 * rng.standard_normal(dimensions)
+        ids.append(f"{course['course_number']}-{idx}")
+        vectors.append((vector / np.linalg.norm(vector)).tolist())
+        documents.append(f"Title: {course['title']}")
+        metadatas.append({key: course[key] for key in ("course_number", "title", "college", "department", "dept_code", "credit_hours")})
+    database = Chroma(collection_name="RetrievalBenchmark", client=chromadb.EphemeralClient())
+    for start in range(0, count, 1000):
+        database._collection.add(ids=ids[start:start + 1000], embeddings=vectors[start:start + 1000],
+                                 documents=documents[start:start + 1000], metadatas=metadatas[start:start + 1000])
+    return database
+
+
+def sample_queries(database, count: int, noise: float, rng: np.random.Generator):
+    data = database.get(include=["embeddings", "metadatas"])
+    rows = rng.choice(len(data["metadatas"]), size=min(count, len(data["metadatas"])), replace=False)
+    queries = []
+    for row in rows:
+        vector = np.asarray(data["embeddings"][row], dtype=np.float32)
+        vector = vector / np.linalg.norm(vector)
+        mixed = vector + noise * rng.standard_normal(len(vector)).astype(np.float32) / np.sqrt(len(vector))
+        queries.append(((mixed / np.linalg.norm(mixed)).tolist(), {"dept_code": data["metadatas"][row]["dept_code"]}))
+    return queries
+
+
+def run(retriever, queries, k: int, filtered: bool):
+    """(set of (course_number, document) hits per query, per-query milliseconds) of single-query calls."""
+    results, latencies = [], []
+    for vector, where in queries:
+        start = time.perf_counter()
+        hits = retriever.query([vector], k, where if filtered else None)[0]
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append({(meta["course_number"], document) for document, meta in hits})
+    return results, latencies
+
+
+def recall(results, truth) -> float:
+    found = sum(len(result & expected) for result, expected in zip(results, truth))
+    return found / max(1, sum(len(expected) for expected in truth))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=15, help="Results per query (recall@k)")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per run")
+    parser.add_argument("--noise", type=float, default=1.0, help="Norm of the noise mixed into each query vector")
+    parser.add_argument("--ef", default="16,32,64,128", help="Comma-separated graph beam widths to compare")
+    parser.add_argument("--synthetic", type=int, default=0, help="Use N synthetic courses instead of RegularCourses")
+    parser.add_argument("--dimensions", type=int, default=3072, help="Vector size of the synthetic collection")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    database = None
+    if not args.synthetic:
+        from agent.queryDB import regular_courses_database
+        database = regular_courses_database if regular_courses_database._collection.count() else None
+    source = "RegularCourses"
+    if database is None:
+        count = args.synthetic or 3351
+        database = synthetic_collection(count, args.dimensions, rng)
+        source = f"synthetic ({count} courses, {args.dimensions}-d)"
+    queries = sample_queries(database, args.queries, args.noise, rng)
+
+    start = time.perf_counter()
+    exact = ExactRetriever(database).load()
+    load_ms = {"exact": (time.perf_counter() - start) * 1000}
+    backends = [("chroma", ChromaRetriever(database)), ("exact", exact)]
+    for ef in (int(value) for value in args.ef.split(",")):
+        graph = GraphRetriever(database, ef=ef)
+        start = time.perf_counter()
+        graph.load()
+        load_ms[f"graph ef={ef}"] = (time.perf_counter() - start) * 1000
+        backends.append((f"graph ef={ef}", graph))
+
+    print(f"{source}: {len(exact)} vectors, {len(queries)} queries, k={args.k}")
+    print(f"{'backend':<14}{'filter':<8}{f'recall@{args.k}':>11}{'p50 ms':>9}{'p99 ms':>9}{'load ms':>10}")
+    for filtered in (False, True):
+        truth, _ = run(exact, queries, args.k, filtered)
+        for name, retriever in backends:
+            run(retriever, queries[:5], args.k, filtered)
+            results, latencies = run(retriever, queries, args.k, filtered)
+            loaded = f"{load_ms[name]:>10.0f}" if name in load_ms else f"{'-':>10}"
+            print(f"{name:<14}{'dept' if filtered else 'none':<8}{recall(results, truth):>11.3f}"
+                  f"{percentile(latencies, 50):>9.3f}{percentile(latencies, 99):>9.3f}{loaded}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+"""
+State size and checkpoint cost of real schedule-building runs.
+
+Runs the compiled graph (`agent.get_agent`) on a build_schedule request with
+the LLM and retrieval calls stubbed out, so every node, the `Send` fan-out to
+`generate_plan_candidate` and the checkpoints LangGraph writes for them are
+the production ones (one warm-up run per backend is not counted):
+
+- the intent, rephrasing and elective-selection LLMs answer instantly
+  (build_schedule, a rephrasing built from the prompt text, and a seeded
+  random pick of the courses offered in the prompt);
+- embeddings come from a token-hashing stand-in for the OpenAI model;
+- course searches and the stored-embedding index rank the courses of
+  `testing/database.json` by similarity to those stand-in embeddings, with
+  the student's department first.
+
+For every checkpointer backend it reports the in-memory size of the final
+state (objects shared between channels counted once), the checkpoints and
+pending writes saved per run, the serialized bytes written per run (after
+compression for sqlite+zlib), and p50/p99 of the time a run spends in the
+checkpointer's `aput`/`aput_writes` calls.
+
+Run from the `backend` directory:
+
+    python -m benchmarks.state_size --runs 50 --plans 4
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage
+from langchain_core.runnables import RunnableLambda
+
+from agent import planning, routers
+from agent.agent import get_agent
+from agent.checkpointer import BoundedMemorySaver, CompressedSerializer, CourseRefSerializer, SqliteCheckpointSaver
+from agent.embeddingCache import embeddings
+from agent.embeddingIndex import course_to_text
+from agent.pydanticModels import UserIntent
+from agent.queryDB import course_catalog, special_topics_retriever
+
+CATALOG_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "testing", "database.json")
+DIMENSIONS = 256
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def hashed_vector(text: str) -> np.ndarray:
+    """Unit bag-of-tokens vector: every token adds 1 to one hashed dimension."""
+    vector = np.zeros(DIMENSIONS, dtype=np.float32)
+    for token in re.findall(r"[a-z0-9]+", text.lower()):
+        vector[int(hashlib.md5(token.encode()).hexdigest(), 16) % DIMENSIONS] += 1.0
+    return vector / max(float(np.linalg.norm(vector)), 1e-10)
+
+
+class HashedEmbeddings(Embeddings):
+    """Stand-in for the OpenAI embedding model (`hashed_vector`)."""
+
+    def embed_documents(self, texts):
+        return [hashed_vector(text).tolist() for text in texts]
+
+    def embed_query(self, text):
+        return hashed_vector(text).tolist()
+
+
+class HashedCourseIndex:
+    """Stand-in for `embeddingIndex.course_embedding_index` over `hashed_vector` course embeddings."""
+
+    def __init__(self, courses):
+        self._vectors = {course["course_number"]: hashed_vector(course_to_text(course)) for course in courses}
+
+    def vector(self, course_number: str):
+        return self._vectors.get(course_number)
+
+    async def similarities(self, query_vector, courses) -> np.ndarray:
+        query = np.asarray(query_vector, dtype=np.float32)
+        return np.array([
+            float(self._vectors.get(course["course_number"], hashed_vector(course_to_text(course))) @ query)
+            for course in courses
+        ], dtype=np.float32)
+
+
+def stub_search(courses):
+    """Stand-in for `queryDB.search_courses` over the given catalog courses."""
+    special = [course for course in courses if re.match(r"(special|topics)", course["title"].lower())]
+    regular = [course for course in courses if course not in special]
+
+    def search_courses(query, k, college="", department="", retriever=None, strict=False):
+        pool = special if retriever is special_topics_retriever else regular
+        dept_code = course_catalog.search_scope(college, department)[0] if college or department else None
+        query_vector = hashed_vector(query)
+        ranked = sorted(pool, key=lambda course: (
+            strict and dept_code is not None and course.get("dept_code") != dept_code,
+            -float(hashed_vector(course_to_text(course)) @ query_vector),
+        ))
+        return ranked[:k]
+
+    return search_courses
+
+
+def stub_llms(seed: int):
+    rng = random.Random(seed)
+
+    async def intent(_prompt, **_kwargs):
+        return UserIntent(intent="build_schedule")
+
+    async def rephrase(prompt, **_kwargs):
+        return AIMessage(content=f"Courses for: {str(prompt)[-200:]}")
+
+    async def pick_electives(prompt, **_kwargs):
+        text = prompt if isinstance(prompt, str) else str(prompt)
+        offered = re.findall(r"^(\d+)\|[A-Z]", text, re.MULTILINE)
+        if offered:
+            return AIMessage(content=json.dumps({"courses": rng.sample(offered, min(6, len(offered)))}))
+        numbers = list(dict.fromkeys(re.findall(r"\b[A-Z]{2,5}\d{4}\b", text)))
+        picked = rng.sample(numbers, min(6, len(numbers)))
+        return AIMessage(content=json.dumps({"courses": [{"course_number": number} for number in picked]}))
+
+    routers.llm_for_intent_check = RunnableLambda(lambda _prompt: UserIntent(intent="build_schedule"), afunc=intent)
+    routers.intent_classifier.threshold = float("inf")
+    planning.llm = RunnableLambda(lambda prompt: AIMessage(content=str(prompt)), afunc=rephrase)
+    planning.llm_json_for_filter_1 = RunnableLambda(lambda prompt: None, afunc=pick_electives)
+
+
+class CountingSerializer:
+    """Passes through to `inner` and counts the bytes it produces."""
+
+    def __init__(self, inner):
+        self.inner = inner
+        self.bytes = 0
+
+    def dumps_typed(self, obj):
+        kind, data = self.inner.dumps_typed(obj)
+        self.bytes += len(data)
+        return kind, data
+
+    def loads_typed(self, data):
+        return self.inner.loads_typed(data)
+
+
+class SaverTimer:
+    """Wraps a checkpointer's `aput` and `aput_writes`, counting calls and the time spent in them."""
+
+    def __init__(self, saver):
+        self.seconds = 0.0
+        self.calls = {"aput": 0, "aput_writes": 0}
+        for name in self.calls:
+            setattr(saver, name, self._timed(name, getattr(saver, name)))
+
+    def _timed(self, name, method):
+        async def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await method(*args, **kwargs)
+            finally:
+                self.seconds += time.perf_counter() - start
+                self.calls[name] += 1
+        return timed
+
+
+def deep_size(obj, seen=None) -> int:
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_size(key, seen) + deep_size(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple)):
+        size += sum(deep_size(item, seen) for item in obj)
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_size(getattr(obj, name), seen) for name in obj.__slots__ if name != "__weakref__")
+    return size
+
+
+async def run_graph(saver, serde: CountingSerializer, request: dict, runs: int, prefix: str):
+    graph = get_agent(saver)
+    await graph.ainvoke(dict(request), config={"configurable": {"thread_id": f"{prefix}-warmup"}})
+    serde.bytes = 0
+    timer = SaverTimer(saver)
+    saver_ms, state_bytes = [], []
+    for run in range(runs):
+        config = {"configurable": {"thread_id": f"{prefix}-{run}"}}
+        before = timer.seconds
+        await graph.ainvoke(dict(request), config=config)
+        saver_ms.append((timer.seconds - before) * 1000)
+        state_bytes.append(deep_size((await graph.aget_state(config)).values))
+    return saver_ms, state_bytes, timer.calls
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=50, help="build_schedule runs per backend")
+    parser.add_argument("--plans", type=int, default=4, help="Plans per run")
+    args = parser.parse_args()
+
+    with open(CATALOG_PATH) as f:
+        course_catalog.load_courses(json.load(f))
+    courses = [course_catalog.get(course_number) for course_number in sorted(course_catalog._courses)]
+    embeddings.underlying = HashedEmbeddings()
+    planning.course_embedding_index = HashedCourseIndex(courses)
+    planning.search_courses = stub_search(courses)
+    stub_llms(seed=0)
+
+    request = {
+        "query": "Make me a plan to become a data scientist working on machine learning",
+        "messages": [["User", "Query", "Make me a plan to become a data scientist working on machine learning"]],
+        "college": "Khoury Coll of Comp Sciences CS",
+        "department": "Data Science DS",
+        "core_course_numbers": ["DS5010", "DS5110"],
+        "max_credits": 32,
+        "min_creds_per_sem": 8,
+        "max_creds_per_sem": 8,
+        "max_number_of_plans": args.plans,
+    }
+
+    print(f"{args.runs} runs x {args.plans} plans, {len(courses)} catalog courses")
+    print(f"{'backend':<14}{'state KB':>10}{'ckpts/run':>11}{'writes/run':>12}{'written KB':>12}{'saver p50 ms':>14}{'p99 ms':>9}")
+    with tempfile.TemporaryDirectory() as tmp:
+        backends = [
+            ("memory", lambda serde: BoundedMemorySaver(serde=serde), CourseRefSerializer),
+            ("sqlite+zlib", lambda serde: SqliteCheckpointSaver.open(os.path.join(tmp, "state.sqlite"), serde=serde),
+             lambda: CompressedSerializer(CourseRefSerializer())),
+        ]
+        for name, factory, serializer in backends:
+            serde = CountingSerializer(serializer())
+            saver = factory(serde)
+            if asyncio.iscoroutine(saver):
+                saver = await saver
+            saver_ms, state_bytes, calls = await run_graph(saver, serde, request, args.runs, name)
+            if hasattr(saver, "aclose"):
+                await saver.aclose()
+            print(f"{name:<14}{sum(state_bytes) / len(state_bytes) / 1024:>10.1f}"
+                  f"{calls['aput'] / args.runs:>11.1f}{calls['aput_writes'] / args.runs:>12.1f}"
+                  f"{serde.bytes / args.runs / 1024:>12.1f}{percentile(saver_ms, 50):>14.2f}{percentile(saver_ms, 99):>9.2f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,122 @@
+"""
+Per-transition overhead of the graph state schema with large course lists.
+
+Compiles a chain of no-op nodes (each only appends a message, like the
+planning nodes' progress messages) over both state classes:
+
+- pydantic: `AgentState`, validated and copied on every node transition;
+- dataclass: `LightweightAgentState`, the default (`STATE_SCHEMA`).
+
+The input carries `--courses` catalog courses in `course_list` and
+`final_course_list`, `--plans` plans in `filtered_course_list` and as many
+`semester_plans`, so every transition rebuilds a state the size of a real
+multi-plan run. Reports p50/p99 microseconds per transition (graph run time
+divided by node count, no checkpointer) and the cost of building the state
+object alone.
+
+Run from the `backend` directory:
+
+    python -m benchmarks.state_transitions --courses 400 --plans 4 --nodes 12
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import time
+
+from langgraph.graph import END, START, StateGraph
+
+from agent.catalog import CourseCatalog, PlannedCourse
+from agent.pydanticModels import AgentState, LightweightAgentState
+
+CATALOG_PATH = os.path.join(os.path.dirname(__file__), "..", "..", "testing", "database.json")
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def sample_state(courses, course_count: int, plans: int, rng: random.Random) -> dict:
+    course_list = rng.sample(courses, course_count)
+    filtered = [rng.sample(course_list, 10) for _ in range(plans)]
+    return {
+        "query": "Make me a plan to become a data scientist",
+        "messages": [["User", "Query", "Make me a plan to become a data scientist"]],
+        "course_list": course_list,
+        "final_course_list": course_list,
+        "core_course": course_list[:4],
+        "filtered_course_list": filtered,
+        "semester_plans": [
+            {
+                "plan_number": number + 1,
+                "semester_schedule": [
+                    {"semester": term + 1, "courses": [PlannedCourse(course, "Builds on the previous semester.", "elective") for course in plan[term::3]]}
+                    for term in range(3)
+                ],
+            }
+            for number, plan in enumerate(filtered)
+        ],
+        "max_number_of_plans": plans,
+    }
+
+
+def build_chain(schema, nodes: int):
+    workflow = StateGraph(schema)
+
+    def step(state):
+        return {"messages": [["AI", "Step", "Completed"]]}
+
+    names = [f"node_{idx}" for idx in range(nodes)]
+    for name in names:
+        workflow.add_node(name, step)
+    for source, target in zip([START] + names, names + [END]):
+        workflow.add_edge(source, target)
+    return workflow.compile()
+
+
+async def time_runs(graph, state: dict, nodes: int, runs: int):
+    per_transition = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await graph.ainvoke(state)
+        per_transition.append((time.perf_counter() - start) / nodes * 1e6)
+    return per_transition
+
+
+def time_construction(schema, state: dict, runs: int):
+    per_build = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        schema(**state)
+        per_build.append((time.perf_counter() - start) * 1e6)
+    return per_build
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--courses", type=int, default=400, help="Courses in course_list/final_course_list")
+    parser.add_argument("--plans", type=int, default=4, help="Plans in filtered_course_list and semester_plans")
+    parser.add_argument("--nodes", type=int, default=12, help="Nodes in the chain")
+    parser.add_argument("--runs", type=int, default=50, help="Graph runs per schema")
+    args = parser.parse_args()
+
+    with open(CATALOG_PATH) as f:
+        catalog = CourseCatalog([]).load_courses(json.load(f))
+    courses = [catalog.get(course_number) for course_number in sorted(catalog._courses)]
+    state = sample_state(courses, args.courses, args.plans, random.Random(0))
+
+    print(f"{args.courses} courses, {args.plans} plans, {args.nodes} nodes x {args.runs} runs")
+    print(f"{'schema':<11}{'us/transition p50':>19}{'p99':>10}{'build us p50':>14}")
+    for name, schema in (("pydantic", AgentState), ("dataclass", LightweightAgentState)):
+        graph = build_chain(schema, args.nodes)
+        await time_runs(graph, state, args.nodes, 3)
+        per_transition = await time_runs(graph, state, args.nodes, args.runs)
+        per_build = time_construction(schema, state, args.runs * args.nodes)
+        print(f"{name:<11}{percentile(per_transition, 50):>19.1f}{percentile(per_transition, 99):>10.1f}{percentile(per_build, 50):>14.1f}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
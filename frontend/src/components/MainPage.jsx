@@ -53,7 +53,7 @@ export default function MainPage() {
   //   }
   // }, [status])
 
-  async function get_ai_response(formdata) {
+  async function get_ai_response(formdata, turnStart) {
     const controller = new AbortController();
     const decoder = new TextDecoder();
 
@@ -70,6 +70,17 @@ export default function MainPage() {
     const reader = response.body.getReader();
     let buffer = "";
 
+    // AI messages and draft plans streamed so far in this turn, shown until FINAL_OUTPUT arrives.
+    const turnMessages = [];
+    const draftPlans = [];
+
+    function showTurn() {
+      const hasPlans = turnMessages.some((message) => message[1] === "Planning");
+      const drafts = draftPlans.filter(Boolean);
+      const streamed = hasPlans || drafts.length === 0 ? turnMessages : [...turnMessages, ["AI", "Planning", drafts]];
+      setMessages((prevMessages) => [...prevMessages.slice(0, turnStart + 1), ...streamed]);
+    }
+
     while (true) {
       const { done, value } = await reader.read();
       if (done) break;
@@ -82,15 +93,37 @@ export default function MainPage() {
       buffer = lines.pop(); // Save incomplete line back to buffer
 
       for (const line of lines) {
+        if (line.startsWith("event:")) {
+          const [eventLine, dataLine = ""] = line.split("\n");
+          const event = eventLine.replace("event:", "").trim();
+          try {
+            const payload = JSON.parse(dataLine.replace("data:", "").trim());
+            if (event === "plan") {
+              draftPlans[payload.plan_number - 1] = payload.plan;
+              showTurn();
+            }
+            else if (event === "message") {
+              turnMessages.push(payload);
+              showTurn();
+            }
+            else if (event === "progress") {
+              console.debug(`${payload.label}: ${payload.elapsed_ms} ms (${payload.total_ms} ms total)`);
+            }
+          } catch (err) {
+            console.error(`Failed to parse ${event} event:`, err);
+          }
+          continue;
+        }
         if (!line.startsWith("data:")) continue;
         const data = line.replace("data:", "").trim();
 
         if (data.startsWith("[FINAL_OUTPUT]")) {
           try {
             const jsonStr = data.replace("[FINAL_OUTPUT]", "").trim();
-            const newMessage = JSON.parse(jsonStr);
+            const turn = JSON.parse(jsonStr);
 
-            setMessages(newMessage)
+            // FINAL_OUTPUT carries this turn's messages (starting with the query), not the whole history.
+            setMessages((prevMessages) => [...prevMessages.slice(0, turnStart), ...turn]);
           } catch (err) {
             console.error("Failed to parse FINAL_OUTPUT:", err);
           }
@@ -179,13 +212,14 @@ export default function MainPage() {
 
   useEffect(() => {
     if (submit && String(query).trim()) {
+      const turnStart = messages.length
       messages.push(["User", "Query", query])
       setMessages(messages)
       setQuery("")
       const thread_id = getOrCreateThreadId()
       const formdata = { "query": query, "thread_id": thread_id, ...formData }
       
-      get_ai_response(formdata)
+      get_ai_response(formdata, turnStart)
       setSubmit(false)
     }
   }, [submit])